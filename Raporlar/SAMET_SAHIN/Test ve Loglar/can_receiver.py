@@ -0,0 +1,245 @@
+"""
+Toplu CAN Alıcısı
+=================
+bus.recv() ile tek tek okuyup her çerçeveyi satır içinde işlemek yerine
+çerçeveler arka planda toplanır ve dedektöre NumPy kayıt dizisi olarak toplu
+verilir (FRAME_DTYPE: backend /api/ingest/can kaydıyla aynı 21 bayt).
+
+- NotifierReceiver: python-can Notifier + sınırlı tampon. Her python-can
+  arayüzüyle çalışır; 'virtual' arayüzü vcan/donanım olmadan test içindir.
+  Tampon doluysa çerçeve düşürülür ve sayılır (dropped).
+- SocketCANReceiver: ham SocketCAN soketi (yalnızca Linux). select() ile
+  uyanır, kuyruktaki her şeyi tek seferde boşaltır; zaman damgası çekirdekten
+  (SO_TIMESTAMP), çekirdeğin düşürdüğü çerçeve sayısı SO_RXQ_OVFL'den okunur.
+
+Hız ölçümü (vcan veya donanım gerekmez):
+    python can_receiver.py --interface virtual --frames 200000
+    python can_receiver.py --interface socketcan --channel vcan0 --raw --frames 200000
+"""
+
+import argparse
+import collections
+import select
+import socket
+import struct
+import threading
+import time
+
+import can
+import numpy as np
+
+MAX_BATCH = 1024        # recv_batch() başına en fazla çerçeve
+MAX_PENDING = 100000    # Dedektörün yetişemediği çerçeveler için tampon (aşılırsa düşürülür)
+
+# Bir çerçeve (backend: detect_attack_ensemble.CAN_FRAME_DTYPE)
+FRAME_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('arbitration_id', '<u4'),
+    ('dlc', 'u1'),
+    ('data', 'u1', (8,)),
+])
+
+# linux/can.h, asm-generic/socket.h
+CAN_FRAME = struct.Struct('=IB3x8s')   # struct can_frame (16 bayt)
+CAN_EFF_FLAG = 0x80000000
+CAN_RTR_FLAG = 0x40000000
+CAN_ERR_FLAG = 0x20000000
+CAN_EFF_MASK = 0x1FFFFFFF
+SO_TIMESTAMP = getattr(socket, 'SO_TIMESTAMP', 29)
+SO_RXQ_OVFL = getattr(socket, 'SO_RXQ_OVFL', 40)
+TIMEVAL = struct.Struct('@ll')
+
+
+def frames_from_messages(messages):
+    """can.Message listesi -> FRAME_DTYPE dizisi."""
+    frames = np.zeros(len(messages), dtype=FRAME_DTYPE)
+    if messages:
+        frames['timestamp'] = [m.timestamp for m in messages]
+        frames['arbitration_id'] = [m.arbitration_id for m in messages]
+        frames['dlc'] = [min(m.dlc, 8) for m in messages]
+        frames['data'] = np.frombuffer(
+            b''.join(bytes(m.data[:8]).ljust(8, b'\0') for m in messages), dtype=np.uint8).reshape(-1, 8)
+    return frames
+
+
+class _BoundedListener(can.Listener):
+    """Notifier iş parçacığında çalışır: mesajı tampona ekler, doluysa düşürür."""
+
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self.pending = collections.deque()
+        self.ready = threading.Event()
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def on_message_received(self, msg):
+        self.received += 1
+        if msg.is_error_frame:
+            self.errors += 1
+            return
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending.append(msg)
+        self.ready.set()
+
+    def on_error(self, exc):
+        self.errors += 1
+
+
+class NotifierReceiver:
+    """python-can Notifier ile arka planda okur; recv_batch() birikenleri toplu döndürür."""
+
+    def __init__(self, bus, max_batch=MAX_BATCH, max_pending=MAX_PENDING):
+        self.bus = bus
+        self.max_batch = max_batch
+        self._listener = _BoundedListener(max_pending)
+        self._notifier = can.Notifier(bus, [self._listener], timeout=0.1)
+        self.batches = 0
+        self.delivered = 0
+
+    def recv_batch(self, timeout=1.0):
+        """En fazla max_batch çerçeve; `timeout` içinde hiç gelmezse boş dizi."""
+        listener = self._listener
+        if not listener.pending:
+            listener.ready.clear()
+            # clear() ile kontrol arasında gelen mesaj kaçmasın
+            if not listener.pending and not listener.ready.wait(timeout):
+                return frames_from_messages([])
+        pending = listener.pending
+        messages = [pending.popleft() for _ in range(min(self.max_batch, len(pending)))]
+        self.batches += 1
+        self.delivered += len(messages)
+        return frames_from_messages(messages)
+
+    def stats(self):
+        listener = self._listener
+        return {
+            'received': listener.received,
+            'delivered': self.delivered,
+            'dropped': listener.dropped,
+            'errors': listener.errors,
+            'pending': len(listener.pending),
+            'batches': self.batches,
+            'avg_batch': round(self.delivered / self.batches, 1) if self.batches else 0.0,
+        }
+
+    def shutdown(self):
+        self._notifier.stop()
+        self.bus.shutdown()
+
+
+class SocketCANReceiver:
+    """Ham SocketCAN: her uyanışta soket kuyruğunu boşaltır (Linux, vcan0/can0)."""
+
+    def __init__(self, channel='vcan0', max_batch=MAX_BATCH, rcvbuf=None):
+        self.max_batch = max_batch
+        self.sock = socket.socket(socket.PF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        self.sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMP, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+        if rcvbuf:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.bind((channel,))
+        self.sock.setblocking(False)
+        self._ancbufsize = socket.CMSG_SPACE(TIMEVAL.size) + socket.CMSG_SPACE(4)
+        self._buffer = np.zeros(max_batch, dtype=FRAME_DTYPE)
+
+        self.received = 0
+        self.kernel_dropped = 0   # SO_RXQ_OVFL: soket tamponu dolduğu için çekirdeğin attıkları
+        self.errors = 0
+        self.batches = 0
+
+    def recv_batch(self, timeout=1.0):
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if not readable:
+            return self._buffer[:0].copy()
+        frames = self._buffer
+        count = 0
+        while count < self.max_batch:
+            try:
+                raw, ancdata, _, _ = self.sock.recvmsg(CAN_FRAME.size, self._ancbufsize)
+            except BlockingIOError:
+                break
+            can_id, dlc, data = CAN_FRAME.unpack(raw)
+            timestamp = None
+            for level, kind, value in ancdata:
+                if level == socket.SOL_SOCKET and kind == SO_TIMESTAMP:
+                    seconds, micros = TIMEVAL.unpack(value[:TIMEVAL.size])
+                    timestamp = seconds + micros / 1e6
+                elif level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                    self.kernel_dropped = struct.unpack('=I', value[:4])[0]  # Soket ömrü boyunca toplam
+            if can_id & CAN_ERR_FLAG:
+                self.errors += 1
+                continue
+            arbitration_id = can_id & CAN_EFF_MASK if can_id & CAN_EFF_FLAG else can_id & 0x7FF
+            frames[count] = (timestamp or time.time(), arbitration_id, min(dlc, 8), np.frombuffer(data, np.uint8))
+            count += 1
+        self.received += count
+        self.batches += 1
+        return frames[:count].copy()
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'delivered': self.received,
+            'dropped': self.kernel_dropped,
+            'errors': self.errors,
+            'pending': 0,
+            'batches': self.batches,
+            'avg_batch': round(self.received / self.batches, 1) if self.batches else 0.0,
+        }
+
+    def shutdown(self):
+        self.sock.close()
+
+
+def create_receiver(channel='vcan0', interface='socketcan', raw=False, max_batch=MAX_BATCH):
+    """Komut satırı seçeneklerinden alıcı kurar (raw: yalnızca socketcan)."""
+    if raw:
+        if interface != 'socketcan':
+            raise ValueError("--raw yalnızca socketcan arayüzüyle kullanılabilir")
+        return SocketCANReceiver(channel, max_batch=max_batch)
+    return NotifierReceiver(can.Bus(channel=channel, interface=interface), max_batch=max_batch)
+
+
+def benchmark(receiver, tx_bus, n_frames, send_batch=1000):
+    """tx_bus'tan n_frames gönderir, alıcıdan toplu okur; saniyede çerçeve ve kayıpları raporlar."""
+    messages = [can.Message(arbitration_id=0x100 + i % 0x500, data=bytes([i & 0xFF] * 8), is_extended_id=False)
+                for i in range(send_batch)]
+
+    def send():
+        for i in range(n_frames):
+            tx_bus.send(messages[i % send_batch])
+
+    sender = threading.Thread(target=send, daemon=True)
+    started = time.perf_counter()
+    sender.start()
+    got = 0
+    idle = 0
+    while got < n_frames and idle < 3:
+        batch = receiver.recv_batch(timeout=0.5)
+        got += len(batch)
+        idle = 0 if len(batch) else idle + 1
+    elapsed = time.perf_counter() - started
+    sender.join()
+    return {'frames': got, 'seconds': round(elapsed, 3), 'frames_per_second': round(got / elapsed),
+            **receiver.stats()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Toplu CAN alıcısı hız ölçümü')
+    parser.add_argument('--channel', default='bench')
+    parser.add_argument('--interface', default='virtual', help="python-can arayüzü ('virtual': donanımsız)")
+    parser.add_argument('--raw', action='store_true', help='Ham SocketCAN soketi (socketcan arayüzü)')
+    parser.add_argument('--frames', type=int, default=200000)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    args = parser.parse_args()
+
+    receiver = create_receiver(args.channel, args.interface, args.raw, args.max_batch)
+    tx_bus = can.Bus(channel=args.channel, interface=args.interface)
+    try:
+        print(benchmark(receiver, tx_bus, args.frames))
+    finally:
+        receiver.shutdown()
+        tx_bus.shutdown()
@@ -0,0 +1,378 @@
+"""
+CAN İz Oynatıcı / Trafik Üreteci
+================================
+traffic_blaster.py sabit 20 Hz rastgele çerçeve üretir; dedektörlerin tavanını
+ölçmeye yetmez. Bu araç bir çerçeve dizisini python-can veriyoluna (virtual,
+vcan0, can0) oynatır ve ulaşılan hızı raporlar.
+
+Kaynaklar:
+- --candump: candump -l günlüğü ("(1436509052.249713) vcan0 244#0000000003").
+  8 hane kimlik genişletilmiş (29 bit), "123#R" uzak (RTR) çerçeve olarak
+  gönderilir; CAN FD satırları ("123##1AABB...") klasik veriyoluna
+  gönderilemeyeceği için atlanır ve sayısı yazdırılır.
+- --labeled-csv: ids_guvenlik_parsed_labeled.csv ID/karar dizisi (saniye
+  çözünürlüklü zamanlar saniye içine eşit dağıtılır)
+- --generate N: traffic_blaster.py normal trafiği (0x300, rastgele 8 bayt) 1 kHz
+
+Saldırı enjeksiyonu (toplam çerçeve oranı olarak): --firmware (0x9FF),
+--pivot (0x001-0x0FF), --short-dlc (0x300, DLC 4). --truth her çerçevenin
+beklenen kararını (ids_log_writer karar kodu) CSV'ye yazar.
+
+Hız: --speed 1 orijinal zamanlama, --speed 10 on kat hızlı, --speed 0 olabildiğince hızlı.
+--max-gap S, günlükteki S saniyeden uzun sessizlikleri S'ye kısaltır (birleştirilmiş oturumlar).
+
+--with-detector live_ids_detector.run'ı aynı süreçte, aynı veriyoluna bağlı
+çalıştırır ('virtual' arayüzü süreçler arası değildir) ve dedektörün işlediği
+çerçeve/s'yi, kayıpları ve --truth'a göre karar doğruluğunu raporlar. Dedektörün
+binary logu --detector-log ile verilen yola yazılır; verilmezse geçici bir dizine
+yazılır ve çalışma sonunda silinir.
+
+Örnek:
+    python can_replay.py --labeled-csv ids_guvenlik_parsed_labeled.csv --speed 0 --loops 20
+    python can_replay.py --labeled-csv ids_guvenlik_parsed_labeled.csv --speed 10 --max-gap 1
+    python can_replay.py --generate 100000 --pivot 0.05 --firmware 0.01 --speed 0 --interface virtual
+    python can_replay.py --candump trace.log --speed 1 --channel vcan0 --interface socketcan
+    python can_replay.py --generate 200000 --pivot 0.02 --speed 0 --interface virtual --with-detector
+"""
+
+import argparse
+import csv
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+import can
+import numpy as np
+
+from can_receiver import CAN_EFF_FLAG, CAN_EFF_MASK, CAN_RTR_FLAG, FRAME_DTYPE, NotifierReceiver
+from ids_log_writer import (AsyncLogWriter, VERDICT_CODES, THREAT_FIRMWARE, THREAT_FUZZING, THREAT_LATERAL,
+                            read_binary_log)
+
+# Tüm satır eşleşmeli: 3 hane standart / 8 hane genişletilmiş kimlik; '#R[dlc]' RTR, '##<bayrak><veri>' CAN FD,
+# '_<dlc>' klasik çerçevede 8'den büyük DLC kodu; sondaki alanlar (candump -x 'R'/'T') yok sayılır
+CANDUMP_LINE = re.compile(
+    r'\((?P<ts>\d+(?:\.\d+)?)\)\s+\S+\s+(?P<id>[0-9A-Fa-f]{3}|[0-9A-Fa-f]{8})#'
+    r'(?:R(?P<rtr_dlc>[0-8])?|(?P<fd>#[0-9A-Fa-f])?(?P<data>(?:[0-9A-Fa-f]{2})*)(?:_[0-9A-Fa-f])?)(?:\s+\S+)*')
+GENERATE_RATE = 1000.0   # --generate: çerçeve/s
+SPIN_THRESHOLD = 0.001   # Bundan kısa beklemeler uyunmadan geçilir (sleep çözünürlüğü)
+
+# ids_guvenlik_parsed_labeled.csv 'detail' -> beklenen karar
+LABELED_THREATS = {
+    'Firmware Enjeksiyonu': THREAT_FIRMWARE,
+    'Yan Hareket / Ağ Keşfi': THREAT_LATERAL,
+    'TLS Downgrade / Fuzzing': THREAT_FUZZING,
+}
+
+
+def frame_array(timestamps, arbitration_ids, dlcs, payloads):
+    frames = np.zeros(len(timestamps), dtype=FRAME_DTYPE)
+    frames['timestamp'] = timestamps
+    frames['arbitration_id'] = arbitration_ids
+    frames['dlc'] = dlcs
+    frames['data'] = payloads
+    return frames
+
+
+def read_candump(path):
+    """
+    candump -l günlüğü -> (çerçeveler, kararlar). Kararlar bilinmez (0 = NORMAL).
+    Genişletilmiş kimlik ve RTR, arbitration_id'de SocketCAN bayrak bitleriyle
+    (CAN_EFF_FLAG, CAN_RTR_FLAG) taşınır; to_messages() bunları çözer.
+    """
+    timestamps, ids, dlcs, payloads = [], [], [], []
+    fd_skipped = 0
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = CANDUMP_LINE.fullmatch(line.strip())
+            if not match:
+                continue
+            if match['fd']:
+                fd_skipped += 1
+                continue
+            arbitration_id = int(match['id'], 16)
+            if len(match['id']) == 8:
+                if arbitration_id > CAN_EFF_MASK:
+                    continue  # Hata çerçevesi (CAN_ERR_FLAG) vb.
+                arbitration_id |= CAN_EFF_FLAG
+            if match['data'] is None:
+                arbitration_id |= CAN_RTR_FLAG
+                data = b''
+                dlcs.append(int(match['rtr_dlc'] or 0))
+            else:
+                data = bytes.fromhex(match['data'])
+                if len(data) > 8:
+                    continue  # Klasik çerçeve 8 bayttan uzun olamaz
+                dlcs.append(len(data))
+            timestamps.append(float(match['ts']))
+            ids.append(arbitration_id)
+            payloads.append(data.ljust(8, b'\0'))
+    if fd_skipped:
+        print(f"{path}: {fd_skipped} CAN FD çerçevesi atlandı (klasik veriyoluna gönderilemez)")
+    payloads = np.frombuffer(b''.join(payloads), dtype=np.uint8).reshape(-1, 8)
+    frames = frame_array(timestamps, ids, dlcs, payloads)
+    return frames, np.zeros(len(frames), dtype=np.uint8)
+
+
+def read_labeled_csv(path, rng):
+    """
+    ids_guvenlik_parsed_labeled.csv -> (çerçeveler, kararlar). Yalnızca ID'si olan
+    CAN satırları alınır; yükler live_ids_detector kurallarını tetikleyecek şekilde
+    traffic_blaster.py'deki gibi üretilir.
+    """
+    seconds, ids, verdicts = [], [], []
+    with open(path, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                arbitration_id = int(row['id'], 16)
+                second = time.mktime(time.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S'))
+            except (KeyError, TypeError, ValueError):
+                continue
+            seconds.append(second)
+            ids.append(arbitration_id)
+            verdicts.append(VERDICT_CODES[LABELED_THREATS.get(row.get('detail'))])
+    seconds = np.array(seconds)
+    verdicts = np.array(verdicts, dtype=np.uint8)
+
+    # Aynı saniyedeki satırlar saniyenin içine eşit aralıklarla yayılır
+    starts = np.r_[0, np.flatnonzero(np.diff(seconds)) + 1]
+    sizes = np.diff(np.r_[starts, len(seconds)])
+    offsets = np.arange(len(seconds)) - np.repeat(starts, sizes)
+    timestamps = seconds + offsets / np.repeat(sizes, sizes)
+
+    fuzzing = verdicts == VERDICT_CODES[THREAT_FUZZING]
+    dlcs = np.where(fuzzing, 4, 8)
+    payloads = rng.integers(0, 256, (len(ids), 8), dtype=np.uint8)
+    payloads[verdicts == VERDICT_CODES[THREAT_FIRMWARE]] = [0xDE, 0xAD, 0xBE, 0xEF, 0, 0, 0, 0]
+    payloads[verdicts == VERDICT_CODES[THREAT_LATERAL]] = 1
+    payloads[fuzzing] = [0xAA, 0xBB, 0xCC, 0xDD, 0, 0, 0, 0]
+    return frame_array(timestamps, ids, dlcs, payloads), verdicts
+
+
+def generate_normal(n_frames, rng, rate=GENERATE_RATE):
+    """traffic_blaster.py normal trafiği: 0x300, rastgele 8 bayt."""
+    timestamps = time.time() + np.arange(n_frames) / rate
+    payloads = rng.integers(0, 256, (n_frames, 8), dtype=np.uint8)
+    return frame_array(timestamps, np.full(n_frames, 0x300), np.full(n_frames, 8), payloads), \
+        np.zeros(n_frames, dtype=np.uint8)
+
+
+def inject_attacks(frames, verdicts, rng, firmware=0.0, pivot=0.0, short_dlc=0.0):
+    """
+    Saldırı çerçevelerini rastgele konumlara ekler; oranlar sonuçtaki toplam çerçeve
+    sayısına göredir. Eklenen çerçeve, önündeki çerçeveyle aynı zamanı alır.
+    """
+    total_ratio = firmware + pivot + short_dlc
+    if total_ratio <= 0 or not len(frames):
+        return frames, verdicts
+    if total_ratio >= 1:
+        raise ValueError("Saldırı oranlarının toplamı 1'den küçük olmalı")
+    n_total = int(round(len(frames) / (1 - total_ratio)))
+    counts = [int(round(n_total * r)) for r in (firmware, pivot, short_dlc)]
+    n_attacks = sum(counts)
+
+    kinds = np.repeat(np.arange(3), counts)
+    attack_ids = np.where(kinds == 0, 0x9FF, np.where(kinds == 1, rng.integers(0x001, 0x100, n_attacks), 0x300))
+    payloads = np.zeros((n_attacks, 8), dtype=np.uint8)
+    payloads[kinds == 0] = [0xDE, 0xAD, 0xBE, 0xEF, 0, 0, 0, 0]
+    payloads[kinds == 1] = 1
+    payloads[kinds == 2] = [0xAA, 0xBB, 0xCC, 0xDD, 0, 0, 0, 0]
+    positions = rng.integers(0, len(frames), n_attacks)
+    attacks = frame_array(frames['timestamp'][positions], attack_ids, np.where(kinds == 2, 4, 8), payloads)
+    codes = np.array([VERDICT_CODES[THREAT_FIRMWARE], VERDICT_CODES[THREAT_LATERAL],
+                      VERDICT_CODES[THREAT_FUZZING]], dtype=np.uint8)[kinds]
+
+    # Kararlı sıralama: eklenen çerçeve aynı zamanlı orijinalin arkasına düşer
+    merged = np.concatenate([frames, attacks])
+    merged_verdicts = np.concatenate([verdicts, codes])
+    order = np.argsort(merged['timestamp'], kind='stable')
+    return merged[order], merged_verdicts[order]
+
+
+def to_messages(frames):
+    """
+    Gönderimden önce bir kez: FRAME_DTYPE -> can.Message listesi (döngüde dönüşüm yok).
+    CAN_EFF_FLAG / CAN_RTR_FLAG bitleri (read_candump) mesaj bayraklarına çevrilir;
+    bayraksız kimlik 0x7FF'ten büyükse genişletilmiş kabul edilir.
+    """
+    messages = []
+    for raw_id, dlc, data in zip(frames['arbitration_id'].tolist(), frames['dlc'].tolist(), frames['data']):
+        arbitration_id = raw_id & CAN_EFF_MASK
+        remote = bool(raw_id & CAN_RTR_FLAG)
+        messages.append(can.Message(arbitration_id=arbitration_id,
+                                    is_extended_id=bool(raw_id & CAN_EFF_FLAG) or arbitration_id > 0x7FF,
+                                    is_remote_frame=remote, dlc=dlc, data=b'' if remote else bytes(data[:dlc])))
+    return messages
+
+
+def replay(bus, frames, speed=1.0, loops=1, messages=None, max_gap=None):
+    """
+    Çerçeveleri bus'a gönderir. speed: 1 orijinal zamanlama, N kat hızlı, 0 bekleme yok.
+    Gönderim zamanı hedefin gerisinde kalırsa beklenmez (yetişmeye çalışılır) ve gecikme raporlanır.
+    max_gap: çerçeveler arası en uzun bekleme (saniye, hızlandırmadan önce).
+    """
+    messages = messages or to_messages(frames)
+    gaps = np.diff(frames['timestamp'], prepend=frames['timestamp'][:1])
+    if max_gap is not None:
+        gaps = np.minimum(gaps, max_gap)
+    offsets = np.cumsum(np.maximum(gaps, 0.0))
+    span = float(offsets[-1]) if len(offsets) else 0.0
+    schedule = (offsets / speed).tolist() if speed > 0 else None
+    loop_span = span / speed if speed > 0 else 0.0
+
+    sent = send_errors = 0
+    max_lag = 0.0
+    started = time.perf_counter()
+    for loop in range(loops):
+        loop_start = loop * loop_span
+        for i, message in enumerate(messages):
+            if schedule is not None:
+                target = loop_start + schedule[i]
+                delay = target - (time.perf_counter() - started)
+                if delay > SPIN_THRESHOLD:
+                    time.sleep(delay)
+                elif delay < 0:
+                    max_lag = max(max_lag, -delay)
+            try:
+                bus.send(message)
+                sent += 1
+            except can.CanError:
+                # vcan/can0 gönderim kuyruğu dolu (ENOBUFS): çerçeve kaybolur, sayılır
+                send_errors += 1
+    elapsed = time.perf_counter() - started
+    return {
+        'frames_sent': sent,
+        'send_errors': send_errors,
+        'seconds': round(elapsed, 3),
+        'frames_per_second': round(sent / elapsed) if elapsed else None,
+        'target_frames_per_second': round(len(frames) / span * speed) if speed > 0 and span else None,
+        'max_lag_ms': round(max_lag * 1000, 2),
+    }
+
+
+def start_detector(channel, interface, log_path, features=None):
+    """live_ids_detector.run'ı arka plan iş parçacığında başlatır; (alıcı, log yazıcı, eğitici) döndürür."""
+    from live_ids_detector import BackgroundRefitter, run
+
+    receiver = NotifierReceiver(can.Bus(channel=channel, interface=interface))
+    log_writer = AsyncLogWriter(log_path, fmt='binary', max_bytes=0)
+    refitter = BackgroundRefitter()
+    threading.Thread(target=run, args=(receiver, refitter, log_writer),
+                     kwargs={'stats_interval': float('inf'), 'feature_engine': features}, daemon=True).start()
+    return receiver, log_writer, refitter
+
+
+def wait_for_detector(receiver, expected, started, idle_timeout=2.0):
+    """Dedektör `expected` çerçeveyi işleyene (ya da idle_timeout boyunca ilerlemeyene) kadar bekler."""
+    last, last_change = -1, time.perf_counter()
+    while True:
+        stats = receiver.stats()
+        done = stats['delivered'] + stats['dropped']
+        if done >= expected and not stats['pending']:
+            break
+        if done != last:
+            last, last_change = done, time.perf_counter()
+        elif time.perf_counter() - last_change > idle_timeout:
+            break
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    return {'frames_processed': stats['delivered'], 'dropped': stats['dropped'], 'seconds': round(elapsed, 3),
+            'frames_per_second': round(stats['delivered'] / elapsed) if elapsed else None,
+            'avg_batch': stats['avg_batch']}
+
+
+def verdict_accuracy(log_path, verdicts, loops):
+    """Dedektörün binary logundaki kararları beklenenlerle sırayla karşılaştırır (kayıp yoksa anlamlı)."""
+    logged = read_binary_log(log_path)['verdict']
+    expected = np.tile(verdicts, loops)[:len(logged)]
+    return {'logged': len(logged), 'accuracy': round(float((logged == expected).mean()), 4) if len(logged) else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CAN iz oynatıcı / trafik üreteci')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--candump', help='candump -l günlüğü')
+    source.add_argument('--labeled-csv', help='ids_guvenlik_parsed_labeled.csv')
+    source.add_argument('--generate', type=int, metavar='N', help='N normal çerçeve üret')
+    parser.add_argument('--firmware', type=float, default=0.0, help='0x9FF firmware enjeksiyonu oranı')
+    parser.add_argument('--pivot', type=float, default=0.0, help='<0x100 yan hareket oranı')
+    parser.add_argument('--short-dlc', type=float, default=0.0, help='DLC 4 fuzzing oranı')
+    parser.add_argument('--speed', type=float, default=1.0, help='1: orijinal, N: N kat, 0: olabildiğince hızlı')
+    parser.add_argument('--max-gap', type=float, help='Saniye: daha uzun sessizlikler bu süreye kısaltılır')
+    parser.add_argument('--loops', type=int, default=1)
+    parser.add_argument('--channel', default='vcan0')
+    parser.add_argument('--interface', default='socketcan', help="python-can arayüzü ('virtual': donanımsız)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--truth', help='Beklenen kararları CSV olarak yaz (timestamp,arbitration_id,dlc,verdict)')
+    parser.add_argument('--with-detector', action='store_true',
+                        help='live_ids_detector.run aynı süreçte dinlesin; dedektör hızını raporla')
+    parser.add_argument('--detector-features', choices=('basic', 'window'), default='basic')
+    parser.add_argument('--detector-log', help='Dedektörün binary logunu bu yolda bırak (varsayılan: geçici, silinir)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.candump:
+        frames, verdicts = read_candump(args.candump)
+    elif args.labeled_csv:
+        frames, verdicts = read_labeled_csv(args.labeled_csv, rng)
+    else:
+        frames, verdicts = generate_normal(args.generate, rng)
+    frames, verdicts = inject_attacks(frames, verdicts, rng, args.firmware, args.pivot, args.short_dlc)
+    if not len(frames):
+        parser.error("Oynatılacak çerçeve yok")
+
+    attacks = int((verdicts != 0).sum())
+    print(f"{len(frames)} çerçeve ({attacks} saldırı) x {args.loops} tur -> {args.interface}:{args.channel}")
+    if args.truth:
+        with open(args.truth, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'arbitration_id', 'dlc', 'verdict'])
+            writer.writerows(zip(frames['timestamp'].tolist(), map(hex, (frames['arbitration_id'] & CAN_EFF_MASK).tolist()),
+                                 frames['dlc'].tolist(), verdicts.tolist()))
+
+    detector = None
+    temp_dir = None
+    if args.with_detector:
+        from can_window_features import CANWindowFeatures
+
+        if args.detector_log:
+            log_path = args.detector_log
+        else:
+            temp_dir = tempfile.mkdtemp(prefix='can_replay_')
+            log_path = os.path.join(temp_dir, 'ids_guvenlik_logu.bin')
+        features = CANWindowFeatures() if args.detector_features == 'window' else None
+        detector = start_detector(args.channel, args.interface, log_path, features)
+
+    messages = to_messages(frames)
+    bus = can.Bus(channel=args.channel, interface=args.interface)
+    try:
+        started = time.perf_counter()
+        report = replay(bus, frames, args.speed, args.loops, messages=messages, max_gap=args.max_gap)
+        print(f"Gönderim: {report}")
+        if detector is not None:
+            receiver, log_writer, refitter = detector
+            print(f"Dedektör: {wait_for_detector(receiver, report['frames_sent'], started)}")
+            detector = None
+            refitter.shutdown()
+            receiver.shutdown()
+            log_writer.close()
+            accuracy = verdict_accuracy(log_path, verdicts, args.loops)
+            print(f"Kararlar: {accuracy}" + ("" if temp_dir else f" ({log_path})"))
+    except KeyboardInterrupt:
+        print("Durduruldu.")
+    finally:
+        bus.shutdown()
+        if detector is not None:
+            # Kesildi: dedektör henüz durdurulmadı
+            receiver, log_writer, refitter = detector
+            refitter.shutdown()
+            receiver.shutdown()
+            log_writer.close()
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
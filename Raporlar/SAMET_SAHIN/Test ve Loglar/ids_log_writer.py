@@ -0,0 +1,230 @@
+"""
+IDS Log Yazıcısı (arka plan, tamponlu)
+======================================
+live_ids_detector.py her çerçevede log dosyasını açıp kapatıyordu. Burada alım
+döngüsü yalnızca sınırlı bir kuyruğa kayıt bırakır (diske hiç beklemez; kuyruk
+doluysa kayıt düşürülür ve sayılır). Yazıcı iş parçacığı kayıtları biçimlendirir,
+toplu yazar ve dosyayı açık tutar:
+
+- Flush: tampon FLUSH_BYTES'ı aşınca veya en geç FLUSH_INTERVAL saniyede bir.
+- Döndürme: dosya MAX_BYTES'ı aşacaksa log -> log.1 -> log.2 ... (BACKUP_COUNT adet,
+  logging.handlers.RotatingFileHandler ile aynı adlandırma). Ad değiştirilemezse
+  mevcut dosyaya yazmaya devam edilir, ROTATE_RETRY saniye sonra yeniden denenir.
+- Biçim: 'text' (ids_guvenlik_logu.txt satırları, LogIz'e yüklenebilir) veya
+  'binary' (14 baytlık kayıt: zaman, arbitration id, dlc, karar kodu).
+
+Binary logu metne çevirme:
+    python ids_log_writer.py ids_guvenlik_logu.bin > ids_guvenlik_logu.txt
+"""
+
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Karar sözlüğü: binary kayıttaki karar kodu bu demetteki sıradır (0 = NORMAL)
+THREAT_FIRMWARE = "KRITIK: Firmware Enjeksiyonu"
+THREAT_LATERAL = "UYARI: Yan Hareket / Ağ Keşfi"
+THREAT_OFF_HOURS = "ANOMALI: Zaman Bazlı Yetkisiz Erişim"
+THREAT_FUZZING = "TEHDIT: TLS Downgrade / Fuzzing"
+VERDICTS = (None, THREAT_FIRMWARE, THREAT_LATERAL, THREAT_OFF_HOURS, THREAT_FUZZING)
+VERDICT_CODES = {threat: code for code, threat in enumerate(VERDICTS)}
+
+MAX_QUEUE = 100000
+FLUSH_INTERVAL = 0.5             # Saniye
+FLUSH_BYTES = 256 * 1024
+MAX_BYTES = 50 * 1024 * 1024     # Döndürme eşiği (0: döndürme yok)
+BACKUP_COUNT = 5
+ROTATE_RETRY = 30.0              # Saniye; başarısız döndürmeden sonra yeniden deneme aralığı
+CLOSE_TIMEOUT = 10.0             # Saniye; close() yazıcıyı en fazla bu kadar bekler
+
+BINARY_MAGIC = b'IDSLOG\x01\x00'
+BINARY_RECORD = struct.Struct('<dIBB')  # zaman (epoch s), arbitration id, dlc, karar kodu
+RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('arbitration_id', '<u4'), ('dlc', 'u1'), ('verdict', 'u1')])
+
+_STOP = object()
+
+
+def format_text(timestamp, arbitration_id, threat):
+    """ids_guvenlik_logu.txt satırı (live_ids_detector.py'nin eski biçimiyle aynı)."""
+    ts = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    if threat:
+        return f"[{ts}] [SALDIRI] {threat} | Aksiyon: Bloklandı | ID: {hex(arbitration_id)}\n"
+    return f"[{ts}] [NORMAL] Trafik Akışı Temiz | Durum: OK | ID: {hex(arbitration_id)}\n"
+
+
+class AsyncLogWriter:
+    """Sınırlı kuyruk + yazıcı iş parçacığı. write() hiçbir zaman diske beklemez."""
+
+    def __init__(self, path, fmt='text', max_queue=MAX_QUEUE, flush_interval=FLUSH_INTERVAL,
+                 flush_bytes=FLUSH_BYTES, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        if fmt not in ('text', 'binary'):
+            raise ValueError("fmt 'text' veya 'binary' olmalı")
+        self.path = path
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._rotate_after = 0.0         # monotonic; başarısız döndürmeden sonra bekleme
+
+        # Sayaçlar
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+        self._open()
+        self._thread = threading.Thread(target=self._run, name='ids-log-writer', daemon=True)
+        self._thread.start()
+
+    # ---------- Alım döngüsü tarafı ----------
+    def write(self, timestamp, arbitration_id, dlc, threat=None):
+        """Kaydı kuyruğa bırakır. Kuyruk doluysa kayıt düşürülür (False)."""
+        try:
+            self._queue.put_nowait((timestamp, arbitration_id, dlc, threat))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Kuyruktaki her şeyi yazar ve dosyayı kapatır. Yazıcı yanıt vermezse timeout sonunda döner."""
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print(f"Log yazıcısı kapanmadı ({self.path}): kuyruk dolu", file=sys.stderr)
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"Log yazıcısı {timeout} sn içinde bitmedi ({self.path})", file=sys.stderr)
+
+    def stats(self):
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'queued': self._queue.qsize(),
+            'flushes': self.flushes,
+            'rotations': self.rotations,
+            'write_errors': self.write_errors,
+        }
+
+    # ---------- Yazıcı iş parçacığı ----------
+    def _encode(self, record):
+        timestamp, arbitration_id, dlc, threat = record
+        if self.fmt == 'binary':
+            return BINARY_RECORD.pack(timestamp, arbitration_id, dlc, VERDICT_CODES.get(threat, 255))
+        return format_text(timestamp, arbitration_id, threat).encode('utf-8')
+
+    def _open(self):
+        self._file = open(self.path, 'ab')
+        if self.fmt == 'binary' and self._file.tell() == 0:
+            self._file.write(BINARY_MAGIC)
+
+    def _rotate(self):
+        self._file.close()
+        try:
+            if self.backup_count > 0:
+                for index in range(self.backup_count - 1, 0, -1):
+                    source = f"{self.path}.{index}"
+                    if os.path.exists(source):
+                        os.replace(source, f"{self.path}.{index + 1}")
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+            self.rotations += 1
+        except OSError as e:
+            # Ad değiştirilemezse (ör. Windows'ta dosyayı başka süreç okurken) mevcut dosyaya eklemeye devam edilir
+            self.write_errors += 1
+            self._rotate_after = time.monotonic() + ROTATE_RETRY
+            print(f"Log döndürülemedi ({self.path}): {e}", file=sys.stderr)
+        finally:
+            self._open()
+
+    def _flush(self, pending, count):
+        data = b''.join(pending)
+        header = len(BINARY_MAGIC) if self.fmt == 'binary' else 0
+        try:
+            if self._file.closed:
+                self._open()  # Önceki döndürmede yeniden açılamadıysa tekrar denenir
+            size = self._file.tell()
+            # Eşikten büyük tek bir tampon boş dosyaya yine de yazılır
+            if (self.max_bytes and size + len(data) > self.max_bytes and size > header
+                    and time.monotonic() >= self._rotate_after):
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self.written += count
+        except (OSError, ValueError) as e:
+            # Disk hatası yazıcı iş parçacığını durdurmaz; bu tampon kaybolur
+            self.write_errors += 1
+            print(f"Log yazılamadı ({self.path}): {e}", file=sys.stderr)
+        self.flushes += 1
+
+    def _run(self):
+        pending, pending_bytes, count = [], 0, 0
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush)) if pending else None
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+
+            stop = record is _STOP
+            if record is not None and not stop:
+                try:
+                    encoded = self._encode(record)
+                except (struct.error, ValueError, OverflowError, OSError) as e:
+                    # Biçimlendirilemeyen kayıt (ör. aralık dışı zaman / ID) atlanır, iş parçacığı sürer
+                    self.write_errors += 1
+                    print(f"Log kaydı atlandı ({self.path}): {e}", file=sys.stderr)
+                else:
+                    pending.append(encoded)
+                    pending_bytes += len(encoded)
+                    count += 1
+
+            if pending and (stop or pending_bytes >= self.flush_bytes
+                            or time.monotonic() - last_flush >= self.flush_interval):
+                self._flush(pending, count)
+                pending, pending_bytes, count = [], 0, 0
+                last_flush = time.monotonic()
+            elif not pending:
+                last_flush = time.monotonic()
+
+            if stop:
+                self._file.close()
+                return
+
+
+def read_binary_log(path):
+    """Binary logu NumPy kayıt dizisi olarak okur (timestamp, arbitration_id, dlc, verdict)."""
+    with open(path, 'rb') as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{path}: IDS binary logu değil")
+        data = f.read()
+    usable = len(data) - len(data) % RECORD_DTYPE.itemsize  # Yarım kalan son kayıt atlanır
+    return np.frombuffer(data[:usable], dtype=RECORD_DTYPE)
+
+
+def iter_text_lines(path):
+    """Binary logu ids_guvenlik_logu.txt satırlarına çevirir."""
+    for timestamp, arbitration_id, _, verdict in read_binary_log(path).tolist():
+        threat = VERDICTS[verdict] if verdict < len(VERDICTS) else f"KOD {verdict}"
+        yield format_text(timestamp, arbitration_id, threat)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Kullanım: python ids_log_writer.py ids_guvenlik_logu.bin > ids_guvenlik_logu.txt")
+        sys.exit(1)
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stdout.writelines(iter_text_lines(sys.argv[1]))
@@ -1,75 +1,272 @@
-import can
+"""
+Canlı CAN IDS Dedektörü
+=======================
+vcan0'dan gelen çerçeveleri kurallarla sınıflandırır ve ids_guvenlik_logu.txt'ye yazar.
+
+IsolationForest modeli son WINDOW_SIZE çerçevenin (arbitration_id, dlc) penceresiyle
+yeniden eğitilir. Eğitim alım döngüsünde değil, ayrı bir süreçte yapılır: döngü
+pencerenin kopyasını gönderir ve hemen bus.recv()'e döner; eğitilen model hazır
+olunca tek bir atamayla (atomik) devreye alınır. Yeniden eğitim mesaj sayısına
+göre değil, süreye (--refit-interval) veya kaymaya (--drift-ratio: son eğitimden
+beri gelen çerçevelerin ne kadarının modelin hiç görmediği ID'lerden oluştuğu)
+göre tetiklenir.
+
+--features window ile model [arbitration_id, dlc] yerine can_window_features'ın
+ID başına zamanlama/frekans/yük özellikleriyle eğitilir (çerçeve başına O(1)).
+
+Çerçeveler can_receiver ile arka planda okunur ve döngüye toplu verilir
+(python-can Notifier veya --raw ile ham SocketCAN); yetişilemeyen çerçeveler
+düşürülüp sayılır. --interface virtual ile vcan olmadan çalışır.
+
+Loglar ids_log_writer.AsyncLogWriter ile arka planda, toplu ve döndürülerek
+yazılır; alım döngüsü diske hiç beklemez (--log-format binary: 14 baytlık kayıt).
+
+Kullanım:
+    python live_ids_detector.py
+    python live_ids_detector.py --refit-interval 10 --drift-ratio 0.1
+    python live_ids_detector.py --log-format binary --log-max-mb 200
+    python live_ids_detector.py --features window
+"""
+
+import argparse
+import multiprocessing
 import time
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.ensemble import IsolationForest
 from collections import deque
 from datetime import datetime
-import random # Normal logları biraz azaltmak için (isteğe bağlı)
+
+import numpy as np
+
+from can_receiver import MAX_BATCH, create_receiver
+from can_window_features import CANWindowFeatures
+from ids_log_writer import (AsyncLogWriter, BACKUP_COUNT, MAX_BYTES, THREAT_FIRMWARE, THREAT_FUZZING,
+                            THREAT_LATERAL, THREAT_OFF_HOURS)
 
 # --- AYARLAR ---
-data_buffer = deque(maxlen=300)
-model = IsolationForest(contamination=0.05, random_state=42)
+WINDOW_SIZE = 300          # Eğitim penceresi (son N çerçeve)
+MIN_TRAIN_SAMPLES = 50     # İlk eğitim için gereken çerçeve sayısı
+REFIT_INTERVAL = 30.0      # Saniye: en geç bu aralıkla yeniden eğit
+DRIFT_RATIO = 0.2          # Son eğitimden beri gelen çerçevelerin bu oranı yeni ID ise hemen eğit
+DRIFT_MIN_FRAMES = 50      # Kayma oranı en az bu kadar çerçeve üzerinden hesaplanır
+STATS_INTERVAL = 60.0      # Saniye: sayaç özeti
+MODEL_PARAMS = {'contamination': 0.05, 'random_state': 42}
 LOG_FILE = "ids_guvenlik_logu.txt"
-counter = 0 
+BINARY_LOG_FILE = "ids_guvenlik_logu.bin"
+# Eğitim süreci çok iş parçacıklı süreçten (Notifier, log yazıcısı) fork edilmez: fork kilitleri kopyalayıp
+# çocuğu kilitleyebilir. forkserver temiz bir sunucu süreçten çatallar (Windows'ta yalnızca spawn var).
+REFIT_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
 
-try:
-    bus = can.Bus(channel='vcan0', interface='socketcan')
-    print("--- DEDEKTİF (VERİ TOPLAMA MODU): NORMAL + SALDIRI ---")
-except OSError:
-    print("HATA: vcan0 arayüzü bulunamadı!")
-    exit(1)
 
-try:
-    while True:
-        msg = bus.recv()
-        if msg is None: continue
-        
-        counter += 1
-        features = [[msg.arbitration_id, msg.dlc]]
-        
-        # Modeli eğit
-        if len(data_buffer) >= 50 and counter % 50 == 0:
-            model.fit(list(data_buffer))
-
-        # --- TESPİT MANTIĞI ---
-        threat = None
-        log_type = "NORMAL" # Varsayılan durum
-        hour = datetime.now().hour
-
-        # Saldırı Kontrolleri
-        if msg.arbitration_id == 0x9FF:
-            threat = "KRITIK: Firmware Enjeksiyonu"
-        elif msg.arbitration_id < 0x100:
-            threat = "UYARI: Yan Hareket / Ağ Keşfi"
-        elif hour in [2, 3, 4]: 
-            threat = "ANOMALI: Zaman Bazlı Yetkisiz Erişim"
-        elif msg.dlc != 8:
-            threat = "TEHDIT: TLS Downgrade / Fuzzing"
-
-        # LOGLAMA KARARI
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        if threat:
-            # SALDIRI VARSA: Kesinlikle kaydet ve ekrana bas
-            log_type = "SALDIRI"
-            log_msg = f"[{ts}] [{log_type}] {threat} | Aksiyon: Bloklandı | ID: {hex(msg.arbitration_id)}\n"
-            print(f"\033[91m{log_msg.strip()}\033[0m") # Kırmızı Yazı
-            
-            with open(LOG_FILE, "a") as f:
-                f.write(log_msg)
-        
+def fit_model(window, params):
+    """Arka plan sürecinde çalışır: pencere kopyasıyla yeni bir model eğitir."""
+    started = time.perf_counter()
+    model = IsolationForest(**params).fit(window)
+    return model, time.perf_counter() - started
+
+
+class BackgroundRefitter:
+    """
+    Modeli ayrı bir süreçte yeniden eğitir ve hazır olunca devreye alır.
+
+    `active` (model, bilinen ID'ler, eğitim zamanı) üçlüsüdür ve yalnızca tek bir
+    atamayla değiştirilir: okuyan taraf her zaman tutarlı bir model + ID kümesi görür.
+    """
+
+    def __init__(self, params=MODEL_PARAMS, interval=REFIT_INTERVAL, drift_ratio=DRIFT_RATIO,
+                 drift_min_frames=DRIFT_MIN_FRAMES, min_samples=MIN_TRAIN_SAMPLES):
+        self.params = params
+        self.interval = interval
+        self.drift_ratio = drift_ratio
+        self.drift_min_frames = drift_min_frames
+        self.min_samples = min_samples
+        self.active = None
+        self.running = False
+        self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context(REFIT_START_METHOD))
+        self._last_request = 0.0
+        self._frames_since_fit = 0
+        self._unseen_since_fit = 0
+
+        # Sayaçlar
+        self.refits = 0
+        self.refit_failures = 0
+        self.refit_seconds_total = 0.0   # İstekten devreye almaya (kopya + süreçler arası aktarım dahil)
+        self.refit_seconds_max = 0.0
+        self.fit_seconds_total = 0.0     # Yalnızca IsolationForest.fit
+        self.frames_during_refit = 0     # Eğitim sürerken alınan çerçeveler
+        self.triggers = {'ilk': 0, 'zaman': 0, 'kayma': 0}
+
+    @property
+    def model(self):
+        active = self.active
+        return active[0] if active else None
+
+    def observe(self, arbitration_id):
+        """Alım döngüsünden her çerçevede çağrılır (yalnızca sayaç ve küme araması)."""
+        if self.running:
+            self.frames_during_refit += 1
+        self._frames_since_fit += 1
+        active = self.active
+        if active is not None and arbitration_id not in active[1]:
+            self._unseen_since_fit += 1
+
+    def _trigger(self, now):
+        if self.running:
+            return None
+        if self.active is None:
+            return 'ilk'
+        if now - self._last_request >= self.interval:
+            return 'zaman'
+        if (self._frames_since_fit >= self.drift_min_frames
+                and self._unseen_since_fit >= self.drift_ratio * self._frames_since_fit):
+            return 'kayma'
+        return None
+
+    def maybe_refit(self, window, now):
+        """Zamanı geldiyse pencerenin kopyasını arka plan sürecine gönderir (beklemez)."""
+        if len(window) < self.min_samples:
+            return
+        reason = self._trigger(now)
+        if reason is None:
+            return
+        # Kopya: alım döngüsü deque'ye yazmaya devam ederken eğitim sabit veriyle yapılır
+        snapshot = np.array(window, dtype=np.float64)
+        self.running = True
+        self._last_request = now
+        self._frames_since_fit = self._unseen_since_fit = 0
+        self.triggers[reason] += 1
+        requested = time.perf_counter()
+        future = self._pool.submit(fit_model, snapshot, self.params)
+        future.add_done_callback(lambda f: self._install(f, snapshot, requested))
+
+    def _install(self, future, snapshot, requested):
+        # Havuzun yönetim iş parçacığında çalışır
+        try:
+            model, fit_seconds = future.result()
+        except Exception as e:
+            self.refit_failures += 1
+            print(f"Model eğitimi başarısız: {e}")
         else:
-            # NORMAL VERİ: Veri seti dengesi için kaydet
-            # Disk şişmesin diye her normal paketi değil, %50'sini kaydedelim (Opsiyonel)
-            # Ama tam eğitim için hepsini açıyoruz:
-            log_msg = f"[{ts}] [NORMAL] Trafik Akışı Temiz | Durum: OK | ID: {hex(msg.arbitration_id)}\n"
-            # Ekrana basma (Terminal kirlenmesin), sadece dosyaya yaz
-            
-            with open(LOG_FILE, "a") as f:
-                f.write(log_msg)
-
-        data_buffer.append(features[0])
-
-except KeyboardInterrupt:
-    print("\nVeri Toplama Durduruldu.")
-finally:
-    bus.shutdown()
+            self.active = (model, frozenset(snapshot[:, 0].astype(np.int64).tolist()), time.time())
+            elapsed = time.perf_counter() - requested
+            self.refits += 1
+            self.refit_seconds_total += elapsed
+            self.refit_seconds_max = max(self.refit_seconds_max, elapsed)
+            self.fit_seconds_total += fit_seconds
+        finally:
+            self.running = False
+
+    def stats(self):
+        return {
+            'refits': self.refits,
+            'refit_failures': self.refit_failures,
+            'refit_seconds_avg': round(self.refit_seconds_total / self.refits, 4) if self.refits else None,
+            'refit_seconds_max': round(self.refit_seconds_max, 4),
+            'fit_seconds_total': round(self.fit_seconds_total, 4),
+            'frames_during_refit': self.frames_during_refit,
+            'triggers': dict(self.triggers),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run(receiver, refitter, log_writer, window_size=WINDOW_SIZE, stats_interval=STATS_INTERVAL, feature_engine=None):
+    """
+    receiver: can_receiver alıcısı (recv_batch() -> FRAME_DTYPE dizisi).
+    feature_engine: CANWindowFeatures (None: yalnızca [arbitration_id, dlc]).
+    """
+    data_buffer = deque(maxlen=window_size)
+    frames = 0
+    last_stats = time.monotonic()
+
+    while True:
+        batch = receiver.recv_batch(timeout=1.0)
+        now = time.monotonic()
+        if now - last_stats >= stats_interval:
+            print(f"[İSTATİSTİK] çerçeve={frames} alım={receiver.stats()} model={refitter.stats()} log={log_writer.stats()}")
+            last_stats = now
+        if not len(batch): continue
+
+        frames += len(batch)
+        # Modeli eğit (arka planda; döngü beklemez) - toplu parti başına bir kontrol
+        refitter.maybe_refit(data_buffer, now)
+
+        for timestamp, arbitration_id, dlc, data in batch.tolist():
+            if feature_engine is not None:
+                features = feature_engine.update(timestamp, arbitration_id, dlc, data)
+            else:
+                features = [arbitration_id, dlc]
+            refitter.observe(arbitration_id)
+
+            # --- TESPİT MANTIĞI ---
+            threat = None
+            hour = datetime.fromtimestamp(timestamp).hour
+
+            # Saldırı Kontrolleri
+            if arbitration_id == 0x9FF:
+                threat = THREAT_FIRMWARE
+            elif arbitration_id < 0x100:
+                threat = THREAT_LATERAL
+            elif hour in [2, 3, 4]:
+                threat = THREAT_OFF_HOURS
+            elif dlc != 8:
+                threat = THREAT_FUZZING
+
+            # LOGLAMA: normal ve saldırı çerçevelerinin hepsi (veri seti dengesi için) kaydedilir.
+            # Kayıt yalnızca kuyruğa bırakılır; biçimlendirme ve disk yazıcı iş parçacığında.
+            log_writer.write(timestamp, arbitration_id, dlc, threat)
+
+            if threat:
+                # SALDIRI VARSA: ekrana da bas (normal trafik terminali kirletmesin)
+                ts = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+                print(f"\033[91m[{ts}] [SALDIRI] {threat} | Aksiyon: Bloklandı | ID: {hex(arbitration_id)}\033[0m") # Kırmızı Yazı
+
+            data_buffer.append(features)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Canlı CAN IDS dedektörü')
+    parser.add_argument('--channel', default='vcan0')
+    parser.add_argument('--interface', default='socketcan', help="python-can arayüzü (test için 'virtual')")
+    parser.add_argument('--raw', action='store_true', help='python-can yerine ham SocketCAN soketiyle toplu oku')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help='Döngüye tek seferde verilen en fazla çerçeve')
+    parser.add_argument('--window', type=int, default=WINDOW_SIZE, help='Eğitim penceresi (çerçeve)')
+    parser.add_argument('--refit-interval', type=float, default=REFIT_INTERVAL, help='Saniye')
+    parser.add_argument('--drift-ratio', type=float, default=DRIFT_RATIO,
+                        help='Yeni ID oranı bu değeri aşarsa süre beklenmeden yeniden eğit')
+    parser.add_argument('--stats-interval', type=float, default=STATS_INTERVAL)
+    parser.add_argument('--features', choices=('basic', 'window'), default='basic',
+                        help="basic: [arbitration_id, dlc]; window: ID başına kayan pencere özellikleri")
+    parser.add_argument('--log-file', help=f"Varsayılan: {LOG_FILE} (binary: {BINARY_LOG_FILE})")
+    parser.add_argument('--log-format', choices=('text', 'binary'), default='text')
+    parser.add_argument('--log-max-mb', type=float, default=MAX_BYTES / 1024 / 1024,
+                        help='Bu boyutta log döndürülür (0: döndürme yok)')
+    parser.add_argument('--log-backups', type=int, default=BACKUP_COUNT)
+    args = parser.parse_args()
+
+    try:
+        receiver = create_receiver(args.channel, args.interface, args.raw, args.max_batch)
+        print("--- DEDEKTİF (VERİ TOPLAMA MODU): NORMAL + SALDIRI ---")
+    except OSError:
+        print(f"HATA: {args.channel} arayüzü bulunamadı!")
+        exit(1)
+
+    log_file = args.log_file or (BINARY_LOG_FILE if args.log_format == 'binary' else LOG_FILE)
+    log_writer = AsyncLogWriter(log_file, fmt=args.log_format, max_bytes=int(args.log_max_mb * 1024 * 1024),
+                                backup_count=args.log_backups)
+    refitter = BackgroundRefitter(interval=args.refit_interval, drift_ratio=args.drift_ratio)
+    try:
+        feature_engine = CANWindowFeatures() if args.features == 'window' else None
+        run(receiver, refitter, log_writer, args.window, args.stats_interval, feature_engine)
+    except KeyboardInterrupt:
+        print("\nVeri Toplama Durduruldu.")
+    finally:
+        refitter.shutdown()
+        log_writer.close()
+        receiver.shutdown()
+        print(f"[İSTATİSTİK] alım={receiver.stats()} model={refitter.stats()} log={log_writer.stats()}")
+
+
+if __name__ == '__main__':
+    main()
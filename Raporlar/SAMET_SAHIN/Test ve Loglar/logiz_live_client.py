@@ -10,10 +10,16 @@ Kullanım:
 3. Dashboard'dan "Canlı İzleme" sekmesini açın
 """
 
-import requests
 import time
 import os
 
+# requests yalnızca gönderim için gerekli; payload yardımcıları onsuz da içe aktarılabilir
+# (replay_load_generator.py bunları aiohttp ile kullanır)
+try:
+    import requests
+except ImportError:
+    requests = None
+
 # ==================== AYARLAR ====================
 # LogIz sunucusunun IP adresi (değiştirin)
 # Eğer aynı makinede: http://localhost:5050
@@ -25,19 +31,30 @@ SOURCE_NAME = 'SAMET_IDS_UBUNTU'
 
 # Gönderim aralığı (saniye)
 SEND_INTERVAL = 0.5
+
+# Backend uç noktaları
+INGEST_ENDPOINT = '/api/ingest'
+INGEST_BATCH_ENDPOINT = '/api/ingest/batch'
+INGEST_CAN_ENDPOINT = '/api/ingest/can'
 # ==================================================
 
 
+def build_ingest_payload(log_line, source=SOURCE_NAME):
+    """/api/ingest gövdesi: tek log satırı."""
+    return {'log': log_line, 'source': source, 'timestamp': time.time()}
+
+
+def build_batch_payload(log_lines, source=SOURCE_NAME):
+    """/api/ingest/batch gövdesi: aynı kaynaktan birden çok satır."""
+    return {'logs': list(log_lines), 'source': source, 'timestamp': time.time()}
+
+
 def send_log(log_line: str):
     """Tek bir log satırını LogIz'e gönderir."""
     try:
         response = requests.post(
-            f'{LOGIZ_SERVER}/api/ingest',
-            json={
-                'log': log_line,
-                'source': SOURCE_NAME,
-                'timestamp': time.time()
-            },
+            f'{LOGIZ_SERVER}{INGEST_ENDPOINT}',
+            json=build_ingest_payload(log_line),
             timeout=5
         )
         if response.status_code in [200, 201]:
@@ -59,33 +76,70 @@ def watch_log_file(file_path: str):
     print(f"🌐 LogIz Sunucusu: {LOGIZ_SERVER}")
     print("=" * 50)
     
-    with open(file_path, 'r') as f:
-        # Dosyanın sonuna git (sadece yeni satırları al)
-        f.seek(0, 2)
-        
+    f = open(file_path, 'r')
+    # Dosyanın sonuna git (sadece yeni satırları al)
+    f.seek(0, 2)
+    try:
         while True:
             line = f.readline()
             if line:
                 line = line.strip()
                 if line:  # Boş satırları atla
                     send_log(line)
-            else:
-                time.sleep(SEND_INTERVAL)
+                continue
+            time.sleep(SEND_INTERVAL)
+            # Log döndürüldüyse (ids_log_writer: log -> log.1) yeni dosyayı baştan oku
+            try:
+                rotated = os.stat(file_path).st_ino != os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                continue
+            if rotated or os.path.getsize(file_path) < f.tell():
+                f.close()
+                f = open(file_path, 'r')
+    finally:
+        f.close()
+
+
+def send_can_frames(frames):
+    """FRAME_DTYPE dizisini ham kayıt olarak /api/ingest/can'e gönderir (metne çevirmeden)."""
+    try:
+        response = requests.post(
+            f'{LOGIZ_SERVER}{INGEST_CAN_ENDPOINT}',
+            data=frames.tobytes(),
+            headers={'Content-Type': 'application/octet-stream', 'X-Source': SOURCE_NAME},
+            timeout=5
+        )
+        if response.status_code in [200, 201]:
+            result = response.json()
+            print(f"✅ Gönderildi: {result['count']} çerçeve -> {result['attacks']} saldırı")
+            return True
+        else:
+            print(f"❌ Hata ({response.status_code}): {response.text}")
+            return False
+    except requests.exceptions.RequestException as e:
+        print(f"🔌 Bağlantı hatası: {e}")
+        return False
 
 
-def watch_can_bus():
+def watch_can_bus(channel='vcan0', interface='socketcan'):
     """CAN Bus mesajlarını izler (vcan0) - live_ids_detector.py entegrasyonu."""
     try:
-        import can
-        bus = can.Bus(channel='vcan0', interface='socketcan')
-        print("🚗 CAN Bus (vcan0) izleniyor...")
+        from can_receiver import create_receiver
+        receiver = create_receiver(channel, interface)
+        print(f"🚗 CAN Bus ({channel}) izleniyor...")
         print(f"🌐 LogIz Sunucusu: {LOGIZ_SERVER}")
         print("=" * 50)
-        
-        for msg in bus:
-            log_line = f"CAN ID: 0x{msg.arbitration_id:03X} | Data: {msg.data.hex()}"
-            send_log(log_line)
-            
+
+        try:
+            while True:
+                # O ana kadar biriken çerçeveler (en fazla MAX_BATCH) tek istekle gönderilir
+                frames = receiver.recv_batch(timeout=SEND_INTERVAL)
+                if len(frames):
+                    send_can_frames(frames)
+        finally:
+            receiver.shutdown()
+            print(f"📊 Alım: {receiver.stats()}")
+
     except ImportError:
         print("❌ python-can kütüphanesi yüklü değil. 'pip install python-can' ile yükleyin.")
     except Exception as e:
@@ -100,20 +154,24 @@ if __name__ == '__main__':
     print("   SAMET IDS Ubuntu Test Ortamı")
     print("=" * 50)
     
+    if requests is None:
+        print("❌ requests kütüphanesi yüklü değil. 'pip install requests' ile yükleyin.")
+        sys.exit(1)
+
     if len(sys.argv) < 2:
         print("\nKullanım:")
         print("  1. Log dosyası izleme:")
         print("     python logiz_live_client.py /path/to/ids_guvenlik_logu.txt")
         print("")
         print("  2. CAN Bus izleme:")
-        print("     python logiz_live_client.py --can")
+        print("     python logiz_live_client.py --can [kanal] [arayüz]   (örn. --can test virtual)")
         print("")
         print("Ortam Değişkenleri:")
         print("  LOGIZ_SERVER=http://192.168.1.X:5050")
         sys.exit(1)
     
     if sys.argv[1] == '--can':
-        watch_can_bus()
+        watch_can_bus(*sys.argv[2:4])
     else:
         log_file = sys.argv[1]
         if not os.path.exists(log_file):
@@ -0,0 +1,184 @@
+# nonce_cache.py
+"""
+Time-windowed nonce replay cache for OCPP message validation.
+
+CentralSystem used to keep every accepted nonce in one set forever. Here a
+message is only valid if its timestamp is inside the validity window
+(not older than window_s, not more than max_skew_s in the future), so a
+nonce only has to be remembered for window_s + max_skew_s. Nonces are
+kept in a ring of generation sets; each generation covers
+(window_s + max_skew_s) / (generations - 1) seconds of arrivals and the
+oldest one is dropped whole when a new one starts. Memory is therefore
+bounded by the message rate times the window, and a replay is caught
+either by the nonce lookup (inside the window) or by the timestamp check
+(outside it).
+
+Benchmark (millions of messages, simulated clock):
+    python nonce_cache.py --messages 5000000 --rate 2000
+"""
+import argparse
+import random
+import sys
+import time
+
+# -----------------------
+# Constants
+# -----------------------
+WINDOW_S = 300.0        # how old a message timestamp may be
+MAX_SKEW_S = 30.0       # how far in the future a station clock may run
+GENERATIONS = 4
+
+REPLAY_NONCE = "REPLAY_NONCE"
+STALE_TIMESTAMP = "STALE_TIMESTAMP"
+FUTURE_TIMESTAMP = "FUTURE_TIMESTAMP"
+
+
+# -----------------------
+# Cache
+# -----------------------
+class NonceCache:
+    def __init__(self, window_s=WINDOW_S, max_skew_s=MAX_SKEW_S, generations=GENERATIONS):
+        if generations < 2:
+            raise ValueError("generations must be >= 2")
+        self.window_s = window_s
+        self.max_skew_s = max_skew_s
+        self.span_s = (window_s + max_skew_s) / (generations - 1)
+        self.generations = [set() for _ in range(generations)]
+        self.current = self.generations[0]
+        self._head = 0
+        self._rotate_at = None
+
+        self.accepted = 0
+        self.rejected = {REPLAY_NONCE: 0, STALE_TIMESTAMP: 0, FUTURE_TIMESTAMP: 0}
+        self.rotations = 0
+        self.peak_entries = 0
+
+    # ---------- public API ----------
+    def check(self, nonce, timestamp, now=None):
+        """Reason the message must be rejected, or None. Does not remember the nonce (see add())."""
+        if now is None:
+            now = time.time()
+        if self._rotate_at is None or now >= self._rotate_at:
+            self._rotate(now)
+        if timestamp < now - self.window_s:
+            reason = STALE_TIMESTAMP
+        elif timestamp > now + self.max_skew_s:
+            reason = FUTURE_TIMESTAMP
+        else:
+            for generation in self.generations:
+                if nonce in generation:
+                    reason = REPLAY_NONCE
+                    break
+            else:
+                return None
+        self.rejected[reason] += 1
+        return reason
+
+    def add(self, nonce):
+        """Remember a nonce whose message passed every other check."""
+        self.current.add(nonce)
+        self.accepted += 1
+
+    def accept(self, nonce, timestamp, now=None):
+        """check() + add() in one call; returns (ok, reason)."""
+        reason = self.check(nonce, timestamp, now)
+        if reason:
+            return False, reason
+        self.add(nonce)
+        return True, "OK"
+
+    def __contains__(self, nonce):
+        return any(nonce in generation for generation in self.generations)
+
+    def __len__(self):
+        return sum(len(generation) for generation in self.generations)
+
+    def stats(self):
+        return {
+            "entries": len(self),
+            "peak_entries": max(self.peak_entries, len(self)),
+            "accepted": self.accepted,
+            "rejected": dict(self.rejected),
+            "rotations": self.rotations,
+        }
+
+    # ---------- generations ----------
+    def _rotate(self, now):
+        if self._rotate_at is None:
+            self._rotate_at = now + self.span_s
+            return
+        self.peak_entries = max(self.peak_entries, len(self))
+        # after a long idle gap several generations expire at once
+        steps = min(len(self.generations), int((now - self._rotate_at) // self.span_s) + 1)
+        for _ in range(steps):
+            self._head = (self._head + 1) % len(self.generations)
+            self.generations[self._head] = set()
+            self.rotations += 1
+        self.current = self.generations[self._head]
+        self._rotate_at += self.span_s * (int((now - self._rotate_at) // self.span_s) + 1)
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def generate_chunk(rng, start, count, rate, history, replay_rate, stale_rate, future_rate):
+    """
+    count messages arriving at `rate` msg/s from message number `start`.
+    Returns [(nonce, timestamp, now, expected_reason)]; `history` keeps recent
+    (nonce, timestamp) pairs so replays can be drawn from inside the window.
+    """
+    chunk = []
+    for i in range(start, start + count):
+        now = i / rate
+        roll = rng.random()
+        if roll < replay_rate and history:
+            nonce, timestamp = history[rng.randrange(len(history))]
+            expected = REPLAY_NONCE if timestamp >= now - WINDOW_S else STALE_TIMESTAMP
+        elif roll < replay_rate + stale_rate:
+            nonce, timestamp, expected = f"{i:012x}", now - WINDOW_S - rng.uniform(1, 3600), STALE_TIMESTAMP
+        elif roll < replay_rate + stale_rate + future_rate:
+            nonce, timestamp, expected = f"{i:012x}", now + MAX_SKEW_S + rng.uniform(1, 3600), FUTURE_TIMESTAMP
+        else:
+            # network delay / small clock offset inside the window
+            nonce, timestamp, expected = f"{i:012x}", now + rng.uniform(-2.0, 1.0), None
+            if len(history) < 100_000:
+                history.append((nonce, timestamp))
+            else:
+                history[rng.randrange(len(history))] = (nonce, timestamp)
+        chunk.append((nonce, timestamp, now, expected))
+    return chunk
+
+
+def run_benchmark(messages, rate, chunk_size=200_000, seed=42):
+    rng = random.Random(seed)
+    cache = NonceCache()
+    accept = cache.accept
+    history = []
+    elapsed = 0.0
+    wrong = 0
+    for start in range(0, messages, chunk_size):
+        chunk = generate_chunk(rng, start, min(chunk_size, messages - start), rate, history,
+                               replay_rate=0.01, stale_rate=0.005, future_rate=0.005)
+        started = time.perf_counter()
+        results = [accept(nonce, timestamp, now) for nonce, timestamp, now, _ in chunk]
+        elapsed += time.perf_counter() - started
+        wrong += sum(1 for (ok, reason), item in zip(results, chunk) if (None if ok else reason) != item[3])
+
+    stats = cache.stats()
+    unbounded = stats["accepted"]   # what the old seen_nonces set would hold
+    print(f"{messages:,} messages ({messages / rate:,.0f} s at {rate:,.0f} msg/s): {elapsed:.2f} s -> "
+          f"{messages / elapsed:,.0f} msg/s ({elapsed / messages * 1e6:.2f} µs/msg)")
+    print(f"rejected: {stats['rejected']}, misclassified: {wrong}")
+    print(f"entries: peak {stats['peak_entries']:,} (bound ~ rate x (window + skew) x "
+          f"{len(cache.generations)}/{len(cache.generations) - 1} = "
+          f"{rate * (cache.window_s + cache.max_skew_s) * len(cache.generations) / (len(cache.generations) - 1):,.0f}), "
+          f"unbounded set would hold {unbounded:,}")
+    return wrong == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nonce replay cache benchmark")
+    parser.add_argument("--messages", type=int, default=5_000_000)
+    parser.add_argument("--rate", type=float, default=2000.0, help="simulated fleet message rate (msg/s)")
+    args = parser.parse_args()
+    sys.exit(0 if run_benchmark(args.messages, args.rate) else 1)
@@ -0,0 +1,499 @@
+# ocpp_session_tracker.py
+"""
+Streaming OCPP 1.6 session-state tracker.
+
+Keeps one slot per (charge point, connector) and follows the
+Boot -> Authorize -> StartTransaction -> MeterValues -> StopTransaction
+lifecycle. Every message is checked against the slot's state in O(1):
+
+  NOT_BOOTED               message from a charge point that never sent BootNotification
+  NOT_AUTHORIZED           StartTransaction without a recent Authorize for the same idTag
+  START_WHILE_CHARGING     StartTransaction on a connector that already has a transaction
+  NO_ACTIVE_TRANSACTION    MeterValues / StopTransaction on an idle connector
+  UNKNOWN_TRANSACTION      transactionId not active (or active on another connector)
+  METER_REGRESSION         energy register went backwards
+  METER_JUMP               energy grew faster than max_power_kw allows (+ tolerance)
+  REMOTE_START_BUSY        RemoteStartTransaction for a connector that is charging
+  REMOTE_STOP_UNKNOWN_TRANSACTION  RemoteStopTransaction for a transaction that is not active
+  MALFORMED_MESSAGE        missing/garbage stationId, timestamp, transactionId, connectorId,
+                           idTag or meter value (non-numeric, NaN/inf, out of int32 range)
+
+Anomalous messages are not applied to the session state, so one tampered
+reading does not make the next honest reading look like a jump.
+
+Per-session state lives in NumPy arrays indexed by slot; dicts only map
+(stationId, connectorId) and transactionId to a slot.
+
+Benchmark (10k concurrent sessions):
+    python ocpp_session_tracker.py --stations 5000 --connectors 2 --meter-values 30
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+# -----------------------
+# Constants
+# -----------------------
+IDLE = 0
+CHARGING = 1
+
+NOT_BOOTED = "NOT_BOOTED"
+NOT_AUTHORIZED = "NOT_AUTHORIZED"
+START_WHILE_CHARGING = "START_WHILE_CHARGING"
+NO_ACTIVE_TRANSACTION = "NO_ACTIVE_TRANSACTION"
+UNKNOWN_TRANSACTION = "UNKNOWN_TRANSACTION"
+METER_REGRESSION = "METER_REGRESSION"
+METER_JUMP = "METER_JUMP"
+REMOTE_START_BUSY = "REMOTE_START_BUSY"
+REMOTE_STOP_UNKNOWN_TRANSACTION = "REMOTE_STOP_UNKNOWN_TRANSACTION"
+MALFORMED_MESSAGE = "MALFORMED_MESSAGE"
+
+MAX_POWER_KW = 350.0        # fastest DC charger we expect; merkez.py alarms at 10 kW for AC
+JUMP_TOLERANCE_WH = 50.0    # allowed on top of max_power_kw * elapsed time
+AUTH_WINDOW_S = 300.0       # Authorize must precede StartTransaction by at most this
+MAX_PENDING_AUTHORIZATIONS = 16  # per charge point; the oldest pending idTag is dropped beyond this
+INITIAL_SLOTS = 1024
+MIN_ID, MAX_ID = -2**31, 2**31 - 1   # OCPP "integer" fields (transactionId, connectorId)
+
+ENERGY_MEASURAND = "Energy.Active.Import.Register"
+
+
+class MalformedMessage(ValueError):
+    """A field of an incoming message cannot be used; reported as MALFORMED_MESSAGE."""
+
+
+def parse_timestamp(value):
+    """ISO-8601 string (as produced by ChargingStation) or epoch seconds -> epoch seconds."""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return number_field(value, "timestamp")
+    if not isinstance(value, str):
+        raise MalformedMessage(f"timestamp: {value!r}")
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (ValueError, OverflowError):
+        raise MalformedMessage(f"timestamp: {value!r}") from None
+
+
+def number_field(value, name):
+    """Finite float from a JSON number or numeric string (OCPP sends sampledValue.value as a string)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise MalformedMessage(f"{name}: {value!r}")
+    try:
+        number = float(value)
+    except (ValueError, OverflowError):
+        raise MalformedMessage(f"{name}: {value!r}") from None
+    if not math.isfinite(number):
+        raise MalformedMessage(f"{name}: {value!r}")
+    return number
+
+
+def id_field(payload, name, default=None):
+    """OCPP integer id (transactionId, connectorId) as an int in int32 range, or default if absent."""
+    value = payload.get(name)
+    if value is None:
+        return default
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str):
+        try:
+            value = int(value)
+        except ValueError:
+            raise MalformedMessage(f"{name}: {value!r}") from None
+    if isinstance(value, bool) or not isinstance(value, int) or not MIN_ID <= value <= MAX_ID:
+        raise MalformedMessage(f"{name}: {value!r}")
+    return value
+
+
+def meter_wh(payload):
+    """
+    Energy register in Wh from a MeterValues payload, or None.
+    Accepts the simulator's {"energyWh": ...} and OCPP 1.6 meterValue/sampledValue lists.
+    Raises MalformedMessage for non-numeric values or a malformed list.
+    """
+    energy = payload.get("energyWh")
+    if energy is not None:
+        return number_field(energy, "energyWh")
+    meter_values = payload.get("meterValue") or ()
+    if not isinstance(meter_values, list):
+        raise MalformedMessage("meterValue is not a list")
+    for meter_value in meter_values:
+        samples = meter_value.get("sampledValue") or () if isinstance(meter_value, dict) else None
+        if not isinstance(samples, (list, tuple)):
+            raise MalformedMessage("sampledValue is not a list")
+        for sample in samples:
+            if not isinstance(sample, dict):
+                raise MalformedMessage("sampledValue entry is not an object")
+            if sample.get("measurand", ENERGY_MEASURAND) != ENERGY_MEASURAND:
+                continue
+            value = number_field(sample.get("value"), "sampledValue.value")
+            return value * 1000.0 if sample.get("unit") == "kWh" else value
+    return None
+
+
+# -----------------------
+# Tracker
+# -----------------------
+class SessionTracker:
+    def __init__(self, max_power_kw=MAX_POWER_KW, jump_tolerance_wh=JUMP_TOLERANCE_WH,
+                 auth_window_s=AUTH_WINDOW_S, require_authorize=True, initial_slots=INITIAL_SLOTS):
+        self.max_wh_per_s = max_power_kw * 1000.0 / 3600.0
+        self.jump_tolerance_wh = jump_tolerance_wh
+        self.auth_window_s = auth_window_s
+        self.require_authorize = require_authorize
+
+        # charge point level
+        self.booted = set()
+        self.authorized = {}            # stationId -> {idTag: timestamp} (pending, oldest first)
+
+        # (stationId, connectorId) -> slot, transactionId -> slot
+        self.slots = {}
+        self.slot_keys = []             # slot -> (stationId, connectorId)
+        self.transactions = {}
+        self.next_transaction_id = 1
+
+        # per-slot state
+        self.state = np.zeros(initial_slots, dtype=np.uint8)
+        self.transaction_id = np.zeros(initial_slots, dtype=np.int64)
+        self.meter_start = np.zeros(initial_slots, dtype=np.float64)
+        self.meter_last = np.zeros(initial_slots, dtype=np.float64)
+        self.last_time = np.zeros(initial_slots, dtype=np.float64)
+
+        self.messages = 0
+        self.anomalies = {}
+
+        self._handlers = {
+            "BootNotification": self._boot,
+            "Authorize": self._authorize,
+            "StartTransaction": self._start,
+            "MeterValues": self._meter_values,
+            "StopTransaction": self._stop,
+            "RemoteStartTransaction": self._remote_start,
+            "RemoteStopTransaction": self._remote_stop,
+        }
+
+    # ---------- public API ----------
+    def process(self, station_id, action, payload, timestamp):
+        """
+        Apply one message; returns a list of anomaly codes (empty if the message fits the session).
+        Fields are validated before any state changes, so a malformed message only yields
+        [MALFORMED_MESSAGE] and leaves the tracker untouched.
+        """
+        self.messages += 1
+        try:
+            if not isinstance(station_id, str) or not isinstance(payload, dict):
+                raise MalformedMessage("stationId must be a string and payload an object")
+            timestamp = number_field(timestamp, "timestamp")
+            handler = self._handlers.get(action)
+            if handler is None:
+                # Heartbeat, StatusNotification, ... only require a booted charge point
+                found = [] if station_id in self.booted else [NOT_BOOTED]
+            else:
+                found = handler(station_id, payload, timestamp)
+        except MalformedMessage:
+            found = [MALFORMED_MESSAGE]
+        for code in found:
+            self.anomalies[code] = self.anomalies.get(code, 0) + 1
+        return found
+
+    def process_message(self, msg):
+        """Same as process() for a simulasyon_kodlari.py message dict."""
+        try:
+            timestamp = parse_timestamp(msg.get("timestamp"))
+        except MalformedMessage:
+            timestamp = None        # process() reports it as MALFORMED_MESSAGE
+        return self.process(msg.get("stationId"), msg.get("type"), msg.get("payload") or {}, timestamp)
+
+    def active_transaction(self, station_id, connector_id):
+        """transactionId charging on the connector, or None."""
+        slot = self.slots.get((station_id, connector_id))
+        if slot is None or self.state[slot] != CHARGING:
+            return None
+        return int(self.transaction_id[slot])
+
+    def active_sessions(self):
+        return len(self.transactions)
+
+    def expire(self, now, idle_timeout):
+        """Close transactions with no message for idle_timeout seconds (vectorised; call periodically)."""
+        used = len(self.slots)
+        stale = np.flatnonzero((self.state[:used] == CHARGING) & (self.last_time[:used] < now - idle_timeout))
+        for slot in stale.tolist():
+            self.transactions.pop(int(self.transaction_id[slot]), None)
+        self.state[stale] = IDLE
+        return len(stale)
+
+    def stats(self):
+        return {
+            "messages": self.messages,
+            "charge_points": len(self.booted),
+            "connectors": len(self.slots),
+            "active_sessions": len(self.transactions),
+            "anomalies": dict(self.anomalies),
+            "state_bytes": sum(a.nbytes for a in (self.state, self.transaction_id, self.meter_start,
+                                                  self.meter_last, self.last_time)),
+        }
+
+    # ---------- slots ----------
+    def _slot(self, station_id, connector_id):
+        key = (station_id, connector_id)
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = len(self.slots)
+            if slot == len(self.state):
+                self._grow()
+            self.slots[key] = slot
+            self.slot_keys.append(key)
+        return slot
+
+    def _grow(self):
+        for name in ("state", "transaction_id", "meter_start", "meter_last", "last_time"):
+            old = getattr(self, name)
+            new = np.zeros(len(old) * 2, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _check_meter(self, slot, energy, timestamp):
+        last = float(self.meter_last[slot])
+        if energy < last:
+            return METER_REGRESSION
+        elapsed = max(0.0, timestamp - float(self.last_time[slot]))
+        if energy - last > self.max_wh_per_s * elapsed + self.jump_tolerance_wh:
+            return METER_JUMP
+        return None
+
+    # ---------- handlers ----------
+    def _boot(self, station_id, payload, timestamp):
+        self.booted.add(station_id)
+        return []
+
+    def _authorize(self, station_id, payload, timestamp):
+        if station_id not in self.booted:
+            return [NOT_BOOTED]
+        id_tag = payload.get("idTag")
+        if not isinstance(id_tag, str):
+            raise MalformedMessage(f"idTag: {id_tag!r}")
+        pending = self.authorized.setdefault(station_id, {})
+        pending.pop(id_tag, None)           # re-authorizing moves the tag to the newest end
+        pending[id_tag] = timestamp
+        if len(pending) > MAX_PENDING_AUTHORIZATIONS:
+            del pending[next(iter(pending))]
+        return []
+
+    def _start(self, station_id, payload, timestamp):
+        if station_id not in self.booted:
+            return [NOT_BOOTED]
+        connector_id = id_field(payload, "connectorId", 1)
+        id_tag = payload.get("idTag")
+        if not isinstance(id_tag, str):
+            raise MalformedMessage(f"idTag: {id_tag!r}")
+        requested_id = id_field(payload, "transactionId")
+        energy = number_field(payload.get("meterStart", 0), "meterStart")
+
+        slot = self._slot(station_id, connector_id)
+        if self.state[slot] == CHARGING:
+            return [START_WHILE_CHARGING]
+        if self.require_authorize:
+            # Each connector consumes its own idTag: Authorize(A), Authorize(B), Start(A) is valid
+            pending = self.authorized.get(station_id)
+            authorized_at = pending.get(id_tag) if pending else None
+            if authorized_at is None or timestamp - authorized_at > self.auth_window_s:
+                return [NOT_AUTHORIZED]
+            del pending[id_tag]
+            if not pending:
+                del self.authorized[station_id]
+
+        # StartTransaction.conf assigns the id; a logged conf may already carry it
+        transaction_id = requested_id
+        if transaction_id is None or transaction_id in self.transactions:
+            transaction_id = self.next_transaction_id
+        self.next_transaction_id = max(self.next_transaction_id, transaction_id) + 1
+        self.transactions[transaction_id] = slot
+
+        self.state[slot] = CHARGING
+        self.transaction_id[slot] = transaction_id
+        self.meter_start[slot] = energy
+        self.meter_last[slot] = energy
+        self.last_time[slot] = timestamp
+        return []
+
+    def _meter_values(self, station_id, payload, timestamp):
+        if station_id not in self.booted:
+            return [NOT_BOOTED]
+        connector_id = id_field(payload, "connectorId", 1)
+        transaction_id = id_field(payload, "transactionId")
+        energy = meter_wh(payload)
+
+        slot = self.slots.get((station_id, connector_id))
+        if slot is None or self.state[slot] != CHARGING:
+            return [NO_ACTIVE_TRANSACTION]
+        if transaction_id is not None and self.transactions.get(transaction_id) != slot:
+            return [UNKNOWN_TRANSACTION]
+
+        if energy is not None:
+            problem = self._check_meter(slot, energy, timestamp)
+            if problem:
+                return [problem]
+            self.meter_last[slot] = energy
+        self.last_time[slot] = timestamp
+        return []
+
+    def _stop(self, station_id, payload, timestamp):
+        if station_id not in self.booted:
+            return [NOT_BOOTED]
+        transaction_id = id_field(payload, "transactionId")
+        connector_id = id_field(payload, "connectorId", 1)
+        energy = payload.get("meterStop")
+        if energy is not None:
+            energy = number_field(energy, "meterStop")
+
+        slot = self.transactions.get(transaction_id)
+        if slot is None:
+            connector = self.slots.get((station_id, connector_id))
+            idle = connector is None or self.state[connector] != CHARGING
+            return [NO_ACTIVE_TRANSACTION if idle and transaction_id is None else UNKNOWN_TRANSACTION]
+        if self.slot_keys[slot][0] != station_id:
+            return [UNKNOWN_TRANSACTION]   # another charge point stopping this transaction
+
+        if energy is not None:
+            problem = self._check_meter(slot, energy, timestamp)
+            if problem:
+                return [problem]
+            self.meter_last[slot] = energy
+        del self.transactions[transaction_id]
+        self.state[slot] = IDLE
+        self.last_time[slot] = timestamp
+        return []
+
+    def _remote_start(self, station_id, payload, timestamp):
+        if station_id not in self.booted:
+            return [NOT_BOOTED]
+        connector_id = id_field(payload, "connectorId")
+        if connector_id is not None:
+            slot = self.slots.get((station_id, connector_id))
+            if slot is not None and self.state[slot] == CHARGING:
+                return [REMOTE_START_BUSY]
+        return []
+
+    def _remote_stop(self, station_id, payload, timestamp):
+        slot = self.transactions.get(id_field(payload, "transactionId"))
+        if slot is None or self.slot_keys[slot][0] != station_id:
+            return [REMOTE_STOP_UNKNOWN_TRANSACTION]
+        return []
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def generate_fleet_traffic(stations, connectors, meter_values, attack_rate=0.01, interval_s=60.0,
+                           power_kw=7.4, seed=42):
+    """
+    Interleaved traffic for stations*connectors concurrent sessions:
+    boot, Authorize for every connector of a charge point followed by their
+    StartTransactions (interleaved idTags), meter_values rounds, stop.
+    A fraction attack_rate of meter values is replaced by a regression, a jump,
+    a duplicate StartTransaction or a RemoteStop for a made-up transaction.
+    Returns (messages, expected) where expected[i] is the anomaly code or None.
+    """
+    rng = random.Random(seed)
+    messages, expected = [], []
+    now = 1_700_000_000.0
+    station_ids = [f"CP-{i:05d}" for i in range(stations)]
+    sessions = [(station, connector) for station in station_ids for connector in range(1, connectors + 1)]
+    transaction_ids = {}
+    energy = {}
+
+    for station in station_ids:
+        messages.append((station, "BootNotification", {"chargePointModel": "SIM"}, now))
+        expected.append(None)
+    now += 1.0
+    for first in range(0, len(sessions), connectors):
+        station_sessions = list(enumerate(sessions[first:first + connectors], start=first + 1))
+        for number, (station, connector) in station_sessions:
+            messages.append((station, "Authorize", {"idTag": f"TAG{number:06d}"}, now))
+            expected.append(None)
+        for number, (station, connector) in station_sessions:
+            energy[station, connector] = float(rng.randint(0, 50_000))
+            transaction_ids[station, connector] = number
+            messages.append((station, "StartTransaction", {"connectorId": connector, "idTag": f"TAG{number:06d}",
+                                                           "meterStart": energy[station, connector]}, now))
+            expected.append(None)
+
+    step_wh = power_kw * 1000.0 * interval_s / 3600.0
+    for _ in range(meter_values):
+        now += interval_s
+        for station, connector in sessions:
+            transaction_id = transaction_ids[station, connector]
+            roll = rng.random()
+            if roll < attack_rate:
+                kind = rng.randrange(4)
+                if kind == 0:
+                    payload = {"connectorId": connector, "transactionId": transaction_id,
+                               "energyWh": energy[station, connector] - rng.uniform(10, 500)}
+                    messages.append((station, "MeterValues", payload, now))
+                    expected.append(METER_REGRESSION)
+                elif kind == 1:
+                    payload = {"connectorId": connector, "transactionId": transaction_id,
+                               "energyWh": energy[station, connector] + step_wh * rng.uniform(500, 2000)}
+                    messages.append((station, "MeterValues", payload, now))
+                    expected.append(METER_JUMP)
+                elif kind == 2:
+                    payload = {"connectorId": connector, "idTag": "INJECTED", "meterStart": 0}
+                    messages.append((station, "StartTransaction", payload, now))
+                    expected.append(START_WHILE_CHARGING)
+                else:
+                    payload = {"transactionId": 10_000_000 + rng.randrange(1_000_000)}
+                    messages.append((station, "RemoteStopTransaction", payload, now))
+                    expected.append(REMOTE_STOP_UNKNOWN_TRANSACTION)
+                continue
+            energy[station, connector] += step_wh * rng.uniform(0.8, 1.0)
+            messages.append((station, "MeterValues", {"connectorId": connector, "transactionId": transaction_id,
+                                                      "energyWh": round(energy[station, connector], 1)}, now))
+            expected.append(None)
+
+    now += interval_s
+    for station, connector in sessions:
+        messages.append((station, "StopTransaction", {"transactionId": transaction_ids[station, connector],
+                                                      "meterStop": round(energy[station, connector] + 1, 1)}, now))
+        expected.append(None)
+    return messages, expected
+
+
+def run_benchmark(stations, connectors, meter_values, attack_rate):
+    messages, expected = generate_fleet_traffic(stations, connectors, meter_values, attack_rate)
+    tracker = SessionTracker()
+    process = tracker.process
+    results = []
+    peak_sessions = 0
+    started = time.perf_counter()
+    for station_id, action, payload, timestamp in messages:
+        results.append(process(station_id, action, payload, timestamp))
+        if action == "StartTransaction":
+            peak_sessions = max(peak_sessions, len(tracker.transactions))
+    elapsed = time.perf_counter() - started
+
+    missed = sum(1 for want, got in zip(expected, results) if want and got != [want])
+    false_alarms = sum(1 for want, got in zip(expected, results) if not want and got)
+    stats = tracker.stats()
+    print(f"{len(messages)} messages, {peak_sessions} concurrent sessions: {elapsed:.2f} s -> "
+          f"{len(messages) / elapsed:,.0f} msg/s ({elapsed / len(messages) * 1e6:.2f} µs/msg)")
+    print(f"injected: {sum(1 for want in expected if want)}, missed: {missed}, false alarms: {false_alarms}")
+    print(f"anomalies: {stats['anomalies']}")
+    print(f"session arrays: {stats['state_bytes'] / 1024:.0f} KiB for {stats['connectors']} connectors")
+    return missed == 0 and false_alarms == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCPP session tracker benchmark")
+    parser.add_argument("--stations", type=int, default=5000)
+    parser.add_argument("--connectors", type=int, default=2)
+    parser.add_argument("--meter-values", type=int, default=30, help="MeterValues per session")
+    parser.add_argument("--attack-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    sys.exit(0 if run_benchmark(args.stations, args.connectors, args.meter_values, args.attack_rate) else 1)
@@ -8,6 +8,9 @@ import random
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+from nonce_cache import NonceCache
+from ocpp_session_tracker import SessionTracker, parse_timestamp
+
 # -----------------------
 # -----------------------
 log_dir = Path("logs")
@@ -81,6 +84,8 @@ class ChargingStation:
         self.energy = 1000.0
         self.cert_fp = cert_fp  # fingerprint string
         self.expected_tls = expected_tls
+        self.connector_id = 1
+        self.transaction_id = None  # set from StartTransaction.conf
 
     def create_ocpp_message(self, msg_type, payload):
         """
@@ -99,15 +104,36 @@ class ChargingStation:
         body["signature"] = signature
         return body
 
+    def boot_notification(self):
+        return self.create_ocpp_message("BootNotification", {"chargePointModel": "SIM", "chargePointVendor": "BSG"})
+
+    def authorize(self, id_tag):
+        return self.create_ocpp_message("Authorize", {"idTag": id_tag})
+
+    def start_transaction(self, id_tag):
+        return self.create_ocpp_message("StartTransaction", {
+            "connectorId": self.connector_id, "idTag": id_tag, "meterStart": round(self.energy, 2)
+        })
+
+    def stop_transaction(self):
+        return self.create_ocpp_message("StopTransaction", {
+            "transactionId": self.transaction_id, "meterStop": round(self.energy, 2)
+        })
+
     def meter_values(self):
         self.energy += 9 + random.uniform(-1, 1)
-        return self.create_ocpp_message("MeterValues", {"energyWh": round(self.energy, 2)})
+        return self.create_ocpp_message("MeterValues", {
+            "connectorId": self.connector_id,
+            "transactionId": self.transaction_id,
+            "energyWh": round(self.energy, 2)
+        })
 
 class CentralSystem:
     def __init__(self, expected_peer_cert_fp, min_tls_version="TLS1.2"):
         self.expected_peer_cert_fp = expected_peer_cert_fp
         self.min_tls_version = min_tls_version
-        self.seen_nonces = set()
+        self.nonces = NonceCache()  # replay protection within the timestamp window
+        self.sessions = SessionTracker()
 
     def validate_handshake(self, negotiated_tls, peer_fp):
         # Compare TLS versions roughly (assume "TLS1.0","TLS1.1","TLS1.2","TLS1.3")
@@ -126,8 +152,15 @@ class CentralSystem:
         nonce = msg.get("nonce")
         if not sig or not nonce:
             return False, "MISSING_SIGNATURE_OR_NONCE"
-        if nonce in self.seen_nonces:
-            return False, "REPLAY_NONCE"
+        try:
+            sent_at = parse_timestamp(msg["timestamp"]) if msg.get("timestamp") else None
+        except (TypeError, ValueError):
+            sent_at = None
+        if sent_at is None:
+            return False, "MISSING_OR_INVALID_TIMESTAMP"
+        replay = self.nonces.check(nonce, sent_at)
+        if replay:
+            return False, replay
         # Here we could verify signature properly; we simulate by recomputing
         recomputed = hashlib.sha256(json.dumps({
             k:v for k,v in msg.items() if k!="signature"
@@ -135,7 +168,7 @@ class CentralSystem:
         if recomputed != sig:
             return False, "INVALID_SIGNATURE"
         # passed basic checks
-        self.seen_nonces.add(nonce)
+        self.nonces.add(nonce)
         return True, "OK"
 
 # -----------------------
@@ -222,6 +255,19 @@ class Simulator:
         self.station = ChargingStation("ST-271", cert_fp=self.expected_fp, expected_tls="TLS1.3")
         self.attacker = Attacker(active=True)
 
+    def deliver_lifecycle(self, msg):
+        """Validate a Boot/Authorize/Start/Stop message and feed it to the session tracker."""
+        valid, vreason = self.central.validate_ocpp_message(msg)
+        if valid:
+            anomalies = self.central.sessions.process_message(msg)
+            if anomalies:
+                valid, vreason = False, ",".join(anomalies)
+        if not valid:
+            self.monitor.record_event("OCPP_MSG_REJECTED", {"reason": vreason, "msg_type": msg.get("type")})
+            return False
+        self.monitor.record_event("OCPP_MSG_ACCEPTED", {"msg_type": msg.get("type"), "station": msg.get("stationId")})
+        return True
+
     async def run(self):
         logger.info("=== TLS Downgrade Simulation START ===")
         # 1) simulate handshake
@@ -250,6 +296,16 @@ class Simulator:
         else:
             session_allowed = True
 
+        # 1b) OCPP session: Boot -> Authorize -> StartTransaction
+        if session_allowed:
+            id_tag = "TAG-" + self.station.station_id
+            for msg in (self.station.boot_notification(), self.station.authorize(id_tag),
+                        self.station.start_transaction(id_tag)):
+                self.deliver_lifecycle(msg)
+            # StartTransaction.conf: central assigns the transaction id
+            self.station.transaction_id = self.central.sessions.active_transaction(
+                self.station.station_id, self.station.connector_id)
+
         # 2) run a few normal meter messages; attacker may intercept/modify
         for tick in range(1, 16):
             await asyncio.sleep(0)  # fast sim; no real wait
@@ -276,6 +332,13 @@ class Simulator:
                 self.monitor.record_event("OCPP_MSG_REJECTED", {"reason": vreason, "msg_type": forwarded.get("type")})
                 continue
 
+            # Per-connector session state (out-of-order commands, meter regression / jump)
+            anomalies = self.central.sessions.process_message(forwarded)
+            if anomalies:
+                self.monitor.log_attack("OCPP_SESSION_ANOMALY", ",".join(anomalies), blocked=True, meta={"msg": forwarded})
+                self.monitor.record_event("OCPP_MSG_REJECTED", {"reason": anomalies[0], "msg_type": forwarded.get("type")})
+                continue
+
             # Cross-check MeterValues consistency (simple heuristic)
             if forwarded.get("type") == "MeterValues":
                 reported = forwarded["payload"].get("energyWh")
@@ -290,6 +353,9 @@ class Simulator:
             # If reached here -> accepted
             self.monitor.record_event("OCPP_MSG_ACCEPTED", {"msg_type": forwarded.get("type"), "station": forwarded.get("stationId"), "modified_by_attacker": modified})
 
+        if session_allowed and self.station.transaction_id is not None:
+            self.deliver_lifecycle(self.station.stop_transaction())
+
         # 3) attacker attempts to inject a RemoteStart despite session terminated/weak TLS
         inj = {
             "stationId": self.station.station_id,
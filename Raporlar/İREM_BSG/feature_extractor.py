@@ -1,113 +1,529 @@
-import pandas as pd
-import numpy as np
+"""
+Pcap Öznitelik Çıkarımı (akış tabanlı)
+======================================
+pcap / pcapng yakalamalarından paket başına öznitelik çıkarır:
+
+    timestamp, length, protocol_ip, protocol_tcp, protocol_udp,
+    protocol_can, protocol_other, can_id_anomaly, label
+
+scapy `rdpcap` bütün paketleri nesne olarak belleğe yüklediği için çok GB'lık
+yakalamalarda kullanılamıyordu. Burada dosya bloklar halinde okunur, yalnızca
+kayıt başlıkları Python'da yürünür; Ethernet/IP/TCP/UDP/SocketCAN başlıkları
+blok başına NumPy ile (vektörel) çözülür ve öznitelikler önceden ayrılmış
+NumPy sütunlarına yazılır. Çıktı parça parça (CHUNK_PACKETS paket) CSV veya
+Parquet dosyasına eklenir, birden çok yakalama dosyası paralel işlenir.
+
+Desteklenen link tipleri: Ethernet (VLAN/QinQ dahil), Raw IP, BSD loopback,
+Linux cooked (SLL/SLL2) ve SocketCAN.
+
+Kullanım:
+    python feature_extractor.py                         # varsayılan üç dosya -> network_traffic_features.csv
+    python feature_extractor.py normal.pcapng:normal saldiri.pcap:pivot --out features.parquet --workers 4
+"""
+
+import argparse
 import os
+import shutil
+import struct
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
-# CAN import hatasını çözmek için 'CAN' dışarıda tutulur ve contrib'dan alınır
-# Eğer bu satır hata verirse (bazı scapy versiyonlarında), altındaki yoruma alınmış satır denenir.
+import numpy as np
+import pandas as pd
+
+# Parquet çıktısı için isteğe bağlı (pip install pyarrow)
 try:
-    from scapy.all import rdpcap, IP, TCP, UDP
-    from scapy.contrib.cansocket import CAN
+    import pyarrow as pa
+    import pyarrow.parquet as pq
 except ImportError:
-    # Alternatif içe aktarma yöntemi (Bazı eski scapy versiyonları için)
-    from scapy.all import rdpcap, IP, TCP, UDP
-    CAN = None # CAN'i bulamazsa geçersiz kıl
+    pa = pq = None
+
+FEATURE_COLUMNS = ['timestamp', 'length', 'protocol_ip', 'protocol_tcp', 'protocol_udp',
+                   'protocol_can', 'protocol_other', 'can_id_anomaly']
+ANOMALOUS_CAN_ID = 0x7FF          # Saldırı senaryosundaki sahte CAN ID'si (can_spoof_attack.py)
+CHUNK_PACKETS = 256 * 1024        # Çıktıya parça başına yazılan paket sayısı
+READ_BLOCK = 16 * 1024 * 1024     # Dosyadan tek seferde okunan bayt
+
+# Link tipleri (https://www.tcpdump.org/linktypes.html)
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_CAN_SOCKETCAN = 227
+LINKTYPE_IPV4 = 228
+LINKTYPE_LINUX_SLL2 = 276
+RAW_IP_LINKTYPES = (LINKTYPE_RAW, LINKTYPE_IPV4, 12, 14)  # 12/14: bazı sistemlerde DLT_RAW
+
+ETHERTYPE_IPV4 = 0x0800
+VLAN_ETHERTYPES = (0x8100, 0x88A8, 0x9100)
+SLL_PROTOCOL_CAN = (0x000C, 0x000D)  # CAN, CAN FD
+CAN_EFF_FLAG = 0x80000000
+CAN_EFF_MASK = 0x1FFFFFFF
+CAN_SFF_MASK = 0x7FF
+
+PCAP_MAGICS = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1000), b'\xa1\xb2\xc3\xd4': ('>', 1000),  # mikrosaniye
+    b'\x4d\x3c\xb2\xa1': ('<', 1), b'\xa1\xb2\x3c\x4d': ('>', 1),        # nanosaniye
+}
+PCAPNG_SHB = 0x0A0D0D0A
+
+
+# ===============================================================
+# 1. Kayıt Okuyucular (yalnızca kayıt başlıkları)
+# ===============================================================
+
+class _Batch:
+    """Bir okuma bloğundaki paketler: veri ofseti, yakalanan uzunluk, zaman (ns), link tipi."""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.offsets = []
+        self.caplens = []
+        self.ts_ns = []
+        self.linktypes = []
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+def _blocks(f):
+    """
+    Dosyayı READ_BLOCK'luk parçalar halinde verir. Gönderilen (send) bayt sayısından
+    sonrası bir sonraki parçanın başına eklenir - bloktan büyük kayıtlar da böylece tamamlanır.
+    """
+    pending = b''
+    while True:
+        chunk = f.read(READ_BLOCK)
+        data = pending + chunk if pending else chunk
+        if not data:
+            return
+        consumed = yield data, not chunk
+        pending = data[consumed:]
+        if not chunk:
+            return
+
+
+def _iter_pcap(f, header):
+    endian, frac_ns = PCAP_MAGICS[header[:4]]
+    linktype = struct.unpack_from(endian + 'I', header, 20)[0] & 0x0FFFFFFF
+    record = struct.Struct(endian + 'IIII')
+    unpack = record.unpack_from
+
+    blocks = _blocks(f)
+    consumed = None
+    while True:
+        try:
+            buf, eof = blocks.send(consumed)
+        except StopIteration:
+            return
+        batch = _Batch(buf)
+        offsets, caplens, ts_ns = batch.offsets, batch.caplens, batch.ts_ns
+        pos, end = 0, len(buf)
+        while pos + 16 <= end:
+            ts_sec, ts_frac, caplen, _ = unpack(buf, pos)
+            if pos + 16 + caplen > end:
+                break
+            offsets.append(pos + 16)
+            caplens.append(caplen)
+            ts_ns.append(ts_sec * 1_000_000_000 + ts_frac * frac_ns)
+            pos += 16 + caplen
+        batch.linktypes = [linktype] * len(offsets)
+        consumed = pos
+        if batch.offsets:
+            yield batch
+        if eof:
+            return
+
+
+def _tsresol_units(value):
+    """pcapng if_tsresol -> saniyedeki birim sayısı."""
+    return 2 ** (value & 0x7F) if value & 0x80 else 10 ** value
+
+
+def _parse_idb(buf, pos, block_len, endian):
+    linktype = struct.unpack_from(endian + 'H', buf, pos + 8)[0]
+    units = 1_000_000
+    opt, opt_end = pos + 16, pos + block_len - 4
+    while opt + 4 <= opt_end:
+        code, length = struct.unpack_from(endian + 'HH', buf, opt)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:  # if_tsresol
+            units = _tsresol_units(buf[opt + 4])
+        opt += 4 + (length + 3) // 4 * 4
+    # Tam sayı ile ns'ye çevrilebiliyorsa (10^-3 .. 10^-9) çarpan, değilse bölen
+    if 1_000_000_000 % units == 0:
+        return linktype, 1_000_000_000 // units, 1
+    return linktype, 1_000_000_000, units
+
+
+def _iter_pcapng(f):
+    blocks = _blocks(f)
+    consumed = None
+    endian = '<'
+    interfaces = []  # (linktype, mul, div)
+    last_ts = 0
+    while True:
+        try:
+            buf, eof = blocks.send(consumed)
+        except StopIteration:
+            return
+        batch = _Batch(buf)
+        pos, end = 0, len(buf)
+        while pos + 12 <= end:
+            block_type = struct.unpack_from(endian + 'I', buf, pos)[0]
+            if block_type == PCAPNG_SHB:
+                endian = '<' if buf[pos + 8:pos + 12] == b'\x4d\x3c\x2b\x1a' else '>'
+                interfaces = []
+            block_len = struct.unpack_from(endian + 'I', buf, pos + 4)[0]
+            if block_len < 12:
+                raise ValueError(f"bozuk pcapng bloğu (ofset {pos})")
+            if pos + block_len > end:
+                break
+            if block_type == 6 or block_type == 2:  # Enhanced Packet Block / (eski) Packet Block
+                if block_type == 6:
+                    iface, ts_high, ts_low, caplen = struct.unpack_from(endian + 'IIII', buf, pos + 8)
+                else:
+                    iface, _, ts_high, ts_low, caplen = struct.unpack_from(endian + 'HHIII', buf, pos + 8)
+                linktype, mul, div = interfaces[iface]
+                last_ts = ((ts_high << 32) | ts_low) * mul // div
+                batch.offsets.append(pos + 28)
+                batch.caplens.append(caplen)
+                batch.ts_ns.append(last_ts)
+                batch.linktypes.append(linktype)
+            elif block_type == 3:  # Simple Packet Block (zaman damgası yok: öncekini kullan)
+                original_len = struct.unpack_from(endian + 'I', buf, pos + 8)[0]
+                batch.offsets.append(pos + 12)
+                batch.caplens.append(min(original_len, block_len - 16))
+                batch.ts_ns.append(last_ts)
+                batch.linktypes.append(interfaces[0][0])
+            elif block_type == 1:  # Interface Description Block
+                interfaces.append(_parse_idb(buf, pos, block_len, endian))
+            pos += block_len
+        consumed = pos
+        if batch.offsets:
+            yield batch
+        if eof:
+            return
+
+
+def iter_packets(pcap_file):
+    """pcap veya pcapng dosyasındaki paketleri blok blok _Batch olarak verir."""
+    with open(pcap_file, 'rb') as f:
+        header = f.read(24)
+        if header[:4] in PCAP_MAGICS:
+            yield from _iter_pcap(f, header)
+        elif len(header) >= 4 and struct.unpack('<I', header[:4])[0] == PCAPNG_SHB:
+            f.seek(0)
+            yield from _iter_pcapng(f)
+        else:
+            raise ValueError('pcap/pcapng dosyası değil')
+
+
+# ===============================================================
+# 2. Vektörel Başlık Çözümü
+# ===============================================================
+
+def _decode_batch(batch, start_ns):
+    """Bir bloktaki tüm paketlerin özniteliklerini NumPy ile hesaplar."""
+    data = np.frombuffer(batch.buf, dtype=np.uint8)
+    last = len(data) - 1
+    off = np.asarray(batch.offsets, dtype=np.int64)
+    cap = np.asarray(batch.caplens, dtype=np.int64)
+    link = np.asarray(batch.linktypes, dtype=np.int64)
+    pkt_end = off + cap
+
+    def u8(idx, valid):
+        return np.where(valid, data[np.clip(idx, 0, last)], 0).astype(np.int64)
+
+    def be16(idx, valid):
+        return (u8(idx, valid) << 8) | u8(idx + 1, valid)
+
+    def be32(idx, valid):
+        return (be16(idx, valid) << 16) | be16(idx + 2, valid)
+
+    def has(idx, length):
+        return idx + length <= pkt_end
+
+    ethertype = np.zeros(len(off), dtype=np.int64)
+    l3 = off.copy()
+    can_frame = np.zeros(len(off), dtype=bool)
+
+    # Ethernet (+ en fazla iki VLAN etiketi)
+    is_eth = (link == LINKTYPE_ETHERNET) & has(off, 14)
+    ethertype = np.where(is_eth, be16(off + 12, is_eth), ethertype)
+    l3 = np.where(is_eth, off + 14, l3)
+    for _ in range(2):
+        tagged = is_eth & np.isin(ethertype, VLAN_ETHERTYPES) & has(l3, 4)
+        ethertype = np.where(tagged, be16(l3 + 2, tagged), ethertype)
+        l3 = np.where(tagged, l3 + 4, l3)
+
+    # Raw IP: sürüm alanından
+    is_raw = np.isin(link, RAW_IP_LINKTYPES) & has(off, 1)
+    ethertype = np.where(is_raw & ((u8(off, is_raw) >> 4) == 4), ETHERTYPE_IPV4, ethertype)
+
+    # BSD loopback: 4 baytlık adres ailesi (yakalayan makinenin bayt sırası), AF_INET = 2
+    is_loop = np.isin(link, (LINKTYPE_NULL, LINKTYPE_LOOP)) & has(off, 4)
+    family = be32(off, is_loop)
+    ethertype = np.where(is_loop & ((family == 2) | (family == 0x02000000)), ETHERTYPE_IPV4, ethertype)
+    l3 = np.where(is_loop, off + 4, l3)
+
+    # Linux cooked capture: protokol SLL'de 14. baytta, SLL2'de başta
+    for linktype, proto_at, header_len in ((LINKTYPE_LINUX_SLL, 14, 16), (LINKTYPE_LINUX_SLL2, 0, 20)):
+        is_sll = (link == linktype) & has(off, header_len)
+        proto = be16(off + proto_at, is_sll)
+        ethertype = np.where(is_sll, proto, ethertype)
+        l3 = np.where(is_sll, off + header_len, l3)
+        can_frame |= is_sll & np.isin(proto, SLL_PROTOCOL_CAN)
+
+    # SocketCAN
+    is_can = link == LINKTYPE_CAN_SOCKETCAN
+    can_frame |= is_can
+    l3 = np.where(is_can, off, l3)
+
+    # IPv4 -> TCP/UDP (parçalanmış paketlerde yalnızca ilk parça, scapy ile aynı)
+    is_ip = (ethertype == ETHERTYPE_IPV4) & has(l3, 20) & ~can_frame
+    is_ip &= (u8(l3, is_ip) >> 4) == 4
+
+    def ip_fields(l3):
+        return u8(l3 + 9, is_ip), (be16(l3 + 6, is_ip) & 0x1FFF) == 0, l3 + (u8(l3, is_ip) & 0x0F) * 4
+
+    ip_proto, first_fragment, l4 = ip_fields(l3)
+    for _ in range(2):
+        # IP-in-IP tüneli: scapy iç paketteki TCP/UDP'yi de sayar
+        inner = is_ip & first_fragment & (ip_proto == 4) & has(l4, 20)
+        inner &= (u8(l4, inner) >> 4) == 4
+        if not inner.any():
+            break
+        l3 = np.where(inner, l4, l3)
+        ip_proto, first_fragment, l4 = ip_fields(l3)
+    l4_present = has(l4, 1)
+    is_tcp = is_ip & first_fragment & (ip_proto == 6) & l4_present
+    is_udp = is_ip & first_fragment & (ip_proto == 17) & l4_present
+
+    # CAN ID: pcap'te ağ (big-endian) bayt sırası; cooked yakalamalarda makinenin
+    # sırası olabilir - bayraksız 11 bitlik ID'ye sığmıyorsa little-endian okunur
+    can_frame &= has(l3, 4)
+    can_id = be32(l3, can_frame)
+    swapped = can_frame & ~is_can & ((can_id & CAN_EFF_FLAG) == 0) & (can_id > CAN_SFF_MASK)
+    can_id = np.where(swapped, (u8(l3 + 3, swapped) << 24) | (u8(l3 + 2, swapped) << 16)
+                      | (u8(l3 + 1, swapped) << 8) | u8(l3, swapped), can_id)
+    identifier = np.where(can_id & CAN_EFF_FLAG, can_id & CAN_EFF_MASK, can_id & CAN_SFF_MASK)
+
+    return {
+        'timestamp': (np.asarray(batch.ts_ns, dtype=np.int64) - start_ns) / 1e9,
+        'length': cap,
+        'protocol_ip': is_ip,
+        'protocol_tcp': is_tcp,
+        'protocol_udp': is_udp,
+        'protocol_can': can_frame,
+        'protocol_other': ~is_ip & ~can_frame,
+        'can_id_anomaly': can_frame & (identifier == ANOMALOUS_CAN_ID),
+    }
+
 
 # ===============================================================
-# 1. Öznitelik Çıkarma Fonksiyonu
+# 3. Öznitelik Çıkarma Fonksiyonları
 # ===============================================================
 
+def _new_columns(size):
+    columns = {name: np.zeros(size, dtype=np.int8) for name in FEATURE_COLUMNS}
+    columns['timestamp'] = np.zeros(size, dtype=np.float64)
+    columns['length'] = np.zeros(size, dtype=np.int64)
+    return columns
+
+
+def _frame(columns, count, label):
+    df = pd.DataFrame({name: values[:count] for name, values in columns.items()}, columns=FEATURE_COLUMNS)
+    df['label'] = label
+    return df
+
+
+def iter_feature_chunks(pcap_file, label, chunk_packets=CHUNK_PACKETS):
+    """Öznitelikleri en fazla chunk_packets satırlık DataFrame parçaları halinde verir."""
+    columns = _new_columns(chunk_packets)
+    filled = 0
+    start_ns = None
+    for batch in iter_packets(pcap_file):
+        if start_ns is None:
+            start_ns = batch.ts_ns[0]
+        features = _decode_batch(batch, start_ns)
+        done = 0
+        while done < len(batch):
+            take = min(len(batch) - done, chunk_packets - filled)
+            for name, values in features.items():
+                columns[name][filled:filled + take] = values[done:done + take]
+            filled += take
+            done += take
+            if filled == chunk_packets:
+                yield _frame(columns, filled, label)
+                columns = _new_columns(chunk_packets)
+                filled = 0
+    if filled:
+        yield _frame(columns, filled, label)
+
+
 def extract_features(pcap_file, label):
-    """Pcap dosyasını okur ve makine öğrenimi için öznitelikleri çıkarır."""
+    """Pcap dosyasını okur ve makine öğrenimi için öznitelikleri çıkarır (küçük dosyalar, tek DataFrame)."""
 
     # Dosya yoksa kontrol et
     if not os.path.exists(pcap_file):
         print(f"Hata: '{pcap_file}' dosyası bulunamadı.")
         return None
 
-    # Dosya okuma ve hata yönetimi
     try:
-        packets = rdpcap(pcap_file)
-    except Exception as e:
+        chunks = list(iter_feature_chunks(pcap_file, label))
+    except (OSError, ValueError, struct.error, IndexError) as e:
         print(f"Hata: {pcap_file} okunamadı: {e}")
         return None
 
-    data = []
-    start_time = packets[0].time if packets else 0
-
-    for packet in packets:
-        features = {
-            'timestamp': float(packet.time - start_time),
-            'length': len(packet),
-            'protocol_ip': 0,
-            'protocol_tcp': 0,
-            'protocol_udp': 0,
-            'protocol_can': 0,
-            'protocol_other': 0,
-            'can_id_anomaly': 0, 
-            'label': label
-        }
-
-        # Protokol Kontrolleri
-        if IP in packet:
-            features['protocol_ip'] = 1
-            if TCP in packet:
-                features['protocol_tcp'] = 1
-            elif UDP in packet:
-                features['protocol_udp'] = 1
-
-        # CAN Protokolü Kontrolü (Sadece CAN başarıyla içe aktarılabildiyse çalışır)
-        if CAN is not None:
-            if CAN in packet:
-                features['protocol_can'] = 1
-
-                # CAN ID Anomalisini Belirleme (Saldırı ID'si 0x7FF)
-                try:
-                    # Eğer CAN paketinin ID'si 0x7FF ise, anomali etiketlenir.
-                    if packet[CAN].id == 0x7FF: 
-                        features['can_id_anomaly'] = 1
-                except:
-                    pass 
-
-        # Diğer Protokoller
-        if not features['protocol_ip'] and not features['protocol_can']:
-             features['protocol_other'] = 1
-
-        data.append(features)
-
-    return pd.DataFrame(data)
+    if not chunks:
+        return pd.DataFrame(columns=FEATURE_COLUMNS + ['label'])
+    return pd.concat(chunks, ignore_index=True)
+
+
+# ===============================================================
+# 4. Parçalı Yazma (CSV / Parquet) ve Paralel Çalıştırma
+# ===============================================================
+
+def _output_format(path):
+    return 'parquet' if path.lower().endswith('.parquet') else 'csv'
+
+
+def write_features(pcap_file, label, out_path, chunk_packets=CHUNK_PACKETS):
+    """Tek bir yakalamanın özniteliklerini out_path'e parça parça yazar. Paket sayısını döndürür."""
+    count = 0
+    if _output_format(out_path) == 'parquet':
+        writer = None
+        for df in iter_feature_chunks(pcap_file, label, chunk_packets):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, table.schema, compression='snappy')
+            writer.write_table(table)
+            count += len(df)
+        if writer is not None:
+            writer.close()
+        return count
+
+    with open(out_path, 'w', encoding='utf-8', newline='') as f:
+        for df in iter_feature_chunks(pcap_file, label, chunk_packets):
+            df.to_csv(f, header=count == 0, index=False)
+            count += len(df)
+    return count
+
+
+def _extract_worker(task):
+    pcap_file, label, part_path, chunk_packets = task
+    if not os.path.exists(pcap_file):
+        return None, f"'{pcap_file}' dosyası bulunamadı."
+    try:
+        return write_features(pcap_file, label, part_path, chunk_packets), None
+    except (OSError, ValueError, struct.error, IndexError) as e:
+        return None, f"{pcap_file} okunamadı: {e}"
+
+
+def _merge_parts(part_paths, out_path):
+    """Dosya başına yazılan parçaları sırayla tek çıktıda birleştirir (bellekte tutmadan)."""
+    if _output_format(out_path) == 'parquet':
+        writer = None
+        for path in part_paths:
+            part = pq.ParquetFile(path)
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, part.schema_arrow, compression='snappy')
+            for group in range(part.num_row_groups):
+                writer.write_table(part.read_row_group(group))
+        if writer is not None:
+            writer.close()
+        return
+    with open(out_path, 'wb') as out:
+        for index, path in enumerate(part_paths):
+            with open(path, 'rb') as part:
+                if index > 0:
+                    part.readline()  # Başlık satırı yalnızca bir kez
+                shutil.copyfileobj(part, out, READ_BLOCK)
+
+
+def extract_all(file_list, out_path, workers=None, chunk_packets=CHUNK_PACKETS):
+    """[(pcap, etiket), ...] listesini paralel işler, sonuçları out_path'te (CSV/Parquet) birleştirir."""
+    if _output_format(out_path) == 'parquet' and pq is None:
+        raise RuntimeError("Parquet çıktısı için pyarrow gerekli (pip install pyarrow)")
+
+    part_dir = tempfile.mkdtemp(prefix='features_', dir=os.path.dirname(os.path.abspath(out_path)))
+    suffix = '.parquet' if _output_format(out_path) == 'parquet' else '.csv'
+    tasks = [(pcap_file, label, os.path.join(part_dir, f"part-{i:04d}{suffix}"), chunk_packets)
+             for i, (pcap_file, label) in enumerate(file_list)]
+    try:
+        workers = workers or min(len(tasks), os.cpu_count() or 1)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_extract_worker, tasks))
+        else:
+            results = [_extract_worker(task) for task in tasks]
+
+        parts, total = [], 0
+        for (pcap_file, label), (_, _, part_path, _), (count, error) in zip(file_list, tasks, results):
+            print(f"[{label.upper()}]: '{pcap_file}'")
+            if error:
+                print(f"  -> Hata: {error}")
+            elif not count:
+                print(f"  -> {pcap_file} dosyası boş.")
+            else:
+                print(f"  -> {count} paket başarıyla eklendi.")
+                parts.append(part_path)
+                total += count
+        if parts:
+            _merge_parts(parts, out_path)
+        return total
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
 
 # ===============================================================
-# 2. Veri Çıkarımını Çalıştırma ve Birleştirme
+# 5. Veri Çıkarımını Çalıştırma ve Birleştirme
 # ===============================================================
 
 # Dosya Adları ve Etiketler
-file_list = [
+DEFAULT_FILE_LIST = [
     ('normal_traffic.pcap', 'normal'),
     ('attack_traffic_pivot.pcap', 'pivot'),
     ('attack_traffic_can.pcap', 'can_spoof')
 ]
 
-all_data = []
 
-for file_name, label in file_list:
-    print(f"[{label.upper()}]: '{file_name}' dosyasından öznitelikler çıkarılıyor...")
-    df = extract_features(file_name, label)
-    if df is not None and not df.empty:
-        all_data.append(df)
-        print(f"  -> {len(df)} paket başarıyla eklendi.")
+def _parse_capture_arg(value):
+    """'dosya.pcap:etiket' (etiket yoksa dosya adı). Windows sürücü harfi ('C:\\...') bozulmaz."""
+    path, sep, label = value.rpartition(':')
+    if not sep or not path or os.path.sep in label or '/' in label:
+        return value, os.path.splitext(os.path.basename(value))[0]
+    return path, label
+
+
+def main():
+    parser = argparse.ArgumentParser(description='pcap/pcapng yakalamalarından ağ trafiği öznitelikleri çıkarır')
+    parser.add_argument('captures', nargs='*', help="'dosya.pcap:etiket' (varsayılan: senaryonun üç dosyası)")
+    parser.add_argument('--out', default='network_traffic_features.csv', help='.csv veya .parquet')
+    parser.add_argument('--workers', type=int, default=None, help='Paralel işlenen dosya sayısı')
+    parser.add_argument('--chunk-packets', type=int, default=CHUNK_PACKETS)
+    args = parser.parse_args()
+
+    file_list = [_parse_capture_arg(value) for value in args.captures] or DEFAULT_FILE_LIST
+    try:
+        total = extract_all(file_list, args.out, args.workers, args.chunk_packets)
+    except RuntimeError as e:
+        print(f"Hata: {e}")
+        sys.exit(1)
+
+    if total:
+        print("---------------------------------------------")
+        print(f"✅ TÜM VERİ ÇIKARIMI TAMAMLANDI.")
+        print(f"Toplam {total} paket, '{args.out}' dosyasına kaydedildi.")
+        print("---------------------------------------------")
     else:
-        print(f"  -> {file_name} dosyası boş veya bulunamadı.")
-
-# Tüm DataFrame'leri birleştir
-if all_data:
-    final_df = pd.concat(all_data, ignore_index=True)
-
-    # Sonuçları Kaydetme
-    output_file = 'network_traffic_features.csv'
-    final_df.to_csv(output_file, index=False)
-    print("---------------------------------------------")
-    print(f"✅ TÜM VERİ ÇIKARIMI TAMAMLANDI.")
-    print(f"Toplam {len(final_df)} paket, '{output_file}' dosyasına kaydedildi.")
-    print("---------------------------------------------")
-else:
-    print("Hata: Hiçbir veri dosyası yüklenemedi. Çıkarım başarısız.")
+        print("Hata: Hiçbir veri dosyası yüklenemedi. Çıkarım başarısız.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+"""
+Offline Bulk Scanner
+====================
+Scans a directory tree of CSV/TXT logs with the ensemble models, without going
+through the web upload:
+
+    python bulk_scan.py /data/nightly_logs --out scan_results --workers 8
+    python bulk_scan.py /data/nightly_logs --out scan_results --format csv --attacks-only
+
+- Every file is routed with determine_dataset_type() (same logic as the
+  /api/analyze/upload endpoint), using only its header / first lines.
+- Files are read in chunks (--chunksize rows) in the main process; chunks are
+  scored in a process pool. Each worker loads the models of a dataset once and
+  keeps them for the whole scan.
+- Results stream to part files, one per chunk:
+      <out>/dataset=<DATASET>/<file>-<hash>/part-00000.parquet   (or .csv)
+  with source_file, record_index, decision, confidence, attack_detected, winning_model,
+  proba_<MODEL>, reason and the raw log fields (raw_<field>).
+- Progress is checkpointed in <out>/_scan_checkpoint.json after every chunk.
+  Re-running the same command skips finished files and finished chunks, so an
+  interrupted multi-GB scan resumes where it stopped. Files are keyed by their
+  absolute real path, so adding or removing input paths does not invalidate the
+  others; a file whose size or modification time changed is scanned again from the start.
+- CSV columns are read typed (repeated text as category, see
+  log_parsers.plan_csv_read); --columns model keeps only the model features
+  and display fields, which cuts memory but drops the other raw_<field> columns.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from detect_attack_ensemble import EnsembleDetector, determine_dataset_type
+from log_parsers import CSV_SAMPLE_ROWS, parse_txt_lines, plan_csv_read
+
+SCAN_EXTENSIONS = ('.csv', '.txt')
+CHECKPOINT_NAME = '_scan_checkpoint.json'
+CHECKPOINT_VERSION = 2  # 2: files keyed by absolute real path (1: relative to the common input dir)
+
+# Per-worker detector cache (filled lazily, lives as long as the worker process)
+_DETECTORS = {}
+
+
+# ==================== FILE DISCOVERY & READING ====================
+
+def discover_files(paths, out_dir):
+    """All CSV/TXT files below `paths`, sorted, excluding the output directory."""
+    out_dir = os.path.abspath(out_dir)
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(os.path.abspath(path))
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != out_dir)
+            for name in sorted(files):
+                if name.lower().endswith(SCAN_EXTENSIONS):
+                    found.append(os.path.abspath(os.path.join(root, name)))
+    return found
+
+
+def _read_csv_chunks(path, chunksize, **kwargs):
+    # Same encoding fallback as the upload endpoint, decided on a small sample
+    try:
+        pd.read_csv(path, nrows=100, on_bad_lines='skip', encoding='utf-8')
+        encoding = 'utf-8'
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+    return pd.read_csv(path, chunksize=chunksize, on_bad_lines='skip', encoding=encoding,
+                       encoding_errors='replace', **kwargs)
+
+
+def _read_txt_chunks(path, chunksize):
+    # The format is detected on the first chunk and kept, so all parts share one schema
+    log_format = None
+    lines = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for raw in f:
+            line = raw.strip()
+            if line:
+                lines.append(line)
+                if len(lines) >= chunksize:
+                    df = parse_txt_lines(lines, log_format)
+                    log_format = df.attrs['log_format']
+                    yield df
+                    lines = []
+    if lines:
+        yield parse_txt_lines(lines, log_format)
+
+
+def route_file(path, forced_dataset=None):
+    """Picks the dataset model for a file from its header (CSV) or first lines (TXT)."""
+    if forced_dataset:
+        return forced_dataset
+    if path.lower().endswith('.txt'):
+        sample = next(_read_txt_chunks(path, 100), pd.DataFrame())
+    else:
+        sample = next(iter(_read_csv_chunks(path, 100)), pd.DataFrame())
+    return determine_dataset_type(sample, os.path.basename(path))
+
+
+def iter_chunks(path, chunksize, dataset=None, columns='all'):
+    if path.lower().endswith('.txt'):
+        return _read_txt_chunks(path, chunksize)
+    sample = next(iter(_read_csv_chunks(path, CSV_SAMPLE_ROWS)), pd.DataFrame())
+    plan = plan_csv_read(sample, dataset, columns)
+    # Only category dtypes: a chunked reader cannot fall back when a later row
+    # does not fit a numeric dtype planned from the sample
+    dtype = {col: kind for col, kind in plan['dtype'].items() if kind == 'category'}
+    return _read_csv_chunks(path, chunksize, usecols=plan['usecols'], dtype=dtype)
+
+
+# ==================== WORKER ====================
+
+def _get_detector(dataset):
+    if dataset not in _DETECTORS:
+        _DETECTORS[dataset] = EnsembleDetector(dataset)
+    return _DETECTORS[dataset]
+
+
+def _result_frame(df, results, source_file, first_index):
+    model_names = list(results[0].get('model_probabilities', {})) if results else []
+    out = pd.DataFrame({
+        'source_file': source_file,
+        'record_index': pd.RangeIndex(first_index, first_index + len(results)),
+        'decision': [r['final_decision'] for r in results],
+        'confidence': pd.Series([r['confidence_score'] for r in results], dtype='float32'),
+        'attack_detected': pd.Series([bool(r['attack_detected']) for r in results], dtype='bool'),
+        'winning_model': [r.get('winning_model', 'ENSEMBLE') for r in results],
+        'reason': [r.get('reason', '') for r in results],
+    })
+    for name in model_names:
+        out[f"proba_{name}"] = pd.Series([r['model_probabilities'].get(name) for r in results], dtype='float32')
+
+    raw = df.reset_index(drop=True)
+    raw.columns = [f"raw_{c}" for c in raw.columns]
+    for col in raw.columns:
+        if isinstance(raw[col].dtype, pd.CategoricalDtype):
+            # Categories differ per chunk; parts must share one schema
+            raw[col] = raw[col].astype(object)
+        if raw[col].dtype == object:
+            # Mixed object columns (numbers + text) cannot be written to Parquet as-is
+            raw[col] = raw[col].where(raw[col].isna(), raw[col].astype(str))
+    return pd.concat([out, raw], axis=1)
+
+
+def score_chunk(task):
+    """Scores one chunk and writes its part file. Runs in a pool worker."""
+    df = task['df']
+    detector = _get_detector(task['dataset'])
+    results = detector.detect_frame(df)
+    frame = _result_frame(df, results, task['file'], task['first_index'])
+    if task['attacks_only']:
+        frame = frame[frame['attack_detected']]
+
+    part_path = task['part_path']
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    tmp_path = part_path + '.tmp'
+    if task['format'] == 'parquet':
+        frame.to_parquet(tmp_path, index=False, compression='zstd')
+    else:
+        frame.to_csv(tmp_path, index=False, encoding='utf-8')
+    # Atomic: a part file either exists completely or not at all
+    os.replace(tmp_path, part_path)
+
+    return {
+        'file': task['file'],
+        'chunk': task['chunk'],
+        'rows': len(df),
+        'attacks': int(sum(r['attack_detected'] for r in results)),
+    }
+
+
+# ==================== CHECKPOINT ====================
+
+class Checkpoint:
+    """Per-file scan state in a small JSON file, rewritten atomically after every chunk."""
+
+    def __init__(self, path, settings):
+        self.path = path
+        self.settings = settings
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') != CHECKPOINT_VERSION:
+                raise SystemExit(
+                    f"❌ {path} was written by an older bulk_scan (checkpoint version {state.get('version')}); "
+                    "use a new --out directory"
+                )
+            if state.get('settings') != settings:
+                raise SystemExit(
+                    f"❌ {path} was written with different settings ({state.get('settings')}); "
+                    "use the same options or a new --out directory"
+                )
+            self.files = state.get('files', {})
+
+    def entry(self, key, path, dataset):
+        stat = os.stat(path)
+        entry = self.files.get(key)
+        if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+            entry = self.files[key] = {
+                'size': stat.st_size, 'mtime': stat.st_mtime, 'dataset': dataset,
+                'done_chunks': [], 'total_chunks': None, 'rows': 0, 'attacks': 0, 'complete': False,
+            }
+        return entry
+
+    def save(self):
+        state = {'version': CHECKPOINT_VERSION, 'settings': self.settings, 'files': self.files}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+# ==================== SCAN ====================
+
+def _file_output_dir(out_dir, dataset, key):
+    stem = os.path.splitext(os.path.basename(key))[0]
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(out_dir, f"dataset={dataset}", f"{stem}-{digest}")
+
+
+def _finish_chunk(checkpoint, result):
+    entry = checkpoint.files[result['file']]
+    entry['done_chunks'].append(result['chunk'])
+    entry['rows'] += result['rows']
+    entry['attacks'] += result['attacks']
+    if entry['total_chunks'] is not None and len(entry['done_chunks']) == entry['total_chunks']:
+        entry['complete'] = True
+    checkpoint.save()
+
+
+def scan(args):
+    os.makedirs(args.out, exist_ok=True)
+    files = discover_files(args.paths, args.out)
+    if not files:
+        print("❌ No CSV/TXT files found")
+        return 1
+
+    settings = {'chunksize': args.chunksize, 'format': args.format,
+                'attacks_only': args.attacks_only, 'dataset': args.dataset, 'columns': args.columns}
+    checkpoint = Checkpoint(os.path.join(args.out, CHECKPOINT_NAME), settings)
+    extension = '.parquet' if args.format == 'parquet' else '.csv'
+    base = os.path.commonpath([os.path.dirname(f) for f in files])
+
+    print(f"🔍 {len(files)} file(s), {args.workers} worker(s), chunks of {args.chunksize} rows -> {args.out}")
+    started = time.perf_counter()
+    scanned_rows = 0
+    failed_chunks = 0
+    in_flight = {}  # future -> (relpath for messages, chunk index)
+    max_in_flight = args.workers * 2  # bounds memory: at most this many chunks are parsed ahead
+
+    def drain(block_until):
+        nonlocal scanned_rows, failed_chunks
+        while len(in_flight) > block_until:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, chunk_index = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The chunk stays out of done_chunks, so the file is not complete and a re-run retries it
+                    failed_chunks += 1
+                    print(f"⚠️  {name}: chunk {chunk_index} failed ({type(e).__name__}: {e})")
+                    continue
+                _finish_chunk(checkpoint, result)
+                scanned_rows += result['rows']
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        try:
+            for path in files:
+                key = os.path.realpath(path)
+                name = os.path.relpath(path, base)  # for messages only
+                previous = checkpoint.files.get(key)
+                if previous and previous['complete']:
+                    stat = os.stat(path)
+                    if previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+                        print(f"⏭️  {name}: already scanned ({previous['rows']} rows)")
+                        continue
+
+                try:
+                    dataset = route_file(path, args.dataset)
+                except (pd.errors.ParserError, pd.errors.EmptyDataError, OSError) as e:
+                    print(f"⚠️  {name}: skipped ({e})")
+                    continue
+
+                entry = checkpoint.entry(key, path, dataset)
+                done_chunks = set(entry['done_chunks'])
+                output_dir = _file_output_dir(args.out, dataset, key)
+                if not done_chunks and os.path.isdir(output_dir):
+                    # New or changed file: drop parts left over from an earlier version
+                    for stale in os.listdir(output_dir):
+                        os.remove(os.path.join(output_dir, stale))
+                print(f"📄 {name} -> {dataset}" + (f" (resuming, {len(done_chunks)} chunk(s) done)" if done_chunks else ""))
+
+                chunk_count = 0
+                for chunk_index, df in enumerate(iter_chunks(path, args.chunksize, dataset, args.columns)):
+                    chunk_count += 1
+                    if chunk_index in done_chunks or df.empty:
+                        if df.empty and chunk_index not in done_chunks:
+                            _finish_chunk(checkpoint, {'file': key, 'chunk': chunk_index, 'rows': 0, 'attacks': 0})
+                        continue
+                    drain(max_in_flight - 1)
+                    future = pool.submit(score_chunk, {
+                        'file': key, 'chunk': chunk_index, 'dataset': dataset, 'df': df,
+                        'first_index': chunk_index * args.chunksize,
+                        'part_path': os.path.join(output_dir, f"part-{chunk_index:05d}{extension}"),
+                        'format': args.format, 'attacks_only': args.attacks_only,
+                    })
+                    in_flight[future] = (name, chunk_index)
+
+                entry['total_chunks'] = chunk_count
+                if len(entry['done_chunks']) == chunk_count:
+                    entry['complete'] = True
+                checkpoint.save()
+
+                elapsed = time.perf_counter() - started
+                print(f"   {scanned_rows} rows scored so far ({scanned_rows / elapsed:.0f} rows/s)")
+
+            drain(0)
+        except KeyboardInterrupt:
+            print("\n⛔ Interrupted - finished chunks are checkpointed, re-run the same command to resume")
+            for future in in_flight:
+                future.cancel()
+            return 130
+
+    elapsed = time.perf_counter() - started
+    # Totals cover this run's inputs only, not every file ever recorded in the checkpoint
+    entries = [checkpoint.files[key] for key in {os.path.realpath(f) for f in files} if key in checkpoint.files]
+    total_rows = sum(e['rows'] for e in entries)
+    total_attacks = sum(e['attacks'] for e in entries)
+    print("=" * 60)
+    if failed_chunks:
+        print(f"⚠️  {failed_chunks} chunk(s) failed - re-run the same command to retry them")
+    print(f"✅ Scan complete: {total_rows} rows, {total_attacks} attacks in {len(entries)} file(s)")
+    print(f"⏱️  This run: {scanned_rows} rows in {elapsed:.1f}s ({scanned_rows / max(elapsed, 1e-9):.0f} rows/s)")
+    print("=" * 60)
+    return 1 if failed_chunks else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline bulk scan of CSV/TXT logs with the ensemble models')
+    parser.add_argument('paths', nargs='+', help='Files or directories (scanned recursively)')
+    parser.add_argument('--out', default='scan_results', help='Output directory (results + checkpoint)')
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunksize', type=int, default=50000, help='Rows per scored chunk')
+    parser.add_argument('--dataset', help='Force one dataset model instead of auto-routing')
+    parser.add_argument('--columns', choices=['all', 'model'], default='all',
+                        help="'model' reads only the model features and display fields")
+    parser.add_argument('--attacks-only', action='store_true', help='Only write rows classified as attacks')
+    args = parser.parse_args()
+
+    if args.format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("--format parquet requires pyarrow (pip install pyarrow) - or use --format csv")
+    if args.dataset:
+        args.dataset = args.dataset.upper()
+    sys.exit(scan(args))
+
+
+if __name__ == '__main__':
+    main()
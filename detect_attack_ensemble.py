@@ -2,17 +2,27 @@ import joblib
 import pandas as pd
 import numpy as np
 import os
+import re
 import sys
 import json
+import logging
+import time
 import warnings
 from datetime import datetime
 
 # Suppress sklearn warnings about feature names (since we construct DF dynamically)
 warnings.filterwarnings("ignore")
 
+# Configured by the backend (log_config.py); standalone use falls back to stderr warnings
+logger = logging.getLogger("anomi.detector")
+
 # --- Configuration ---
 BASE_PATH = r"c:\Users\smt1s\OneDrive\Belgeler\GitHub\Bilgi-Sistemleri-ve-G-venli-i"
+if not os.path.isdir(BASE_PATH):
+    # Other checkouts (Linux servers, CI): models live next to this file
+    BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(BASE_PATH, "models_ensemble")
+CAN_MODELS_DIR = os.path.join(BASE_PATH, "models_can_bus")
 
 # Standardized Feature Schema for Reconstruction
 DATASET_CONFIGS = {
@@ -129,6 +139,56 @@ ATTACK_CLASSIFICATION_RULES = [
     (["anomaly", "anomali", "unusual", "abnormal", "şüpheli"], "Şarj İstasyonu Anomalisi"),
 ]
 
+# Turkish + English attack keywords - More specific to reduce false positives
+# Only trigger on clear attack indicators, not generic operational terms
+ATTACK_KEYWORDS = [
+    # Clear attack indicators (English)
+    "flood", "flooding", "ddos", "dos_attack", "brute_force", "bruteforce",
+    "injection", "sql_injection", "xss", "malware", "trojan", "backdoor",
+    "exploit", "payload", "shellcode", "rootkit", "keylogger",
+    "unauthorized_access", "privilege_escalation", "lateral_movement",
+    "data_exfiltration", "ransomware", "cryptominer",
+    # Clear attack indicators (Turkish)
+    "saldırı", "saldiri", "sızma", "kaba_kuvvet", "enjeksiyon",
+    "yetkisiz_erişim", "yetki_yükseltme", "veri_sızdırma",
+    "tehdit_algılandı", "güvenlik_ihlali", "hack_girişimi",
+    # Compound phrases that indicate attacks (not single words)
+    "intrusion detected", "attack detected", "threat detected",
+    "security breach", "malicious activity", "suspicious behavior",
+    "güvenlik ihlali", "tehdit tespit", "saldırı tespit",
+    # Removed to prevent false positives:
+    # "timestamp", "error", "fail", "denied", "alarm", "emergency", 
+    # "acil", "kritik", "critical", "anomali", "güvenlik", "bypass",
+    # "tunnel", "vpn", "firmware", "zaman"
+]
+
+# Exclude meta-columns to prevent data leakage or false positives from labels
+META_COLUMNS = {'label', 'attack_type', 'decision', 'is_attack', 'winning_model', 'confidence_score', 'monitor_id', 'job_id'}
+
+# Whitelist as one alternation: a single vectorized str.contains pass per batch
+_SAFE_PATTERN_RE = '|'.join(re.escape(p) for p in SAFE_PATTERNS)
+
+def signature_texts(df):
+    """
+    Lower-cased text used for signature matching, one entry per row: the str()
+    of every non-meta field joined with spaces (missing values skipped).
+    Built column by column, so no per-row dicts are needed.
+    """
+    text = pd.Series('', index=df.index, dtype=object)
+    has_text = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        if col in META_COLUMNS:
+            continue
+        values = df[col]
+        present = values.notna().to_numpy()
+        if not present.any():
+            continue
+        as_text = values.astype(str)
+        joined = np.where(has_text, (text + ' ' + as_text).to_numpy(), as_text.to_numpy())
+        text = pd.Series(np.where(present, joined, text.to_numpy()), index=df.index, dtype=object)
+        has_text |= present
+    return text.str.lower()
+
 def classify_attack(log_text: str, dataset_name: str = "") -> str:
     """
     EV şarj istasyonu saldırılarını sınıflandırır.
@@ -162,6 +222,42 @@ def classify_attack(log_text: str, dataset_name: str = "") -> str:
     # Genel fallback
     return "Şarj İstasyonu Anomalisi"
 
+def determine_dataset_type(df, filename):
+    """
+    Heuristic to determine which dataset model to use based on file content or name.
+    This is critical for the Ensemble system which has 10 specialized models.
+    Shared by the backend upload endpoint and the bulk scanner (bulk_scan.py);
+    only df.columns is used, so a header-only sample is enough.
+    """
+    cols = set(df.columns)
+    fname = filename.upper()
+    
+    # Check by filename first
+    if 'YOUSEF' in fname: return 'YOUSEF'
+    if 'SAMET' in fname: return 'SAMET'
+    if 'EMIRHAN' in fname and 'EMIRHNT' not in fname: return 'EMİRHAN' # Catch Emirhan but not Emirhnt
+    if 'EMIRHNT' in fname: return 'EMİRHNT'
+    if 'SUZAN' in fname: return 'SUZAN'
+    if 'ALI' in fname or 'ALİ' in fname: return 'ALİ'
+    if 'IREM' in fname or 'İREM' in fname: return 'İREM'
+    if 'IBRAHIM' in fname or 'İBRAHİM' in fname: return 'İBRAHİM'
+    if 'ATAKAN' in fname: return 'ATAKAN'
+    if 'MIRAC' in fname or 'MİRAÇ' in fname: return 'MİRAÇ'
+    
+    # Fallback: Check by columns (unique identifiers first)
+    if 'ocp_namespace' in cols or 'ocp_pod' in cols: return 'EMİRHAN'  # OpenShift/K8s logs
+    if 'price_eur_kwh' in cols: return 'SUZAN'
+    if 'protocol_can' in cols: return 'İREM'
+    if 'load_kw' in cols: return 'ATAKAN'
+    if 'input_plate' in cols: return 'MİRAÇ'
+    if 'Tuketim_kWh' in cols: return 'EMİRHNT'
+    if 'action' in cols and 'status' in cols and 'message' not in cols: return 'ALİ'
+    if 'message' in cols and 'severity' in cols: return 'EMİRHAN'  # Alternative check
+    if 'detail' in cols and 'id' in cols: return 'SAMET'  # IDS logs with hex IDs
+    if 'detail' in cols: return 'İBRAHİM'  # CSMS logs
+    
+    return 'YOUSEF' # Default fallback only if nothing else matches
+
 class EnsembleDetector:
     def __init__(self, dataset_name):
         self.name = dataset_name.upper()
@@ -176,11 +272,21 @@ class EnsembleDetector:
             if os.path.exists(path):
                 self.models[algo] = joblib.load(path)
             else:
-                print(f"Warning: Model {algo} not found at {path}")
+                logger.warning("Model %s not found at %s", algo, path, extra={'dataset': self.name})
         
         if not self.models:
             raise RuntimeError("No models loaded! Train models first.")
 
+        # Optional callback(stage, seconds, dataset, algorithm) - set by the backend for metrics
+        self.stage_observer = None
+
+    def _observe(self, stage, start, algorithm=None):
+        """Reports one stage duration (once per batch, never per row). Returns a new start time."""
+        now = time.perf_counter()
+        if self.stage_observer is not None:
+            self.stage_observer(stage, now - start, self.name, algorithm)
+        return now
+
     def preprocess(self, log_dict):
         """Converts raw log dictionary to Ensembler-ready DataFrame."""
         df = pd.DataFrame([log_dict])
@@ -216,19 +322,30 @@ class EnsembleDetector:
         """Analyzes a list of logs using vectorized operations (High Performance)."""
         if not logs_list:
             return []
+        return self.detect_frame(pd.DataFrame(logs_list))
+
+    def detect_frame(self, df):
+        """
+        Analyzes a DataFrame directly: feature and signature columns are read from
+        `df` in place, no per-row dicts are built. Returns one result per row, in order.
+        """
+        if df is None or len(df) == 0:
+            return []
+
+        started = time.perf_counter()
 
         # 1. Preprocess all logs at once using DataFrame
-        df = pd.DataFrame(logs_list)
         X = pd.DataFrame(index=df.index)
 
         # Text Construction (Vectorized)
         text_cols = self.config['features_text']
-        if text_cols:
-            valid_cols = [c for c in text_cols if c in df.columns]
-            if valid_cols:
-                X['text_blob'] = df[valid_cols].astype(str).fillna('').agg(' '.join, axis=1)
-            else:
-                X['text_blob'] = ""
+        valid_cols = [c for c in text_cols if c in df.columns]
+        if valid_cols:
+            # Same as joining astype(str) values with ' ' row by row, but column-wise
+            text_blob = df[valid_cols[0]].astype(str)
+            for c in valid_cols[1:]:
+                text_blob = text_blob + ' ' + df[c].astype(str)
+            X['text_blob'] = text_blob
         else:
             X['text_blob'] = ""
 
@@ -240,6 +357,8 @@ class EnsembleDetector:
             else:
                 X[c] = 0.0
 
+        started = self._observe('preprocess', started)
+
         # 2. Vectorized Predictions
         total_votes = np.zeros(len(df), dtype=int)
         confidences_matrix = [] # To store confidence of each model for each row
@@ -253,6 +372,7 @@ class EnsembleDetector:
             try:
                 # Batch Prediction
                 probas = model.predict_proba(X) # Shape: (N, 2)
+                started = self._observe('predict', started, algo)
                 batch_confidences = probas[:, 1] # Probability of Attack
                 
                 # Decisions (Threshold 0.5)
@@ -273,6 +393,7 @@ class EnsembleDetector:
                 for i in range(len(df)):
                     results_details[i].append(f"{algo}: Error ({str(e)})")
                 confidences_matrix.append(np.zeros(len(df)))
+                started = time.perf_counter()
 
         # 3. Council Decision (Vectorized Logic)
         confidences_matrix = np.array(confidences_matrix).T # Shape: (N, Models)
@@ -282,46 +403,30 @@ class EnsembleDetector:
         winning_models = [model_names[i] if model_names else "UNKNOWN" for i in max_conf_indices]
         highest_confidences = np.max(confidences_matrix, axis=1)
         avg_confidences = np.mean(confidences_matrix, axis=1)
-        
+        started = self._observe('council', started)
+
+        # 4. Signature Matching (Whitelist + Attack Keywords)
+        texts_for_classification = signature_texts(df)
+        whitelisted = texts_for_classification.str.contains(_SAFE_PATTERN_RE).to_numpy()
+        # First matching attack keyword in ATTACK_KEYWORDS order (also used for the explanation)
+        matched_keywords = np.full(len(df), None, dtype=object)
+        unmatched = ~whitelisted
+        for keyword in ATTACK_KEYWORDS:
+            if not unmatched.any():
+                break
+            hits = unmatched & texts_for_classification.str.contains(keyword, regex=False).to_numpy()
+            matched_keywords[hits] = keyword
+            unmatched &= ~hits
+        texts_for_classification = texts_for_classification.tolist()
+        started = self._observe('signature_match', started)
+
+        # 5. Result Building
         results = []
         for i in range(len(df)):
-            attack_votes = total_votes[i]
-            
-            # Get raw log text for classification
-            raw_log = logs_list[i]
-            
-            # Exclude meta-columns to prevent data leakage or false positives from labels
-            exclude_cols = {'label', 'attack_type', 'decision', 'is_attack', 'winning_model', 'confidence_score', 'monitor_id', 'job_id'}
-            clean_values = [str(v) for k, v in raw_log.items() if k not in exclude_cols and pd.notna(v)]
-            text_for_classification = " ".join(clean_values).lower()
-            
-            # WHITELIST CHECK: Override ML decision if safe pattern detected
-            # But only if it doesn't look like an attack (e.g. "HEARTBEAT_FLOOD" should not be whitelisted)
-            is_whitelisted = any(safe_pattern in text_for_classification for safe_pattern in SAFE_PATTERNS)
-            
-            # Turkish + English attack keywords - More specific to reduce false positives
-            # Only trigger on clear attack indicators, not generic operational terms
-            attack_keywords = [
-                # Clear attack indicators (English)
-                "flood", "flooding", "ddos", "dos_attack", "brute_force", "bruteforce",
-                "injection", "sql_injection", "xss", "malware", "trojan", "backdoor",
-                "exploit", "payload", "shellcode", "rootkit", "keylogger",
-                "unauthorized_access", "privilege_escalation", "lateral_movement",
-                "data_exfiltration", "ransomware", "cryptominer",
-                # Clear attack indicators (Turkish)
-                "saldırı", "saldiri", "sızma", "kaba_kuvvet", "enjeksiyon",
-                "yetkisiz_erişim", "yetki_yükseltme", "veri_sızdırma",
-                "tehdit_algılandı", "güvenlik_ihlali", "hack_girişimi",
-                # Compound phrases that indicate attacks (not single words)
-                "intrusion detected", "attack detected", "threat detected",
-                "security breach", "malicious activity", "suspicious behavior",
-                "güvenlik ihlali", "tehdit tespit", "saldırı tespit",
-                # Removed to prevent false positives:
-                # "timestamp", "error", "fail", "denied", "alarm", "emergency", 
-                # "acil", "kritik", "critical", "anomali", "güvenlik", "bypass",
-                # "tunnel", "vpn", "firmware", "zaman"
-            ]
-            has_attack_keyword = any(k in text_for_classification for k in attack_keywords)
+            text_for_classification = texts_for_classification[i]
+            is_whitelisted = whitelisted[i]
+            matched_k = matched_keywords[i]
+            has_attack_keyword = matched_k is not None
             
             # ATTACK KEYWORD OVERRIDE: Force attack detection if attack keyword found
             if is_whitelisted:
@@ -352,8 +457,6 @@ class EnsembleDetector:
             if is_whitelisted:
                 reason = "Güvenli Liste (Whitelist) Eşleşmesi: Normal Davranış Kalıbı"
             elif has_attack_keyword:
-                # Find which keyword matched for explanation
-                matched_k = next((k for k in attack_keywords if k in text_for_classification), "Keyword")
                 reason = f"İmza Tabanlı Tespit: '{matched_k}' şüpheli ifadesi bulundu."
             else:
                 if is_attack:
@@ -368,11 +471,121 @@ class EnsembleDetector:
                 "attack_detected": is_attack,
                 "winning_model": winning_models[i],
                 "council_votes": results_details[i],
+                # Raw attack probability of each council member (for archives/exports)
+                "model_probabilities": {name: float(confidences_matrix[i, j]) for j, name in enumerate(model_names)},
                 "reason": reason
             })
-            
+
+        self._observe('result_build', started)
         return results
 
+# --- CAN Bus Detector (models_can_bus) ---
+# Raw CAN frames as one packed little-endian record each (21 bytes): what agents send
+# to /api/ingest/can and what np.frombuffer reads without any per-frame parsing.
+CAN_FRAME_DTYPE = np.dtype([
+    ('timestamp', '<f8'),          # epoch seconds
+    ('arbitration_id', '<u4'),
+    ('dlc', 'u1'),
+    ('data', 'u1', (8,)),          # bytes past dlc are ignored (treated as 0)
+])
+CAN_UNKNOWN_ID = -1  # Encoded value for IDs the encoder never saw (e.g. fuzzing, 29-bit IDs)
+
+
+class CANBusDetector:
+    """
+    Scores raw CAN frames with the HCRL Car-Hacking RandomForest in models_can_bus/.
+
+    Frames arrive as NumPy arrays (arbitration id, dlc, 8 payload bytes); the 19
+    model features are computed column-wise and IDs are encoded through a lookup
+    table built once from the LabelEncoder (index = arbitration id), so no frame
+    is ever formatted as a string.
+    """
+
+    name = "CAN_BUS"
+
+    def __init__(self, models_dir=CAN_MODELS_DIR):
+        self.model = joblib.load(os.path.join(models_dir, "can_bus_detector.joblib"))
+        encoder = joblib.load(os.path.join(models_dir, "can_id_encoder.joblib"))
+        self.metadata = joblib.load(os.path.join(models_dir, "metadata.joblib"))
+        self.feature_names = list(self.metadata['feature_names'])
+
+        # Encoder classes are 4-digit lowercase hex strings ('0316'); LabelEncoder
+        # codes are their sorted positions
+        ids = np.array([int(c, 16) for c in encoder.classes_], dtype=np.int64)
+        self.id_table = np.full(int(ids.max()) + 1, CAN_UNKNOWN_ID, dtype=np.int32)
+        self.id_table[ids] = np.arange(len(ids), dtype=np.int32)
+
+        # Same callback contract as EnsembleDetector.stage_observer
+        self.stage_observer = None
+
+    def _observe(self, stage, start, algorithm=None):
+        now = time.perf_counter()
+        if self.stage_observer is not None:
+            self.stage_observer(stage, now - start, self.name, algorithm)
+        return now
+
+    def encode_ids(self, arbitration_ids):
+        """Arbitration ids -> encoder codes (CAN_UNKNOWN_ID for unseen ids)."""
+        ids = np.asarray(arbitration_ids, dtype=np.int64)
+        known = (ids >= 0) & (ids < len(self.id_table))
+        codes = np.full(ids.shape, CAN_UNKNOWN_ID, dtype=np.int32)
+        codes[known] = self.id_table[ids[known]]
+        return codes
+
+    def features(self, arbitration_ids, dlcs, payloads):
+        """
+        (N,) ids, (N,) dlc and (N, 8) uint8 payloads -> (N, 19) float32 matrix in
+        metadata['feature_names'] order. Payload statistics run over all 8 bytes
+        (missing bytes are 0), std is the sample std (ddof=1) and the entropy is
+        the Shannon entropy (bits) of the byte values normalized to sum 1.
+        """
+        ids = np.asarray(arbitration_ids, dtype=np.int64)
+        dlcs = np.minimum(np.asarray(dlcs, dtype=np.int64), 8)
+        data = np.asarray(payloads, dtype=np.uint8).reshape(len(ids), 8).astype(np.float64)
+        data[np.arange(8) >= dlcs[:, None]] = 0.0
+
+        total = data.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = data / total[:, None]
+            entropy = np.where(share > 0, -share * np.log2(share), 0.0).sum(axis=1)
+        entropy[total == 0] = 0.0
+        zeros = (data == 0).sum(axis=1)
+
+        return np.column_stack([
+            self.encode_ids(ids), dlcs, data,
+            total, total / 8.0, data.std(axis=1, ddof=1), entropy,
+            zeros, 8 - zeros, data.max(axis=1), data.min(axis=1),
+            ids == 0,
+        ]).astype(np.float32)
+
+    def predict_proba(self, arbitration_ids, dlcs, payloads):
+        """Attack probability per frame."""
+        started = time.perf_counter()
+        X = self.features(arbitration_ids, dlcs, payloads)
+        started = self._observe('preprocess', started)
+        probability = self.model.predict_proba(X)[:, 1]
+        self._observe('predict', started, 'RF')
+        return probability
+
+    def detect_arrays(self, arbitration_ids, dlcs, payloads, threshold=0.5):
+        """Returns {'probability', 'is_attack', 'attack_type'} arrays, one entry per frame."""
+        ids = np.asarray(arbitration_ids, dtype=np.int64)
+        if len(ids) == 0:
+            return {'probability': np.zeros(0), 'is_attack': np.zeros(0, dtype=bool),
+                    'attack_type': np.zeros(0, dtype=object)}
+        probability = self.predict_proba(ids, dlcs, payloads)
+        is_attack = probability > threshold
+
+        attack_type = np.full(len(ids), "NORMAL", dtype=object)
+        attack_type[is_attack] = "CAN Spoofing (Anormal Yük)"
+        attack_type[is_attack & (self.encode_ids(ids) == CAN_UNKNOWN_ID)] = "CAN Fuzzing (Bilinmeyen ID)"
+        attack_type[is_attack & (ids == 0)] = "CAN DoS (ID 0x000 Seli)"
+        return {'probability': probability, 'is_attack': is_attack, 'attack_type': attack_type}
+
+    def detect_frames(self, frames, threshold=0.5):
+        """detect_arrays() for a CAN_FRAME_DTYPE record array (e.g. np.frombuffer(body, CAN_FRAME_DTYPE))."""
+        return self.detect_arrays(frames['arbitration_id'], frames['dlc'], frames['data'], threshold)
+
 # --- Demo Usage ---
 if __name__ == "__main__":
     print("Initializing Ensemble Detectors...")
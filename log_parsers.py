@@ -0,0 +1,363 @@
+"""
+Format-Aware TXT Log Parsers
+============================
+Turns line-oriented log files into typed DataFrames whose columns match the
+training CSVs (and therefore DATASET_CONFIGS / determine_dataset_type):
+
+    emirhan_ocp    [ts] [LEVEL] SEVERITY: message | Aksiyon: .. | Stage: .. | Rule: .. | ID: .. | src=ip:port -> dst=ip:port | http=.. | ocp=.. | neden=".." conf=..
+                   -> timestamp, level, severity, message, action, stage, rule_id, source_ip, ... ocp_namespace, ocp_pod
+    samet_ids      [ts] [LEVEL] (SEVERITY: )detail | Durum|Aksiyon: .. | ID: 0x..
+                   -> timestamp, level, severity, detail, action, id
+    atakan_ocpp    ts - LEVEL - [SOURCE] Event: {json}
+                   -> timestamp, log_level, source, event_type, load_kw, unit
+    suzan_pricing  ts - LEVEL - [TAG] key=value ...
+                   -> timestamp, log_level, status, ocpp_message, price_eur_kwh, ...
+
+Every grammar is a precompiled regex applied with Series.str.extract, so a
+file is parsed with a handful of vectorized passes instead of per-line Python.
+The format is detected from a sample of lines (the grammar matching most of
+them wins). Unknown formats fall back to the generic comma/plain-line parsing.
+
+    df = parse_txt_lines(lines)      # df.attrs['log_format'] tells which grammar was used
+
+CSV files go through read_log_csv(): a small sample picks the dataset
+(determine_dataset_type) and a dtype plan, then the file is re-read typed
+(float32 model features, category for repeated text) with pyarrow's reader
+when it is installed.
+
+    df, dataset = read_log_csv(data, filename)                   # all columns
+    df, dataset = read_log_csv(data, filename, columns='model')  # features + display fields only
+"""
+
+import io
+import re
+
+import numpy as np
+import pandas as pd
+
+from detect_attack_ensemble import DATASET_CONFIGS, determine_dataset_type
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+
+# pandas' default na_values. pyarrow's own list lacks 'None' and '<NA>', which
+# left e.g. 500 attack_type cells of YOUSEF's dataset_final.csv as the text 'None'
+try:
+    from pandas._libs.parsers import STR_NA_VALUES as _PANDAS_NA_VALUES
+except ImportError:
+    _PANDAS_NA_VALUES = {
+        '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+        '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+    }
+CSV_NULL_VALUES = sorted(_PANDAS_NA_VALUES)
+
+SAMPLE_SIZE = 200
+MIN_MATCH_RATIO = 0.6
+
+_TS = r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?'
+
+
+class LogFormat:
+    """One line grammar: a head regex (named groups) plus optional per-field regexes."""
+
+    def __init__(self, name, detect, head, fields=None, numeric=(), postprocess=None):
+        self.name = name
+        self.detect = re.compile(detect)
+        self.head = re.compile(head)
+        self.fields = {column: re.compile(pattern) for column, pattern in (fields or {}).items()}
+        self.numeric = numeric
+        self.postprocess = postprocess
+
+    def match_ratio(self, sample):
+        return sample.str.contains(self.detect).mean() if len(sample) else 0.0
+
+    def parse(self, lines):
+        df = lines.str.extract(self.head)
+        for column, pattern in self.fields.items():
+            extracted = lines.str.extract(pattern)
+            if pattern.groups == 1:
+                df[column] = extracted[0]
+            else:
+                # Multi-group field regexes carry their own column names
+                for group in extracted.columns:
+                    df[group] = extracted[group]
+        for column in df.columns:
+            if df[column].dtype == object:
+                df[column] = df[column].str.strip()
+        if 'timestamp' in df:
+            df['timestamp'] = pd.to_datetime(df['timestamp'].str.replace(',', '.', regex=False),
+                                             format='ISO8601', errors='coerce')
+        for column in self.numeric:
+            if column in df:
+                df[column] = pd.to_numeric(df[column], errors='coerce')
+        if self.postprocess:
+            df = self.postprocess(df, lines)
+        return df
+
+
+def _samet_post(df, lines):
+    # NORMAL lines carry no severity prefix; the labeled CSV uses INFO for them
+    df['severity'] = df['severity'].fillna('INFO')
+    return df
+
+
+def _atakan_post(df, lines):
+    df['event_type'] = df['event_type'].replace({'ACİL': 'EMERGENCY'})
+    return df
+
+
+def _suzan_post(df, lines):
+    # Price of the tick/update, else the configured baseline
+    df['price_eur_kwh'] = df['price_eur_kwh'].fillna(df.pop('baseline_price'))
+    df['out_of_bounds'] = lines.str.contains('out_of_bounds', regex=False).astype('int8')
+    # The simulator logs no OCPP action; the event tag is the closest text feature
+    df['ocpp_message'] = df['status']
+    return df
+
+
+FORMATS = [
+    LogFormat(
+        'emirhan_ocp',
+        detect=r'^\[' + _TS + r'\] \[[^\]]+\] .*\| Stage: .*\| ocp=',
+        head=(r'^\[(?P<timestamp>' + _TS + r')\]\s+\[(?P<level>[^\]]+)\]\s+(?P<severity>[^:|]+):\s*'
+              r'(?P<message>[^|]*?)\s*\|\s*Aksiyon:\s*(?P<action>[^|]*?)\s*\|'),
+        fields={
+            'stage': r'\|\s*Stage:\s*([^|]*?)\s*\|',
+            'rule_id': r'\|\s*Rule:\s*([^|]*?)\s*\|',
+            'id': r'\|\s*ID:\s*(\S+)',
+            'src': r'src=(?P<source_ip>[^\s:]+):(?P<source_port>\d+)',
+            'dst': r'dst=(?P<dest_ip>[^\s:]+):(?P<dest_port>\d+)',
+            'http': r'http=(?P<http_method>\S+)\s+(?P<http_path>\S+)\s+(?P<http_status>\d+)',
+            'user_agent': r'ua="([^"]*)"',
+            'ocp': (r'ocp=cluster:(?P<ocp_cluster>\S+)\s+ns:(?P<ocp_namespace>\S+)\s+pod:(?P<ocp_pod>\S+)'
+                    r'(?:\s+node:(?P<ocp_node>\S+))?(?:\s+route:(?P<ocp_route>\S+))?'),
+            'reason': r'neden="([^"]*)"',
+            'conf': r'conf=([\d.]+)',
+        },
+        numeric=('source_port', 'dest_port', 'http_status', 'conf'),
+    ),
+    LogFormat(
+        'samet_ids',
+        detect=r'^\[' + _TS + r'\] \[[^\]]+\] [^|]+\| (?:Durum|Aksiyon): [^|]+\| ID: \S+\s*$',
+        head=(r'^\[(?P<timestamp>' + _TS + r')\]\s+\[(?P<level>[^\]]+)\]\s+'
+              r'(?:(?P<severity>[A-ZÇĞİÖŞÜ]+):\s*)?(?P<detail>[^|]*?)\s*\|\s*(?:Durum|Aksiyon):\s*'
+              r'(?P<action>[^|]*?)\s*\|\s*ID:\s*(?P<id>\S+)'),
+        postprocess=_samet_post,
+    ),
+    LogFormat(
+        'suzan_pricing',
+        detect=r'^' + _TS + r' - \w+ - \[[A-Z_]+\] (?:[a-z_]+=|[a-z_]+\s*$)',
+        head=r'^(?P<timestamp>' + _TS + r')\s+-\s+(?P<log_level>\w+)\s+-\s+\[(?P<status>[A-Z_]+)\]',
+        fields={
+            'price_eur_kwh': r'\bprice=(-?[\d.]+)',
+            'baseline_price': r'\bbaseline_price=(-?[\d.]+)',
+            'step': r'\b(?:step|tick)=(\d+)',
+            'currency': r'\b([A-Z]{3})/kWh',
+            'charge_point': r'\bcharge_point=(\S+)',
+        },
+        numeric=('price_eur_kwh', 'baseline_price', 'step'),
+        postprocess=_suzan_post,
+    ),
+    LogFormat(
+        'atakan_ocpp',
+        detect=r'^' + _TS + r' - \w+ - \[[^\]]+\] [^\s:!]+[:!]',
+        head=(r'^(?P<timestamp>' + _TS + r')\s+-\s+(?P<log_level>\w+)\s+-\s+\[(?P<source>[^\]]+)\]\s+'
+              r'(?P<event_type>[^\s:!]+)'),
+        fields={
+            'load_kw': r'"value":\s*"(-?[\d.]+)"',
+            'unit': r'"unit":\s*"(\w+)"',
+            'connector_id': r'"connectorId":\s*(\d+)',
+        },
+        numeric=('load_kw', 'connector_id'),
+        postprocess=_atakan_post,
+    ),
+]
+
+FORMATS_BY_NAME = {fmt.name: fmt for fmt in FORMATS}
+
+
+def detect_format(lines):
+    """Returns the best matching LogFormat for a sample of lines (None if nothing fits)."""
+    sample = pd.Series(list(lines[:SAMPLE_SIZE]), dtype=object)
+    ratios = [(fmt.match_ratio(sample), fmt) for fmt in FORMATS]
+    ratio, best = max(ratios, key=lambda item: item[0])
+    return best if ratio >= MIN_MATCH_RATIO else None
+
+
+# Header guesses for generic comma separated lines (decided per column, not per cell)
+_LABEL_VALUES = {'NORMAL', 'SALDIRI', 'ATTACK'}
+_LEVEL_VALUES = {'INFO', 'WARN', 'ERROR', 'CRITICAL'}
+_RESULT_VALUES = {'OK', 'FAIL'}
+
+
+def _guess_header(position, values):
+    value = values.dropna()
+    value = value.iloc[0] if len(value) else ''
+    if position == 0 and (':' in value or '-' in value): return "Zaman Damgası"
+    if value in _LABEL_VALUES: return "Etiket/Durum"
+    if value in _LEVEL_VALUES: return "Seviye"
+    if '0x' in value: return "Hata Kodu"
+    if value in _RESULT_VALUES: return "İşlem Sonucu"
+    return f"Attribute_{position + 1}"
+
+
+def _parse_generic(lines):
+    # Smart Parsing for Comma Separated TXT (User Request: Show Attributes)
+    if len(lines) and ',' in lines.iloc[0]:
+        parts = lines.str.split(',', expand=True)
+        df = pd.DataFrame({'message': lines})  # Keep full message
+        for position in parts.columns:
+            column = parts[position].str.strip()
+            header = _guess_header(position, column)
+            # Avoid duplicates
+            if header in df: header = f"{header}_{position}"
+            df[header] = column
+        return df
+    return pd.DataFrame({'message': lines, 'detail': lines})
+
+
+def parse_txt_lines(lines, log_format=None):
+    """
+    Parses stripped, non-empty log lines (list or Series) into a DataFrame.
+    `log_format` forces a grammar by name ('generic' = no grammar); otherwise it
+    is detected from a sample.
+    """
+    series = lines.reset_index(drop=True) if isinstance(lines, pd.Series) else pd.Series(lines, dtype=object)
+    fmt = FORMATS_BY_NAME.get(log_format) if log_format else detect_format(series)
+    if fmt is None:
+        df = _parse_generic(series)
+        df.attrs['log_format'] = 'generic'
+        return df
+
+    df = fmt.parse(series)
+    unmatched = df.iloc[:, 0].isna()
+    if unmatched.any():
+        # Lines the grammar does not cover (banners, stack traces) keep their text
+        text_column = 'message' if 'message' in df else ('detail' if 'detail' in df else 'raw_line')
+        if text_column not in df:
+            df[text_column] = np.nan
+        df.loc[unmatched, text_column] = series[unmatched]
+    df.attrs['log_format'] = fmt.name
+    return df
+
+
+def parse_txt_text(text, log_format=None):
+    """Splits raw file content into lines (vectorized) and parses them."""
+    lines = pd.Series(text.splitlines(), dtype=object).str.strip()
+    return parse_txt_lines(lines[lines != ''], log_format)
+
+
+# ==================== CSV ====================
+
+CSV_SAMPLE_ROWS = 1000
+# Object columns whose sample has at most this share of distinct values are read as category
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# Kept by columns='model' next to the model features (shown in previews/exports)
+DISPLAY_COLUMNS = ('timestamp', 'Tarih', 'label', 'attack_type', 'id', 'source', 'level', 'severity', 'status')
+
+
+def _sample_csv(source, nrows):
+    """Reads the first rows, with the upload endpoint's utf-8 -> latin-1 fallback. Returns (sample, encoding)."""
+    for encoding in ('utf-8', 'latin-1'):
+        try:
+            return pd.read_csv(_open(source), nrows=nrows, on_bad_lines='skip', encoding=encoding), encoding
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("Unsupported file encoding")
+
+
+def _open(source):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def plan_csv_read(sample, dataset, columns='all'):
+    """
+    Returns read_csv keyword arguments (usecols, dtype) for `dataset` from a sample.
+    columns='all' keeps every field: signature matching and the result previews
+    read all of them. columns='model' keeps only the model features and DISPLAY_COLUMNS.
+    """
+    config = DATASET_CONFIGS.get(dataset, {'features_text': [], 'features_num': []})
+    features = set(config['features_text']) | set(config['features_num'])
+
+    usecols = list(sample.columns)
+    if columns == 'model':
+        usecols = [c for c in sample.columns if c in features or c in DISPLAY_COLUMNS] or usecols
+
+    dtype = {}
+    rows = max(len(sample), 1)
+    for col in usecols:
+        values = sample[col]
+        if col in config['features_num'] and pd.api.types.is_float_dtype(values):
+            # Tree models work in float32 internally, so this loses nothing
+            dtype[col] = 'float32'
+        elif values.dtype == object:
+            # Explicit str keeps text as read (no date inference by the pyarrow reader)
+            dtype[col] = 'category' if values.nunique(dropna=True) / rows <= CATEGORY_MAX_UNIQUE_RATIO else 'str'
+    return {'usecols': usecols, 'dtype': dtype}
+
+
+def _read_arrow(source, encoding, plan):
+    """pyarrow's multithreaded reader with the planned column types (strings stay strings)."""
+    arrow_types = {'float32': pa.float32(), 'category': pa.dictionary(pa.int32(), pa.string()), 'str': pa.string()}
+    table = pa_csv.read_csv(
+        _open(source),
+        read_options=pa_csv.ReadOptions(encoding=encoding),
+        parse_options=pa_csv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=plan['usecols'],
+            column_types={col: arrow_types[kind] for col, kind in plan['dtype'].items()},
+            null_values=CSV_NULL_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas()
+
+
+def display_frame(df):
+    """
+    Widens float32 columns back to float64 through their shortest repr, so rows
+    shown or exported read 0.45 instead of 0.44999998807907104.
+    """
+    narrow = [col for col in df.columns if df[col].dtype == np.float32]
+    if not narrow:
+        return df
+    df = df.copy()
+    for col in narrow:
+        df[col] = df[col].astype(str).astype('float64')
+    return df
+
+
+def sniff_csv(source, filename, columns='all', sample_rows=CSV_SAMPLE_ROWS):
+    """Reads a sample to choose the dataset and the read plan. Returns (dataset, plan, encoding)."""
+    sample, encoding = _sample_csv(source, sample_rows)
+    dataset = determine_dataset_type(sample, filename)
+    return dataset, plan_csv_read(sample, dataset, columns), encoding
+
+
+def read_planned_csv(source, plan, encoding='utf-8'):
+    """
+    Reads a CSV with a plan from plan_csv_read(). Used for whole files and for
+    later pieces of the same file (chunked uploads), which keep the first plan.
+    """
+    try:
+        if pa is not None:
+            return _read_arrow(source, encoding, plan)
+        return pd.read_csv(_open(source), on_bad_lines='skip', encoding=encoding, **plan)
+    except (ValueError, TypeError, KeyError):
+        # A value outside the sampled rows does not fit the planned dtype, or the
+        # header needs pandas' renaming (duplicate/empty names): fall back to inferred types
+        return pd.read_csv(_open(source), on_bad_lines='skip', encoding=encoding,
+                           encoding_errors='replace', usecols=plan['usecols'])
+
+
+def read_log_csv(source, filename, columns='all', sample_rows=CSV_SAMPLE_ROWS):
+    """
+    Two-phase CSV read: sniff a sample to choose the dataset and dtypes, then
+    re-read typed (and column-pruned with columns='model'). `source` is the file
+    content (bytes) or a path. Returns (df, dataset).
+    """
+    dataset, plan, encoding = sniff_csv(source, filename, columns, sample_rows)
+    return read_planned_csv(source, plan, encoding), dataset
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, Response, send_file
+from flask import Flask, request, jsonify, Response, send_file, g, make_response
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
@@ -12,52 +12,180 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
+import functools
+import itertools
 import json
 from werkzeug.utils import secure_filename
-import traceback
 import time
 import random
+import shutil
+import tarfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+
+from log_config import setup_logging, get_logger
+
+# Structured, queue-based logging (no synchronous stdout writes on the request path)
+setup_logging()
+logger = get_logger('backend')
 
 # Add PROJECT ROOT to path to import detect_attack_ensemble
 # Project root is: c:\Users\smt1s\OneDrive\Belgeler\GitHub\Bilgi-Sistemleri-ve-G-venli-i
 # Also defined for file serving
 PROJECT_ROOT = r"c:\Users\smt1s\OneDrive\Belgeler\GitHub\Bilgi-Sistemleri-ve-G-venli-i"
+if not os.path.isdir(PROJECT_ROOT):
+    # Other checkouts (Linux servers): backend/ -> logiz-ensemble-standalone/ -> project root
+    PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
 sys.path.append(PROJECT_ROOT)
 
 try:
-    from detect_attack_ensemble import EnsembleDetector, DATASET_CONFIGS
+    from detect_attack_ensemble import EnsembleDetector, DATASET_CONFIGS, determine_dataset_type
+    from detect_attack_ensemble import CANBusDetector, CAN_FRAME_DTYPE
+    from log_parsers import parse_txt_text, read_log_csv, display_frame, sniff_csv, read_planned_csv
 except ImportError as e:
-    print(f"Error importing EnsembleDetector: {e}")
+    logger.error("Error importing EnsembleDetector: %s", e)
     # Fallback/Mock for testing if import fails
     class EnsembleDetector:
         def __init__(self, name): self.name = name
         def detect(self, log): return {'final_decision': 'ERROR', 'confidence_score': 0.0, 'winning_model': 'NONE', 'council_votes': []}
     DATASET_CONFIGS = {}
+    def determine_dataset_type(df, filename): return 'SAMET'
+    class CANBusDetector:
+        def __init__(self): raise RuntimeError("CAN bus detector unavailable (detect_attack_ensemble import failed)")
+    CAN_FRAME_DTYPE = np.dtype([('timestamp', '<f8'), ('arbitration_id', '<u4'), ('dlc', 'u1'), ('data', 'u1', (8,))])
+    def parse_txt_text(text): return pd.DataFrame({'message': text.splitlines(), 'detail': text.splitlines()})
+    def read_log_csv(source, filename, columns='all'):
+        df = pd.read_csv(io.BytesIO(source), on_bad_lines='skip', encoding='latin-1')
+        return df, determine_dataset_type(df, filename)
+    def display_frame(df): return df
+    def sniff_csv(source, filename, columns='all'):
+        return read_log_csv(source, filename)[1], {}, 'latin-1'
+    def read_planned_csv(source, plan, encoding='utf-8'):
+        return pd.read_csv(io.BytesIO(source), on_bad_lines='skip', encoding=encoding, **plan)
+
+import result_archive
+from chunked_upload import ChunkedUploadStore, UploadError
+from rate_limiter import TokenBucketLimiter, allow_all
+from state_store import create_state_store
+import serialization
+import metrics
 
 # ssh_monitor removed - using agent-based monitoring
 
 # ==================== MODEL CACHE (Performance) ====================
 # Load models once at startup instead of per-request
 MODEL_CACHE = {}
+MODEL_CACHE_LOCK = threading.Lock()  # Upload threads may ask for the same model at once
+CAN_DATASET = 'CAN_BUS'  # Raw-frame CANBusDetector (models_can_bus/), cached next to the ensembles
 
 def get_detector(dataset_type="SAMET"):
-    """Get or create a cached EnsembleDetector instance."""
+    """Get or create a cached EnsembleDetector (or, for CAN_DATASET, CANBusDetector) instance."""
     if dataset_type not in MODEL_CACHE:
-        print(f"📦 Loading model for {dataset_type} (first time)...")
-        MODEL_CACHE[dataset_type] = EnsembleDetector(dataset_type)
-        print(f"✅ Model {dataset_type} cached successfully.")
+        with MODEL_CACHE_LOCK:
+            if dataset_type not in MODEL_CACHE:
+                logger.info("📦 Loading model (first time)", extra={'dataset': dataset_type})
+                detector = CANBusDetector() if dataset_type == CAN_DATASET else EnsembleDetector(dataset_type)
+                # Per-stage latency histograms (preprocess, predict per model, matching, result build)
+                detector.stage_observer = metrics.observe_detector_stage
+                MODEL_CACHE[dataset_type] = detector
+                logger.info("✅ Model cached successfully", extra={'dataset': dataset_type})
     return MODEL_CACHE[dataset_type]
 
+def preload_detectors():
+    """Loads every dataset model up front (production: in the master before fork)."""
+    for dataset_type in [*DATASET_CONFIGS, CAN_DATASET]:
+        try:
+            get_detector(dataset_type)
+        except Exception as e:
+            logger.warning("⚠️ Could not preload model: %s", e, extra={'dataset': dataset_type})
+    return list(MODEL_CACHE)
+
 # Flask App
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+# jsonify() via orjson (NumPy values serialized natively), see serialization.py
+app.json = serialization.FastJSONProvider(app)
 
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB
+# 'all' keeps every CSV column (signature matching reads them all); 'model' keeps only
+# the model features and display fields - less memory, but signatures see fewer fields
+UPLOAD_CSV_COLUMNS = os.getenv('ANOMI_UPLOAD_COLUMNS', 'all').lower()
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_REQUESTS.inc(endpoint, str(response.status_code))
+    if 'request_started' in g:
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - g.request_started, endpoint)
+    return response
+
+@app.after_request
+def _compress_response(response):
+    # gzip/br for large JSON, CSV exports and the SSE stream (dashboards over the site VPN)
+    return serialization.compress_response(response, request.accept_encodings)
+
+# ==================== STATE STORAGE ====================
+# Jobs, attacks, live logs and agents (see state_store.py)
+# Default: in-memory, data persists only while the application is running
+# ANOMI_STATE_BACKEND=sqlite: shared by all gunicorn workers (gunicorn.conf.py)
+MAX_LIVE_LOGS = 100
+STATE = create_state_store(max_live_logs=MAX_LIVE_LOGS)
 
-# ==================== IN-MEMORY STORAGE ====================
-# Data persists only while the application is running
-JOBS_STORE = [] 
-ATTACKS_STORE = {} # Key: job_id, Value: list of attack dicts
+# ==================== CONDITIONAL GET ====================
+# Dashboards poll /api/stats, /api/jobs and /api/agents every few seconds. The
+# ETag is built from the store's version counters, so an unchanged poll is
+# answered 304 after one version lookup - no aggregation, no serialization.
+STATS_TIME_BUCKET = 60   # traffic_trend uses "now": recomputed at least once a minute
+AGENTS_TIME_BUCKET = 10  # agents drop out of the list 5 min after their last heartbeat
+
+def _not_modified(etag, last_modified):
+    """Returns the ETag the client already holds (plain or compressed variant), or None."""
+    if request.if_none_match:
+        for candidate in (etag, *(f"{etag}-{encoding}" for encoding in serialization.SUPPORTED_ENCODINGS)):
+            if request.if_none_match.contains(candidate):
+                return candidate
+        return None
+    # If-Modified-Since only counts without If-None-Match (RFC 9110)
+    if request.if_modified_since and int(last_modified) <= request.if_modified_since.timestamp():
+        return etag
+    return None
+
+def conditional_on_state(*tables, time_bucket=None):
+    """
+    Strong ETag / Last-Modified for a view that only reads the given STATE tables
+    (and the clock, in time_bucket-second steps). The version is read before the
+    view runs, so a write during the view at worst costs the next poll a recompute.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            tag, last_modified = STATE.versions(*tables)
+            if time_bucket:
+                bucket = int(time.time() // time_bucket)
+                tag = f"{tag}-{bucket}"
+                last_modified = max(last_modified, bucket * time_bucket)
+            etag = f"{view.__name__}-{tag}"
+
+            matched = _not_modified(etag, last_modified)
+            if matched:
+                response = app.response_class(status=304)
+                response.set_etag(matched)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.set_etag(etag)
+            response.last_modified = int(last_modified)
+            response.cache_control.no_cache = True  # Browsers revalidate every time (cheap 304)
+            return response
+        return wrapper
+    return decorator
 
 # ==================== SECURITY CONFIG ====================
 # API Keys for agent authentication (Key -> Agent Name)
@@ -67,32 +195,32 @@ API_KEYS = {
     # Add more keys as needed
 }
 
-# Rate Limiting (Simple in-memory implementation)
-RATE_LIMIT_STORE = {}  # IP -> {count, reset_time}
+# Rate Limiting (Token bucket - thread-safe, bounded memory, see rate_limiter.py)
 RATE_LIMIT_MAX = 1000   # Max requests per window (increased for high-frequency logging)
 RATE_LIMIT_WINDOW = 60 # Window in seconds
+API_KEY_RATE_LIMIT_MAX = 5000  # Per API key (shared by all agents using the key)
+SOURCE_RATE_LIMIT_MAX = 1000   # Per agent source name
 
-def check_rate_limit(ip_address):
-    """Returns True if request is allowed, False if rate limited."""
-    now = time.time()
-    
-    if ip_address not in RATE_LIMIT_STORE:
-        RATE_LIMIT_STORE[ip_address] = {'count': 1, 'reset_time': now + RATE_LIMIT_WINDOW}
-        return True
-    
-    entry = RATE_LIMIT_STORE[ip_address]
-    
-    # Reset window if expired
-    if now > entry['reset_time']:
-        RATE_LIMIT_STORE[ip_address] = {'count': 1, 'reset_time': now + RATE_LIMIT_WINDOW}
-        return True
-    
-    # Check limit
-    if entry['count'] >= RATE_LIMIT_MAX:
-        return False
-    
-    entry['count'] += 1
-    return True
+IP_LIMITER = TokenBucketLimiter('ip', RATE_LIMIT_MAX / RATE_LIMIT_WINDOW, RATE_LIMIT_MAX)
+API_KEY_LIMITER = TokenBucketLimiter('api_key', API_KEY_RATE_LIMIT_MAX / RATE_LIMIT_WINDOW, API_KEY_RATE_LIMIT_MAX)
+SOURCE_LIMITER = TokenBucketLimiter('source', SOURCE_RATE_LIMIT_MAX / RATE_LIMIT_WINDOW, SOURCE_RATE_LIMIT_MAX)
+
+def charge_rate_limits(client_ip, api_key, source, cost=1):
+    """Charges the IP, API key and source buckets together (all or none). Returns a 429 response or None."""
+    checks = [(IP_LIMITER, client_ip, cost), (SOURCE_LIMITER, source, cost)]
+    if api_key:
+        checks.insert(1, (API_KEY_LIMITER, api_key, cost))
+    rejected = allow_all(checks)
+    if rejected:
+        limiter, key, cost = rejected
+        return rate_limited_response(limiter, key, cost)
+    return None
+
+def rate_limited_response(limiter, key, cost=1):
+    """429 response with a Retry-After hint for the given limiter/key."""
+    response = jsonify({'error': 'Rate limit exceeded. Try again later.', 'limit': limiter.name})
+    response.headers['Retry-After'] = str(max(1, int(limiter.retry_after(key, cost) + 0.999)))
+    return response, 429
 
 def validate_api_key(request):
     """Validates API key from request headers. Returns agent name or None."""
@@ -105,6 +233,10 @@ def validate_ingest_payload(data):
     """Validates the ingest payload. Returns (is_valid, error_message)."""
     if not data:
         return False, "Empty payload"
+    if not isinstance(data, dict):
+        return False, "Payload must be a JSON object"
+    if not isinstance(data.get('source', 'unknown'), str):
+        return False, "'source' must be a string"
     if 'log' not in data:
         return False, "Missing 'log' field"
     if not isinstance(data.get('log'), str):
@@ -113,6 +245,32 @@ def validate_ingest_payload(data):
         return False, "'log' exceeds max length (10000 chars)"
     return True, None
 
+MAX_INGEST_BATCH = 1000  # Max log lines per /api/ingest/batch request
+MAX_CAN_FRAMES = 100000  # Max frames per /api/ingest/can request (~2 MB body)
+CAN_FRAMES_PER_TOKEN = 1000  # Rate-limit cost of /api/ingest/can: one token per 1000 frames (~16k frames/s per source)
+MAX_CAN_ATTACK_RECORDS = 100  # Live attack records per request (the state store keeps 100 anyway)
+MAX_CAN_TIMESTAMP = 4102444800.0  # 2100-01-01: CAN frame timestamps are epoch seconds in [0, this)
+
+def validate_ingest_batch_payload(data):
+    """Validates the batch ingest payload ({'logs': [...], 'source': ...}). Returns (is_valid, error_message)."""
+    if not data:
+        return False, "Empty payload"
+    if not isinstance(data, dict):
+        return False, "Payload must be a JSON object"
+    if not isinstance(data.get('source', 'unknown'), str):
+        return False, "'source' must be a string"
+    logs = data.get('logs')
+    if not isinstance(logs, list) or not logs:
+        return False, "'logs' must be a non-empty list"
+    if len(logs) > MAX_INGEST_BATCH:
+        return False, f"'logs' exceeds max batch size ({MAX_INGEST_BATCH})"
+    for line in logs:
+        if not isinstance(line, str):
+            return False, "'logs' entries must be strings"
+        if len(line) > 10000:
+            return False, "log line exceeds max length (10000 chars)"
+    return True, None
+
 # ==================== API ENDPOINTS ====================
 
 @app.route('/', methods=['GET'])
@@ -132,22 +290,18 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.utcnow().isoformat(),
-        'system': 'Ensemble Integrator (In-Memory)'
+        'system': 'Ensemble Integrator (In-Memory)',
+        'rate_limits': [limiter.stats() for limiter in (IP_LIMITER, API_KEY_LIMITER, SOURCE_LIMITER)]
     })
 
 @app.route('/api/stats', methods=['GET'])
+@conditional_on_state('jobs', 'attacks', 'live_logs', time_bucket=STATS_TIME_BUCKET)
 def get_dashboard_stats():
     """Aggregate stats from in-memory jobs for the Dashboard."""
-    total_logs = sum(job['total_records'] for job in JOBS_STORE)
-    total_attacks = sum(job['attacks_detected'] for job in JOBS_STORE)
-    
-    # Get recent alerts (latest 5 attacks across all jobs)
-    all_attacks = []
-    for job_id, attacks in ATTACKS_STORE.items():
-        all_attacks.extend(attacks)
+    total_logs, total_attacks = STATE.totals()
     
-    # Sort by detected_at desc
-    recent_alerts = sorted(all_attacks, key=lambda x: x.get('detected_at', ''), reverse=True)[:5]
+    # Get recent alerts (latest 5 attacks across all jobs, by detected_at desc)
+    recent_alerts = STATE.recent_attacks(5)
     
     return jsonify({
         'total_logs': total_logs,
@@ -172,7 +326,9 @@ def calculate_traffic_trend():
             time_labels.append(label)
             
         # Aggregate Job Data
-        for job in JOBS_STORE:
+        for job in STATE.list_jobs():
+            if job.get('child_jobs'):
+                continue  # Parent of a multi-file upload: its children are counted
             try:
                 # Use job creation time as the "event time" for the bulk upload
                 job_time = datetime.fromisoformat(job['created_at'])
@@ -183,11 +339,11 @@ def calculate_traffic_trend():
                         trend_map[label]['normal'] += job.get('normal_traffic', 0)
                         trend_map[label]['attack'] += job.get('attacks_detected', 0)
             except Exception as e:
-                print(f"Error parsing job time: {e}")
+                logger.warning("Error parsing job time: %s", e, extra={'job_id': job.get('job_id')})
                 continue
                 
         # Aggregate Live Logs (Real-time updates)
-        for log in LIVE_LOGS_BUFFER:
+        for log in STATE.live_logs():
             try:
                 log_time = datetime.fromisoformat(log['timestamp'])
                 if (now - log_time).total_seconds() < 43200:
@@ -210,267 +366,646 @@ def calculate_traffic_trend():
             
         return result
     except Exception as e:
-        print(f"Error calculating trend: {e}")
+        logger.exception("Error calculating trend")
         return []
 
 @app.route('/api/jobs', methods=['GET'])
+@conditional_on_state('jobs')
 def list_jobs():
     """List all analysis jobs for the Reports page."""
     # Return jobs sorted by created_at desc
-    sorted_jobs = sorted(JOBS_STORE, key=lambda x: x['created_at'], reverse=True)
-    return jsonify({'jobs': sorted_jobs})
+    return jsonify({'jobs': STATE.list_jobs()})
 
-def determine_dataset_type(df, filename):
+def upload_error_response(error):
+    return jsonify({'error': str(error), **error.details}), error.status
+
+def new_job_id():
+    # Random suffix: several workers may finish a job in the same second
+    return f"job_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{random.randint(0, 0xFFFF):04x}"
+
+def score_upload_frame(df, dataset_name, record_offset=0):
     """
-    Heuristic to determine which dataset model to use based on file content or name.
-    This is critical for the Ensemble system which has 10 specialized models.
+    Scores a parsed upload frame (a whole file or one piece of a chunked upload).
+    Returns (batch_results, attacks). Attacks are row references (record_index
+    continues from record_offset); votes and the raw row are rendered from the
+    job's archive when a page of results is read (render_attacks).
     """
-    cols = set(df.columns)
-    fname = filename.upper()
-    
-    # Check by filename first
-    if 'YOUSEF' in fname: return 'YOUSEF'
-    if 'SAMET' in fname: return 'SAMET'
-    if 'EMIRHAN' in fname and 'EMIRHNT' not in fname: return 'EMİRHAN' # Catch Emirhan but not Emirhnt
-    if 'EMIRHNT' in fname: return 'EMİRHNT'
-    if 'SUZAN' in fname: return 'SUZAN'
-    if 'ALI' in fname or 'ALİ' in fname: return 'ALİ'
-    if 'IREM' in fname or 'İREM' in fname: return 'İREM'
-    if 'IBRAHIM' in fname or 'İBRAHİM' in fname: return 'İBRAHİM'
-    if 'ATAKAN' in fname: return 'ATAKAN'
-    if 'MIRAC' in fname or 'MİRAÇ' in fname: return 'MİRAÇ'
-    
-    # Fallback: Check by columns (unique identifiers first)
-    if 'ocp_namespace' in cols or 'ocp_pod' in cols: return 'EMİRHAN'  # OpenShift/K8s logs
-    if 'price_eur_kwh' in cols: return 'SUZAN'
-    if 'protocol_can' in cols: return 'İREM'
-    if 'load_kw' in cols: return 'ATAKAN'
-    if 'input_plate' in cols: return 'MİRAÇ'
-    if 'Tuketim_kWh' in cols: return 'EMİRHNT'
-    if 'action' in cols and 'status' in cols and 'message' not in cols: return 'ALİ'
-    if 'message' in cols and 'severity' in cols: return 'EMİRHAN'  # Alternative check
-    if 'detail' in cols and 'id' in cols: return 'SAMET'  # IDS logs with hex IDs
-    if 'detail' in cols: return 'İBRAHİM'  # CSMS logs
-    
-    return 'YOUSEF' # Default fallback only if nothing else matches
+    # Use cached detector for this dataset type
+    detector = get_detector(dataset_name)
 
-@app.route('/api/analyze/upload', methods=['POST'])
-def upload_and_analyze():
-    file = None
-    if 'file' in request.files:
-        file = request.files['file']
-    
-    if not file or file.filename == '':
-        return jsonify({'error': 'No file uploaded'}), 400
+    # Analyze the parsed frame directly (Vectorized - no per-row dicts)
+    batch_results = detector.detect_frame(df)
+    attack_indices = np.flatnonzero([r.get('attack_detected', False) for r in batch_results])
 
+    detected_at = datetime.utcnow().isoformat()
+    attacks = [{
+        'id': record_offset + idx + 1,
+        'record_index': record_offset + idx,
+        'probability': float(batch_results[idx]['confidence_score']),
+        'attack_type': batch_results[idx]['final_decision'],
+        'dataset_source': dataset_name,
+        'detected_at': detected_at
+    } for idx in attack_indices.tolist()]
+
+    metrics.ROWS_SCORED.inc(dataset_name, amount=len(df))
+    metrics.ATTACKS_DETECTED.inc(dataset_name, amount=len(attacks))
+    return batch_results, attacks
+
+def inline_attack_details(attacks, df, batch_results, record_offset=0):
+    """Without an archive (no pyarrow / write failed) the attacks keep votes and raw row JSON themselves."""
+    if not attacks:
+        return attacks
+    positions = [attack['record_index'] - record_offset for attack in attacks]
+    # Raw log JSON for attack rows only, serialized column-wise by pandas
+    raw_json = display_frame(df.iloc[positions]).to_json(
+        orient='records', lines=True, force_ascii=False, date_format='iso'
+    ).rstrip('\n').split('\n')
+    for attack, position, raw_log_data in zip(attacks, positions, raw_json):
+        result = batch_results[position]
+        attack['council_votes'] = " | ".join(result['council_votes'])
+        attack['winning_model'] = result.get('winning_model', 'ENSEMBLE')
+        attack['raw_log_data'] = raw_log_data[:1000]  # Store first 1000 chars
+    return attacks
+
+def _json_value(value):
+    """Archive cell -> JSON value, formatted like DataFrame.to_json(date_format='iso')."""
+    if value is None or (np.isscalar(value) and not isinstance(value, str) and pd.isna(value)) or value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat(timespec='milliseconds')
+    return value
+
+def render_attacks(job_id, attacks):
+    """
+    Completes stored attack references with winning model, council votes and the
+    raw row (JSON, first 1000 chars), read from the job's archive for these rows only.
+    """
+    refs = [attack for attack in attacks if 'record_index' in attack and 'raw_log_data' not in attack]
+    if not refs:
+        return attacks
     try:
-        # Load Data - Handle TXT files specially
-        filename_lower = file.filename.lower()
-        
-        if filename_lower.endswith('.txt'):
-            # TXT files: Each line is a log entry
-            content = file.read().decode('utf-8', errors='replace')
-            lines = [line.strip() for line in content.split('\n') if line.strip()]
-            
-            # Smart Parsing for Comma Separated TXT (User Request: Show Attributes)
-            if lines and ',' in lines[0]:
-                print("📄 Smart Parsing: Detected CSV-like structure in TXT")
-                data_list = []
-                for line in lines:
-                    parts = [p.strip() for p in line.split(',')]
-                    # Auto-assign headers based on content heuristics
-                    row = {'message': line} # Keep full message
-                    for i, part in enumerate(parts):
-                        header = f"Attribute_{i+1}"
-                        # Simple heuristics for headers
-                        if i == 0 and (':' in part or '-' in part): header = "Zaman Damgası"
-                        elif part in ['NORMAL', 'SALDIRI', 'ATTACK']: header = "Etiket/Durum"
-                        elif part in ['INFO', 'WARN', 'ERROR', 'CRITICAL']: header = "Seviye"
-                        elif '0x' in part: header = "Hata Kodu"
-                        elif part in ['OK', 'FAIL']: header = "İşlem Sonucu"
-                            
-                        # Avoid duplicates
-                        if header in row: header = f"{header}_{i}"
-                        row[header] = part
-                    data_list.append(row)
-                df = pd.DataFrame(data_list)
-            else:
-                df = pd.DataFrame({'message': lines, 'detail': lines})
-                
-            print(f"📄 Loaded TXT file with {len(lines)} lines")
+        rows = result_archive.read_job_rows(job_id, [attack['record_index'] for attack in refs]).to_dict('index')
+    except Exception as e:
+        logger.warning("⚠️ Archive read failed: %s", e, extra={'job_id': job_id})
+        rows = {}
+    for attack in refs:
+        row = rows.get(attack['record_index'])
+        if row is None:
+            attack.update(council_votes='', winning_model='', raw_log_data='{}')
+            continue
+        probas = [(name[len('proba_'):], p) for name, p in row.items() if name.startswith('proba_') and not pd.isna(p)]
+        attack['council_votes'] = " | ".join(
+            f"{algo}: {'🔴 SALDIRI' if p > 0.5 else '🟢 NORMAL'} (%{p:.1%})" for algo, p in probas
+        )
+        attack['winning_model'] = row['winning_model']
+        raw = {name[len('raw_'):]: _json_value(value) for name, value in row.items() if name.startswith('raw_')}
+        attack['raw_log_data'] = serialization.dumps(raw).decode('utf-8')[:1000]
+    return attacks
+
+def preview_upload_rows(df, batch_results, limit=100):
+    """Detailed results for quick analysis (first 100 max) - only these rows become dicts."""
+    preview_rows = display_frame(df.iloc[:limit]).to_dict(orient='records')
+    return [{
+        'index': idx,
+        'decision': result['final_decision'],
+        'confidence': result['confidence_score'],
+        'attack_detected': result.get('attack_detected', False),
+        'winning_model': result.get('winning_model', 'ENSEMBLE'),
+        'reason': result.get('reason', 'Analiz Detayı Mevcut Değil'), # Add Reason
+        'raw_data': {k: str(v) for k, v in row.items()} # Safe string conversion
+    } for idx, (row, result) in enumerate(zip(preview_rows, batch_results))]
+
+def build_job(job_id, filename, total_records, attacks_detected, created_at=None):
+    """Job dict as stored in STATE and listed on the Reports page."""
+    normal_traffic = total_records - attacks_detected
+    attack_percentage = (attacks_detected / total_records * 100) if total_records > 0 else 0
+    return {
+        'job_id': job_id,
+        'filename': secure_filename(filename),
+        'status': 'completed',
+        'total_records': total_records,
+        'attacks_detected': attacks_detected,
+        'normal_traffic': normal_traffic,
+        'attack_percentage': attack_percentage,
+        'created_at': created_at or datetime.utcnow().isoformat(),
+        'completed_at': datetime.utcnow().isoformat()
+    }
+
+def job_response(job_data, dataset_name, detailed_logs, **extra):
+    return jsonify({
+        'success': True,
+        'job_id': job_data['job_id'],
+        'message': f'Analysis completed using model: {dataset_name}',
+        'results': {
+            'total_records': job_data['total_records'],
+            'attacks_detected': job_data['attacks_detected'],
+            'normal_traffic': job_data['normal_traffic'],
+            'model_used': dataset_name,
+            'detailed_logs': detailed_logs
+        },
+        **extra
+    })
+
+def analyze_upload_content(content, filename, parent_job_id=None):
+    """
+    Parses, routes and scores one uploaded log file (bytes) and stores it as a job.
+    Returns (job_data, dataset_name, detailed_logs).
+    """
+    parse_started = time.perf_counter()
+
+    # Load Data - Handle TXT files specially
+    if filename.lower().endswith('.txt'):
+        # TXT files: Each line is a log entry, parsed with the grammar of its format (log_parsers.py)
+        df = parse_txt_text(content.decode('utf-8', errors='replace'))
+        logger.info("📄 Loaded TXT file", extra={'lines': len(df), 'format': df.attrs.get('log_format'), 'upload': filename})
+        parse_seconds = time.perf_counter() - parse_started
+
+        # Determine which Ensemble Model to use
+        routing_started = time.perf_counter()
+        dataset_name = determine_dataset_type(df, filename)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - routing_started, 'determine_dataset_type', dataset_name)
+    else:
+        # CSV files: a sample picks the model, then the file is read typed (and pruned, see UPLOAD_CSV_COLUMNS)
+        df, dataset_name = read_log_csv(content, filename, columns=UPLOAD_CSV_COLUMNS)
+        parse_seconds = time.perf_counter() - parse_started
+
+    metrics.STAGE_SECONDS.observe(parse_seconds, 'request_parse', dataset_name)
+    logger.info("🔍 Analyzing upload", extra={'dataset': dataset_name, 'upload': filename, 'rows': len(df)})
+
+    job_id = new_job_id()
+    df = df.reset_index(drop=True)
+    batch_results, current_job_attacks = score_upload_frame(df, dataset_name)
+    detailed_logs = preview_upload_rows(df, batch_results)
+
+    # Create Job Dict
+    job_data = build_job(job_id, filename, len(df), len(current_job_attacks))
+    if parent_job_id:
+        job_data['parent_job_id'] = parent_job_id
+
+    # Columnar archive (Parquet) - failure here must not fail the analysis
+    archive_path = None
+    try:
+        archive_path = result_archive.write_job_archive(job_id, dataset_name, df, batch_results, job_data['created_at'])
+        if archive_path:
+            logger.info("📦 Results archived", extra={'job_id': job_id, 'path': archive_path})
+    except Exception as e:
+        logger.warning("⚠️ Archive write failed: %s", e, extra={'job_id': job_id})
+    if not archive_path:
+        inline_attack_details(current_job_attacks, df, batch_results)
+
+    # Save to State Store
+    with metrics.STAGE_SECONDS.time('store_write', dataset_name):
+        STATE.add_job(job_data, current_job_attacks)
+
+    return job_data, dataset_name, detailed_logs
+
+# ==================== MULTI-FILE & ARCHIVE UPLOADS ====================
+# Several files in one request, or a .zip / .tar(.gz) with one log per member
+# (one archive per charging site). Every file is routed on its own and the
+# files are analyzed concurrently; a parent job lists the per-file child jobs.
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+LOG_EXTENSIONS = ('.csv', '.txt')
+MAX_ARCHIVE_MEMBERS = 500
+MAX_ARCHIVE_BYTES = int(os.getenv('ANOMI_MAX_ARCHIVE_BYTES', 2 * 1024 ** 3))  # Uncompressed, per request
+UPLOAD_THREADS = int(os.getenv('ANOMI_UPLOAD_THREADS', min(4, os.cpu_count() or 1)))
+UPLOAD_ANALYSIS = ThreadPoolExecutor(max_workers=UPLOAD_THREADS, thread_name_prefix='upload-analysis')
+
+def _is_log_member(name):
+    base = os.path.basename(name)
+    return (name.lower().endswith(LOG_EXTENSIONS) and not base.startswith('.')
+            and not name.startswith('__MACOSX/'))
+
+def iter_archive_members(stream, filename):
+    """
+    Yields (member_name, bytes) for the CSV/TXT members of a .zip / .tar(.gz)
+    upload. Members are decompressed one at a time from the upload stream, nothing
+    is extracted to disk. Raises UploadError when the archive exceeds the limits.
+    """
+    total_bytes = 0
+    count = 0
+
+    def admit(name, size):
+        nonlocal total_bytes, count
+        count += 1
+        total_bytes += size
+        if count > MAX_ARCHIVE_MEMBERS:
+            raise UploadError(f"Archive has more than {MAX_ARCHIVE_MEMBERS} log files", 413)
+        if total_bytes > MAX_ARCHIVE_BYTES:
+            raise UploadError(f"Archive content exceeds {MAX_ARCHIVE_BYTES} bytes", 413)
+
+    try:
+        if filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(stream) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not _is_log_member(info.filename):
+                        continue
+                    admit(info.filename, info.file_size)  # ZipExtFile never returns more than file_size
+                    with archive.open(info) as member:
+                        yield info.filename, member.read()
         else:
-            # CSV files: Standard parsing
+            # Stream mode ('r|*'): members are read in order, the archive is never seeked
+            with tarfile.open(fileobj=stream, mode='r|*') as archive:
+                for info in archive:
+                    if not info.isfile() or not _is_log_member(info.name):
+                        continue
+                    admit(info.name, info.size)
+                    yield info.name, archive.extractfile(info).read()
+    except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError, OSError) as e:
+        # zlib.error: corrupted deflate member, EOFError/OSError: truncated stream
+        raise UploadError(f"Unreadable archive: {e}")
+
+def analyze_multi_upload(files):
+    """Analyzes several files / archive members concurrently under one parent job."""
+    parent_job_id = new_job_id()
+    created_at = datetime.utcnow().isoformat()
+    current_file = None
+
+    def sources():
+        nonlocal current_file
+        for file in files:
+            current_file = file.filename
+            if not file.filename.lower().endswith(ARCHIVE_EXTENSIONS):
+                yield file.filename, file.filename, file.read(), None
+                continue
             try:
-                df = pd.read_csv(file, on_bad_lines='skip', encoding='utf-8')
-            except UnicodeDecodeError:
-                file.seek(0)
-                df = pd.read_csv(file, on_bad_lines='skip', encoding='latin-1')
-        
-        # Determine which Ensemble Model to use
-        dataset_name = determine_dataset_type(df, file.filename)
-        print(f"🔍 Analyzing as dataset: {dataset_name}")
-        
-        # Use cached detector for this dataset type
-        detector = get_detector(dataset_name)
-        
-        attacks_detected = 0
-        normal_traffic = 0
-        current_job_attacks = []
-        job_id = f"job_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+                for name, content in iter_archive_members(file.stream, file.filename):
+                    yield f"{file.filename}/{name}", os.path.basename(name), content, None
+            except UploadError as e:
+                # Members read before the problem are still analyzed
+                yield file.filename, None, None, e
 
-        # Collect detailed results for quick analysis (first 100 max)
-        detailed_logs = []
-        
-        # Analyze logs in batch (Vectorized - Fast)
-        logs_list = df.to_dict(orient='records')
-        batch_results = detector.detect_batch(logs_list)
-        
-        # Process Results
-        for idx, result in enumerate(batch_results):
-            # Use the boolean flag from Ensemble voting logic
-            is_attack = result.get('attack_detected', False)
-            
-            # Add to detailed logs list
-            if idx < 100:
-                detailed_logs.append({
-                    'index': idx,
-                    'decision': result['final_decision'],
-                    'confidence': float(result['confidence_score']),
-                    'attack_detected': is_attack,
-                    'winning_model': result.get('winning_model', 'ENSEMBLE'),
-                    'reason': result.get('reason', 'Analiz Detayı Mevcut Değil'), # Add Reason
-                    'raw_data': {k: str(v) for k, v in logs_list[idx].items()} # Safe string conversion
-                })
-            
-            if is_attack:
-                attacks_detected += 1
-                # Save details with enhanced documentation
-                # Note: 'raw_log_data' needs to be retrieved from original log
-                original_log = logs_list[idx]
-                
-                attack_detail = {
-                    'id': idx + 1,
-                    'record_index': idx,
-                    'probability': float(result['confidence_score']),
-                    'attack_type': result['final_decision'],
-                    'dataset_source': dataset_name,
-                    'council_votes': " | ".join(result['council_votes']),
-                    'winning_model': result.get('winning_model', 'ENSEMBLE'),
-                    'raw_log_data': json.dumps(original_log, default=str, ensure_ascii=False)[:1000],  # Store first 1000 chars
-                    'detected_at': datetime.utcnow().isoformat()
-                }
-                current_job_attacks.append(attack_detail)
-            else:
-                normal_traffic += 1
-
-        total_records = len(df)
-        attack_percentage = (attacks_detected / total_records * 100) if total_records > 0 else 0
-
-        # Create Job Dict
-        job_data = {
-            'job_id': job_id,
-            'filename': secure_filename(file.filename),
-            'status': 'completed',
-            'total_records': total_records,
-            'attacks_detected': attacks_detected,
-            'normal_traffic': normal_traffic,
-            'attack_percentage': attack_percentage,
-            'created_at': datetime.utcnow().isoformat(),
-            'completed_at': datetime.utcnow().isoformat()
-        }
-        
-        # Save to In-Memory Stores
-        JOBS_STORE.append(job_data)
-        if current_job_attacks:
-            ATTACKS_STORE[job_id] = current_job_attacks
+    # Bounded in-flight members: an archive is not decompressed faster than it is analyzed
+    futures = []
+    try:
+        for display_name, routing_name, content, error in sources():
+            if error is not None:
+                futures.append((display_name, error))
+                continue
+            in_flight = [f for _, f in futures if isinstance(f, Future) and not f.done()]
+            if len(in_flight) >= UPLOAD_THREADS * 2:
+                wait(in_flight, return_when=FIRST_COMPLETED)
+            futures.append((display_name, UPLOAD_ANALYSIS.submit(analyze_upload_content, content, routing_name, parent_job_id)))
+    except Exception as e:
+        # Submitted children are stored under parent_job_id: the parent job must be stored too
+        if not any(isinstance(f, Future) for _, f in futures):
+            raise
+        logger.warning("⚠️ Upload iteration failed: %s", e, extra={'job_id': parent_job_id, 'upload': current_file})
+        futures.append((current_file, e))
 
-        return jsonify({
-            'success': True,
-            'job_id': job_id,
-            'message': f'Analysis completed using model: {dataset_name}',
+    if not futures:
+        raise UploadError('No CSV/TXT log files found in the upload')
+
+    file_results = []
+    for display_name, future in futures:
+        try:
+            if not isinstance(future, Future):
+                raise future
+            job_data, dataset_name, detailed_logs = future.result()
+        except Exception as e:
+            logger.warning("⚠️ File analysis failed: %s", e, extra={'job_id': parent_job_id, 'upload': display_name})
+            file_results.append({'filename': display_name, 'error': str(e)})
+            continue
+        file_results.append({
+            'filename': display_name,
+            'job_id': job_data['job_id'],
             'results': {
-                'total_records': total_records,
-                'attacks_detected': attacks_detected,
-                'normal_traffic': normal_traffic,
+                'total_records': job_data['total_records'],
+                'attacks_detected': job_data['attacks_detected'],
+                'normal_traffic': job_data['normal_traffic'],
                 'model_used': dataset_name,
                 'detailed_logs': detailed_logs
             }
         })
 
+    analyzed = [f for f in file_results if 'job_id' in f]
+    if not analyzed:
+        return jsonify({'error': 'No file could be analyzed', 'files': file_results}), 422
+
+    names = [file.filename for file in files]
+    job_data = build_job(
+        parent_job_id,
+        names[0] if len(names) == 1 else f"{len(names)}_files",
+        sum(f['results']['total_records'] for f in analyzed),
+        sum(f['results']['attacks_detected'] for f in analyzed),
+        created_at
+    )
+    job_data['status'] = 'completed' if len(analyzed) == len(file_results) else 'completed_with_errors'
+    job_data['child_jobs'] = [f['job_id'] for f in analyzed]
+    job_data['files'] = [{'filename': f['filename'], 'job_id': f.get('job_id'),
+                          'model_used': f.get('results', {}).get('model_used'), 'error': f.get('error')}
+                         for f in file_results]
+    STATE.add_job(job_data)
+
+    models_used = sorted({f['results']['model_used'] for f in analyzed})
+    logger.info("🗂️ Multi-file upload analyzed", extra={
+        'job_id': parent_job_id, 'files': len(file_results), 'failed': len(file_results) - len(analyzed)
+    })
+    return jsonify({
+        'success': True,
+        'job_id': parent_job_id,
+        'message': f"Analyzed {len(analyzed)}/{len(file_results)} files using models: {', '.join(models_used)}",
+        'results': {
+            'total_records': job_data['total_records'],
+            'attacks_detected': job_data['attacks_detected'],
+            'normal_traffic': job_data['normal_traffic'],
+            'model_used': ', '.join(models_used),
+            'detailed_logs': analyzed[0]['results']['detailed_logs']
+        },
+        'files': file_results
+    })
+
+@app.route('/api/analyze/upload', methods=['POST'])
+def upload_and_analyze():
+    # Several files: repeat the 'file' field (or use 'files')
+    files = [f for f in request.files.getlist('file') + request.files.getlist('files') if f and f.filename]
+
+    if not files:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    try:
+        if len(files) > 1 or files[0].filename.lower().endswith(ARCHIVE_EXTENSIONS):
+            return analyze_multi_upload(files)
+
+        file = files[0]
+        job_data, dataset_name, detailed_logs = analyze_upload_content(file.read(), file.filename)
+        return job_response(job_data, dataset_name, detailed_logs)
+
+    except UploadError as e:
+        return upload_error_response(e)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Upload analysis failed")
         return jsonify({'error': str(e)}), 500
 
+MAX_RESULTS_PAGE = 1000
+
 @app.route('/api/analyze/results/<job_id>', methods=['GET'])
 def get_job_results(job_id):
     # Find job in list
-    job = next((item for item in JOBS_STORE if item['job_id'] == job_id), None)
+    job = STATE.get_job(job_id)
     
     if not job:
         return jsonify({'error': 'Job not found'}), 404
         
-    # Get attacks from dict
-    attacks = ATTACKS_STORE.get(job_id, [])
-    
-    # Limit to first 100 attacks for performance
-    limited_attacks = attacks[:100]
+    # One page of attacks (first 100 by default); raw rows are rendered for this page only
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), MAX_RESULTS_PAGE)
+    limited_attacks = render_attacks(job_id, STATE.get_attacks(job_id, limit=limit, offset=offset))
     
     return jsonify({
         'job': job,
         'attacks': limited_attacks,
-        'total_attacks_count': len(attacks),
-        'showing': len(limited_attacks)
+        'total_attacks_count': STATE.count_attacks(job_id),
+        'showing': len(limited_attacks),
+        'offset': offset
     })
 
-# ==================== LIVE MONITORING (AGENT ARCHITECTURE) ====================
+# ==================== CHUNKED UPLOADS ====================
+# Files above MAX_CONTENT_LENGTH are sent in numbered parts (see chunked_upload.py).
+# Each part that continues the received prefix is parsed and scored in the
+# background, so a multi-GB export is analyzed while it is still uploading.
+UPLOADS = ChunkedUploadStore()
+CHUNKED_ANALYSIS = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chunked-analysis')
 
-AGENTS_STORE = {} # Key: hostname, Value: {last_seen, ip, status}
-LIVE_LOGS_BUFFER = [] # Circular buffer for last 100 logs
-MAX_LIVE_LOGS = 100
+def _load_chunked_state(analysis_dir):
+    try:
+        with open(os.path.join(analysis_dir, 'state.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'next_part': 1, 'rows': 0, 'attacks': 0, 'dataset': None, 'error': None,
+                'header': None, 'plan': None, 'encoding': None, 'log_format': None}
 
-@app.route('/api/ingest', methods=['POST'])
-def ingest_log():
-    """Receives logs from remote agents with security checks."""
+def _save_chunked_state(analysis_dir, state):
+    path = os.path.join(analysis_dir, 'state.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+def _analyze_chunk(manifest, state, number, analysis_dir):
+    """Parses and scores one part. A line cut at the part boundary is carried to the next part."""
+    upload_id = manifest['upload_id']
+    carry_path = os.path.join(analysis_dir, f"carry-{number - 1:05d}.bin")
+    data = UPLOADS.read_part(upload_id, number)
+    if os.path.exists(carry_path):
+        with open(carry_path, 'rb') as f:
+            data = f.read() + data
+
+    rest = b''
+    if number < manifest['total_parts']:
+        cut = data.rfind(b'\n') + 1
+        data, rest = data[:cut], data[cut:]
+    with open(os.path.join(analysis_dir, f"carry-{number:05d}.bin"), 'wb') as f:
+        f.write(rest)
+
+    if manifest['filename'].lower().endswith('.txt'):
+        df = parse_txt_text(data.decode('utf-8', errors='replace'), state['log_format'])
+        if state['dataset'] is None and len(df):
+            state['log_format'] = df.attrs.get('log_format')
+            state['dataset'] = determine_dataset_type(df, manifest['filename'])
+    elif state['plan'] is None:
+        # First piece: it carries the header and decides the model and dtypes for the whole file
+        dataset, plan, encoding = sniff_csv(data, manifest['filename'], columns=UPLOAD_CSV_COLUMNS)
+        state.update(dataset=dataset, plan=plan, encoding=encoding,
+                     header=data[:data.find(b'\n') + 1].decode(encoding))
+        df = read_planned_csv(data, plan, encoding)
+    elif data.strip():
+        df = read_planned_csv(state['header'].encode(state['encoding']) + data, state['plan'], state['encoding'])
+    else:
+        df = pd.DataFrame()
+
+    if len(df):
+        df = df.reset_index(drop=True)
+        batch_results, attacks = score_upload_frame(df, state['dataset'], record_offset=state['rows'])
+        if state['rows'] == 0:
+            with open(os.path.join(analysis_dir, 'preview.json'), 'w', encoding='utf-8') as f:
+                json.dump(preview_upload_rows(df, batch_results), f, ensure_ascii=False)
+        segment_path = None
+        try:
+            segment_path = result_archive.write_segment(os.path.join(analysis_dir, f"segment-{number:05d}.parquet"),
+                                                        manifest['job_id'], df, batch_results, record_offset=state['rows'])
+        except Exception as e:
+            logger.warning("⚠️ Archive segment write failed: %s", e, extra={'upload_id': upload_id, 'part': number})
+        if not segment_path:
+            inline_attack_details(attacks, df, batch_results, record_offset=state['rows'])
+        with open(os.path.join(analysis_dir, f"attacks-{number:05d}.json"), 'w', encoding='utf-8') as f:
+            json.dump(attacks, f, ensure_ascii=False)
+        state['rows'] += len(df)
+        state['attacks'] += len(attacks)
+
+    if os.path.exists(carry_path):
+        os.remove(carry_path)
+    state['next_part'] = number + 1
+
+def _advance_chunked_analysis(upload_id):
+    """Scores every received part that continues the analyzed prefix. Caller holds the analysis lock."""
+    analysis_dir = UPLOADS.analysis_dir(upload_id)
+    os.makedirs(analysis_dir, exist_ok=True)
+    state = _load_chunked_state(analysis_dir)
+    manifest = UPLOADS.get(upload_id)
+    while not state['error'] and str(state['next_part']) in manifest['parts']:
+        number = state['next_part']
+        started = time.perf_counter()
+        try:
+            _analyze_chunk(manifest, state, number, analysis_dir)
+        except Exception as e:
+            logger.exception("Chunked upload analysis failed", extra={'upload_id': upload_id, 'part': number})
+            state['error'] = f"part {number}: {e}"
+        _save_chunked_state(analysis_dir, state)
+        logger.info("🧩 Upload part analyzed", extra={
+            'upload_id': upload_id, 'part': number, 'rows': state['rows'],
+            'seconds': round(time.perf_counter() - started, 3)
+        })
+        manifest = UPLOADS.get(upload_id)  # Parts that arrived meanwhile
+    return state
+
+def advance_chunked_analysis(upload_id):
+    """Background task after every part; skipped if another thread/worker is already advancing this upload."""
     try:
-        # === SECURITY LAYER ===
-        
-        # 1. Rate Limiting
-        client_ip = request.remote_addr
-        if not check_rate_limit(client_ip):
-            return jsonify({'error': 'Rate limit exceeded. Try again later.'}), 429
-        
-        # 2. API Key Authentication (Optional - can be disabled for testing)
-        # Uncomment the following to enforce API keys:
-        # agent_name = validate_api_key(request)
-        # if not agent_name:
-        #     return jsonify({'error': 'Invalid or missing API key'}), 401
-        
-        # 3. Input Validation
-        data = request.json
-        is_valid, error_msg = validate_ingest_payload(data)
-        if not is_valid:
-            return jsonify({'error': error_msg}), 400
-        
-        # === END SECURITY LAYER ===
-        
-        log_line = data.get('log', '')
-        source = data.get('source', 'unknown')
-        timestamp = data.get('timestamp', time.time())
-        
-        # Update Agent Status
-        AGENTS_STORE[source] = {
-            'last_seen': datetime.utcnow().isoformat(),
-            'ip': client_ip,
-            'status': 'online'
+        with UPLOADS.lock(upload_id, 'analysis', blocking=False) as acquired:
+            if acquired:
+                _advance_chunked_analysis(upload_id)
+    except UploadError:
+        pass  # Aborted or completed meanwhile
+
+def reset_chunked_analysis(upload_id, part_number):
+    """A part that was already analyzed came again with other content: start the analysis over."""
+    with UPLOADS.lock(upload_id, 'analysis'):
+        analysis_dir = UPLOADS.analysis_dir(upload_id)
+        if _load_chunked_state(analysis_dir)['next_part'] > part_number:
+            shutil.rmtree(analysis_dir, ignore_errors=True)
+            logger.info("🔁 Upload analysis restarted", extra={'upload_id': upload_id, 'part': part_number})
+
+@app.route('/api/uploads', methods=['POST'])
+def create_chunked_upload():
+    """Starts a chunked upload: {filename, size, sha256?, part_size?}."""
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    try:
+        manifest = UPLOADS.create(filename, data.get('size'), data.get('sha256'), data.get('part_size'), job_id=new_job_id())
+    except UploadError as e:
+        return upload_error_response(e)
+    logger.info("📥 Chunked upload started", extra={'upload_id': manifest['upload_id'], 'upload': filename, 'size': manifest['size']})
+    return jsonify({
+        'upload_id': manifest['upload_id'],
+        'part_size': manifest['part_size'],
+        'total_parts': manifest['total_parts']
+    }), 201
+
+@app.route('/api/uploads/<upload_id>/parts/<int:part_number>', methods=['PUT'])
+def upload_part(upload_id, part_number):
+    """Stores one part (raw body, optional X-Part-SHA256). Sending a part again replaces it."""
+    try:
+        info, replaced = UPLOADS.write_part(upload_id, part_number, request.stream, request.headers.get('X-Part-SHA256'))
+        if replaced:
+            reset_chunked_analysis(upload_id, part_number)
+    except UploadError as e:
+        return upload_error_response(e)
+    CHUNKED_ANALYSIS.submit(advance_chunked_analysis, upload_id)
+    return jsonify({'upload_id': upload_id, 'part': part_number, **info})
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    """Received and missing parts (to resume after a network failure) and analysis progress."""
+    try:
+        manifest = UPLOADS.get(upload_id)
+    except UploadError as e:
+        return upload_error_response(e)
+    state = _load_chunked_state(UPLOADS.analysis_dir(upload_id))
+    return jsonify({
+        'upload_id': upload_id,
+        'filename': manifest['filename'],
+        'size': manifest['size'],
+        'part_size': manifest['part_size'],
+        'total_parts': manifest['total_parts'],
+        'received_parts': len(manifest['parts']),
+        'missing_parts': UPLOADS.missing_parts(manifest),
+        'analysis': {
+            'analyzed_parts': state['next_part'] - 1,
+            'rows': state['rows'],
+            'attacks': state['attacks'],
+            'model_used': state['dataset'],
+            'error': state['error']
         }
-        print(f"DEBUG INGEST: Updated Agent {source}. Store Size: {len(AGENTS_STORE)}")
-        
-        # Immediate Ensemble Analysis (Using Cached Model)
-        detector = get_detector("SAMET")  # Uses cached model
-        log_dict = {'detail': log_line, 'message': log_line}
-        
-        result = detector.detect(log_dict)
-        
+    })
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    """Checks integrity, finishes the analysis and turns the upload into a job."""
+    try:
+        manifest = UPLOADS.verify(upload_id)
+        with UPLOADS.lock(upload_id, 'analysis'):
+            manifest = UPLOADS.get(upload_id)  # Gone if a concurrent complete finished first
+            state = _advance_chunked_analysis(upload_id)
+            if state['error']:
+                return jsonify({'error': f"Analysis failed ({state['error']})"}), 422
+            if state['dataset'] is None:
+                return jsonify({'error': 'No log records found in the upload'}), 422
+
+            analysis_dir = UPLOADS.analysis_dir(upload_id)
+            attacks = []
+            segments = []
+            for number in range(1, manifest['total_parts'] + 1):
+                attacks_path = os.path.join(analysis_dir, f"attacks-{number:05d}.json")
+                if os.path.exists(attacks_path):
+                    with open(attacks_path, encoding='utf-8') as f:
+                        attacks.extend(json.load(f))
+                segment_path = os.path.join(analysis_dir, f"segment-{number:05d}.parquet")
+                if os.path.exists(segment_path):
+                    segments.append(segment_path)
+            detailed_logs = []
+            if os.path.exists(os.path.join(analysis_dir, 'preview.json')):
+                with open(os.path.join(analysis_dir, 'preview.json'), encoding='utf-8') as f:
+                    detailed_logs = json.load(f)
+
+            dataset_name = state['dataset']
+            job_data = build_job(manifest['job_id'], manifest['filename'], state['rows'], len(attacks))
+            with metrics.STAGE_SECONDS.time('store_write', dataset_name):
+                STATE.add_job(job_data, attacks)
+
+            # Columnar archive (Parquet) - failure here must not fail the analysis
+            try:
+                archive_path = result_archive.merge_job_archive(job_data['job_id'], dataset_name, segments, job_data['created_at'])
+                if archive_path:
+                    logger.info("📦 Results archived", extra={'job_id': job_data['job_id'], 'path': archive_path})
+            except Exception as e:
+                logger.warning("⚠️ Archive write failed: %s", e, extra={'job_id': job_data['job_id']})
+
+            UPLOADS.delete(upload_id)
+    except UploadError as e:
+        return upload_error_response(e)
+
+    logger.info("✅ Chunked upload analyzed", extra={'upload_id': upload_id, 'job_id': job_data['job_id'], 'rows': state['rows']})
+    return job_response(job_data, dataset_name, detailed_logs, upload_id=upload_id)
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def abort_chunked_upload(upload_id):
+    try:
+        UPLOADS.get(upload_id)
+    except UploadError as e:
+        return upload_error_response(e)
+    UPLOADS.delete(upload_id)
+    return jsonify({'upload_id': upload_id, 'status': 'aborted'})
+
+# ==================== LIVE MONITORING (AGENT ARCHITECTURE) ====================
+
+def process_ingested_logs(log_lines, source, client_ip):
+    """Scores agent log lines in one detect_batch call and records them (live logs, attacks, agent status)."""
+    # Update Agent Status
+    store_started = time.perf_counter()
+    STATE.touch_agent(source, {
+        'last_seen': datetime.utcnow().isoformat(),
+        'ip': client_ip,
+        'status': 'online'
+    })
+    store_seconds = time.perf_counter() - store_started
+    logger.debug("Agent heartbeat", extra={'source': source, 'ip': client_ip})
+
+    # Immediate Ensemble Analysis (Using Cached Model)
+    detector = get_detector("SAMET")  # Uses cached model
+    results = detector.detect_batch([{'detail': line, 'message': line} for line in log_lines])
+    metrics.ROWS_SCORED.inc('SAMET', amount=len(log_lines))
+
+    store_started = time.perf_counter()
+    for log_line, result in zip(log_lines, results):
         # Construct Log Record
         log_record = {
             'id': f"log_{int(time.time()*1000)}_{random.randint(1000,9999)}",
@@ -485,14 +1020,13 @@ def ingest_log():
                 'is_attack': bool(result.get('attack_detected', False))
             }
         }
-        
-        # Add to Buffer
-        LIVE_LOGS_BUFFER.append(log_record)
-        if len(LIVE_LOGS_BUFFER) > MAX_LIVE_LOGS:
-            LIVE_LOGS_BUFFER.pop(0)
-            
+
+        # Add to Buffer (keeps the last MAX_LIVE_LOGS records)
+        STATE.append_live_log(log_record)
+
         # Track and Alert on Attacks
         if result.get('attack_detected', False):
+            metrics.ATTACKS_DETECTED.inc('SAMET')
             attack_detail = {
                 'id': log_record['id'],
                 'timestamp': log_record['timestamp'],
@@ -503,27 +1037,241 @@ def ingest_log():
                 'log_preview': log_line[:200],
                 'detected_at': datetime.utcnow().isoformat()
             }
-            
-            # Store in live attacks
-            if 'live_monitor' not in ATTACKS_STORE:
-                ATTACKS_STORE['live_monitor'] = []
-            ATTACKS_STORE['live_monitor'].append(attack_detail)
-            
-            # Keep only last 100 live attacks
-            if len(ATTACKS_STORE['live_monitor']) > 100:
-                ATTACKS_STORE['live_monitor'] = ATTACKS_STORE['live_monitor'][-100:]
-            
+
+            # Store in live attacks (keeps only last 100)
+            STATE.add_live_attack(attack_detail)
+    metrics.STAGE_SECONDS.observe(store_seconds + time.perf_counter() - store_started, 'store_write', 'SAMET')
+
+    for result in results:
+        if result.get('attack_detected', False):
             # Console Alert
-            print(f"🚨 ATTACK DETECTED! Source: {source} | Type: {result['final_decision']} | Confidence: {result['confidence_score']:.2f}")
+            logger.warning("🚨 ATTACK DETECTED!", extra={
+                'source': source,
+                'attack_type': result['final_decision'],
+                'confidence': round(float(result['confidence_score']), 4)
+            })
+    return results
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest_log():
+    """Receives logs from remote agents with security checks."""
+    try:
+        # === SECURITY LAYER ===
+        
+        client_ip = request.remote_addr
+        api_key = request.headers.get('X-API-Key')
+
+        # 1. API Key Authentication (Optional - can be disabled for testing)
+        # Uncomment the following to enforce API keys:
+        # agent_name = validate_api_key(request)
+        # if not agent_name:
+        #     return jsonify({'error': 'Invalid or missing API key'}), 401
+        
+        # 2. Input Validation
+        parse_started = time.perf_counter()
+        data = request.json
+        is_valid, error_msg = validate_ingest_payload(data)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - parse_started, 'request_parse', 'SAMET')
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+        
+        log_line = data.get('log', '')
+        source = data.get('source', 'unknown')
+
+        # 3. Rate Limiting (IP, API key and source buckets are charged together)
+        limited = charge_rate_limits(client_ip, api_key, source)
+        if limited:
+            return limited
+
+        # === END SECURITY LAYER ===
+
+        result = process_ingested_logs([log_line], source, client_ip)[0]
 
         return jsonify({'status': 'success', 'analysis': result['final_decision']}), 201
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Ingest failed")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/ingest/batch', methods=['POST'])
+def ingest_log_batch():
+    """Receives many log lines from one agent; rate limits are charged per line."""
+    try:
+        parse_started = time.perf_counter()
+        data = request.json
+        is_valid, error_msg = validate_ingest_batch_payload(data)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - parse_started, 'request_parse', 'SAMET')
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+
+        log_lines = data['logs']
+        source = data.get('source', 'unknown')
+        client_ip = request.remote_addr
+        cost = len(log_lines)
+
+        limited = charge_rate_limits(client_ip, request.headers.get('X-API-Key'), source, cost)
+        if limited:
+            return limited
+
+        results = process_ingested_logs(log_lines, source, client_ip)
+
+        return jsonify({
+            'status': 'success',
+            'count': len(results),
+            'attacks': sum(1 for r in results if r.get('attack_detected', False)),
+            'analysis': [r['final_decision'] for r in results]
+        }), 201
+
+    except Exception as e:
+        logger.exception("Batch ingest failed")
+        return jsonify({'error': str(e)}), 500
+
+
+def process_can_frames(frames, source, client_ip):
+    """Scores a CAN_FRAME_DTYPE record array with CANBusDetector and records the results."""
+    store_started = time.perf_counter()
+    STATE.touch_agent(source, {
+        'last_seen': datetime.utcnow().isoformat(),
+        'ip': client_ip,
+        'status': 'online'
+    })
+    store_seconds = time.perf_counter() - store_started
+
+    detector = get_detector(CAN_DATASET)
+    result = detector.detect_frames(frames)
+    metrics.ROWS_SCORED.inc(CAN_DATASET, amount=len(frames))
+
+    # Only the frames that stay in the live buffer and the last MAX_CAN_ATTACK_RECORDS
+    # attack frames are turned into records (all attacks are still counted and returned)
+    is_attack = result['is_attack']
+    keep = np.zeros(len(frames), dtype=bool)
+    keep[-MAX_LIVE_LOGS:] = True
+    record_attack = np.zeros(len(frames), dtype=bool)
+    record_attack[np.flatnonzero(is_attack)[-MAX_CAN_ATTACK_RECORDS:]] = True
+    store_started = time.perf_counter()
+    for i in np.flatnonzero(keep | record_attack).tolist():
+        frame = frames[i]
+        dlc = min(int(frame['dlc']), 8)
+        content = f"CAN ID: 0x{int(frame['arbitration_id']):03X} | Data: {frame['data'][:dlc].tobytes().hex()}"
+        timestamp = datetime.utcfromtimestamp(float(frame['timestamp'])).isoformat()
+        confidence = float(result['probability'][i])
+        attack = bool(is_attack[i])
+        log_record = {
+            'id': f"can_{int(time.time()*1000)}_{random.randint(1000,9999)}_{i}",
+            'timestamp': timestamp,
+            'source': source,
+            'content': content,
+            'analysis': {
+                'decision': result['attack_type'][i],
+                'confidence': confidence if attack else 1.0 - confidence,
+                'votes': [f"RF: {'🔴 SALDIRI' if attack else '🟢 NORMAL'} (%{confidence:.1%})"],
+                'winning_model': 'RF',
+                'is_attack': attack
+            }
+        }
+        if keep[i]:
+            STATE.append_live_log(log_record)
+        if record_attack[i]:
+            STATE.add_live_attack({
+                'id': log_record['id'],
+                'timestamp': timestamp,
+                'source': source,
+                'attack_type': result['attack_type'][i],
+                'confidence': confidence,
+                'winning_model': 'RF',
+                'log_preview': content,
+                'detected_at': datetime.utcnow().isoformat()
+            })
+    metrics.STAGE_SECONDS.observe(store_seconds + time.perf_counter() - store_started, 'store_write', CAN_DATASET)
+
+    attacks = int(is_attack.sum())
+    if attacks:
+        metrics.ATTACKS_DETECTED.inc(CAN_DATASET, amount=attacks)
+        logger.warning("🚨 CAN ATTACK FRAMES DETECTED!", extra={'source': source, 'attacks': attacks, 'frames': len(frames)})
+    return result
+
+@app.route('/api/ingest/can', methods=['POST'])
+def ingest_can_frames():
+    """
+    Receives raw CAN frames as packed CAN_FRAME_DTYPE records (application/octet-stream,
+    21 bytes per frame; source in X-Source or ?source=). The body is read with
+    np.frombuffer and scored column-wise - frames are never formatted as text.
+    Rate limits are charged by frame count (one token per CAN_FRAMES_PER_TOKEN frames,
+    like /api/ingest/batch charges per line); at most MAX_CAN_ATTACK_RECORDS attack
+    records are stored per request.
+    """
+    try:
+        client_ip = request.remote_addr
+        source = request.headers.get('X-Source') or request.args.get('source', 'unknown')
+
+        parse_started = time.perf_counter()
+        record_size = CAN_FRAME_DTYPE.itemsize
+        length = request.content_length
+        if length is not None and length > MAX_CAN_FRAMES * record_size:
+            return jsonify({'error': f'Too many frames (max {MAX_CAN_FRAMES} per request)'}), 400
+        body = request.get_data(cache=False)
+        if not body:
+            return jsonify({'error': 'Empty payload'}), 400
+        if len(body) % record_size:
+            return jsonify({'error': f'Body length must be a multiple of {record_size} bytes (one record per frame)'}), 400
+        frame_count = len(body) // record_size
+        if frame_count > MAX_CAN_FRAMES:
+            return jsonify({'error': f'Too many frames (max {MAX_CAN_FRAMES} per request)'}), 400
+
+        cost = -(-frame_count // CAN_FRAMES_PER_TOKEN)
+        limited = charge_rate_limits(client_ip, request.headers.get('X-API-Key'), source, cost)
+        if limited:
+            return limited
+        frames = np.frombuffer(body, dtype=CAN_FRAME_DTYPE)
+        timestamps = frames['timestamp']
+        invalid = ~(np.isfinite(timestamps) & (timestamps >= 0) & (timestamps < MAX_CAN_TIMESTAMP))
+        if invalid.any():
+            first = int(np.flatnonzero(invalid)[0])
+            return jsonify({'error': f'{int(invalid.sum())} frame(s) have an invalid timestamp '
+                                     f'(first: index {first}, value {float(timestamps[first])!r}); '
+                                     'expected finite epoch seconds'}), 400
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - parse_started, 'request_parse', CAN_DATASET)
+
+        result = process_can_frames(frames, source, client_ip)
+        attack_indices = np.flatnonzero(result['is_attack'])
+        return jsonify({
+            'status': 'success',
+            'count': len(frames),
+            'attacks': len(attack_indices),
+            'attack_indices': attack_indices,
+            'attack_types': result['attack_type'][attack_indices].tolist()
+        }), 201
+
+    except Exception as e:
+        logger.exception("CAN ingest failed")
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of stage latencies, counters and rate limits."""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+def _collect_runtime_metrics():
+    limiters = (IP_LIMITER, API_KEY_LIMITER, SOURCE_LIMITER)
+    stats = [limiter.stats() for limiter in limiters]
+    lines = []
+    for key, metric_type, documentation in (
+        ('allowed', 'counter', 'Requests allowed by the rate limiter.'),
+        ('rejected', 'counter', 'Requests rejected (429) by the rate limiter.'),
+        ('tracked_keys', 'gauge', 'Client keys currently tracked by the rate limiter.'),
+    ):
+        suffix = '_total' if metric_type == 'counter' else ''
+        lines += metrics.simple_metric(
+            f'anomi_rate_limit_{key}{suffix}', metric_type, documentation,
+            [({'limiter': st['name']}, st[key]) for st in stats]
+        )
+    lines += metrics.simple_metric('anomi_models_loaded', 'gauge', 'Cached ensemble detectors.', [({}, len(MODEL_CACHE))])
+    return lines
+
+metrics.REGISTRY.register_collector(_collect_runtime_metrics)
+
 @app.route('/api/download/agent', methods=['GET'])
 def download_agent():
     """Serve the Linux agent simulation script."""
@@ -541,38 +1289,41 @@ def download_agent():
         return jsonify({'error': str(e), 'attempted_path': script_path}), 500
 
 @app.route('/api/agents', methods=['GET'])
+@conditional_on_state('agents', time_bucket=AGENTS_TIME_BUCKET)
 def list_agents():
     """List all connected agents."""
     # Clean up old agents (timeout > 5 mins)
     now = datetime.utcnow()
     active_agents = []
     
-    print(f"DEBUG AGENTS API: Checking Agents. Store Size: {len(AGENTS_STORE)}")
-    for hostname, info in AGENTS_STORE.items():
+    agents = STATE.agents()
+    for hostname, info in agents.items():
         last_seen = datetime.fromisoformat(info['last_seen'])
         diff = (now - last_seen).total_seconds()
-        print(f"DEBUG AGENTS API: Agent {hostname} seen {diff:.1f}s ago")
         if diff < 300: # 5 min timeout
             active_agents.append({
                 'hostname': hostname,
                 **info
             })
             
+    logger.debug("Agents listed", extra={'store_size': len(agents), 'active': len(active_agents)})
     return jsonify({'agents': active_agents})
 
 @app.route('/api/monitor/stream', methods=['GET'])
 def monitor_stream():
     """Server-Sent Events for Live Monitoring Page."""
     def generate():
-        last_idx = len(LIVE_LOGS_BUFFER)
+        # Sequence cursor (works across workers and after the buffer wraps)
+        _, last_seq = STATE.live_logs_since(None)
         
         while True:
-            current_len = len(LIVE_LOGS_BUFFER)
-            if current_len > last_idx:
+            fanout_started = time.perf_counter()
+            new_logs, last_seq = STATE.live_logs_since(last_seq)
+            if new_logs:
                 # Send new logs
-                new_logs = LIVE_LOGS_BUFFER[last_idx:]
-                yield f"data: {json.dumps({'type': 'logs', 'data': new_logs})}\n\n"
-                last_idx = current_len
+                event = b"data: " + serialization.dumps({'type': 'logs', 'data': new_logs}) + b"\n\n"
+                metrics.STAGE_SECONDS.observe(time.perf_counter() - fanout_started, 'sse_fanout', 'live')
+                yield event
             
             # Send agent updates periodically (every 5 sec approx) or on change
             # For simplicity, send active agents count if needed, or frontend polls /api/agents
@@ -601,12 +1352,11 @@ def export_attacks_csv():
     # Collect all attacks from all jobs + live monitor
     all_attacks = []
     
-    # From file uploads
-    for job_id, attacks in ATTACKS_STORE.items():
-        for attack in attacks:
-            attack_copy = attack.copy()
-            attack_copy['source_job'] = job_id
-            all_attacks.append(attack_copy)
+    # From file uploads (attack references are rendered job by job from the archive)
+    for job_id, attacks in itertools.groupby(STATE.iter_attacks(), key=lambda item: item[0]):
+        for attack in render_attacks(job_id, [attack.copy() for _, attack in attacks]):
+            attack['source_job'] = job_id
+            all_attacks.append(attack)
     
     if not all_attacks:
         return jsonify({'error': 'No attacks to export'}), 404
@@ -639,14 +1389,15 @@ def export_logs_csv():
     import io
     import csv
     
-    if not LIVE_LOGS_BUFFER:
+    live_logs = STATE.live_logs()
+    if not live_logs:
         return jsonify({'error': 'No logs to export'}), 404
     
     output = io.StringIO()
     
     # Flatten the log records for CSV
     flattened_logs = []
-    for log in LIVE_LOGS_BUFFER:
+    for log in live_logs:
         flat = {
             'id': log['id'],
             'timestamp': log['timestamp'],
@@ -671,12 +1422,46 @@ def export_logs_csv():
         headers={'Content-Disposition': f'attachment; filename=logs_export_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.csv'}
     )
 
+@app.route('/api/export/parquet', methods=['GET'])
+def export_results_parquet():
+    """Export archived analysis results as a single Parquet file.
+
+    Query params: dataset, from, to (YYYY-MM-DD), job_id, attacks_only=1
+    """
+    if not result_archive.is_available():
+        return jsonify({'error': 'Parquet export requires pyarrow (pip install pyarrow)'}), 501
+
+    try:
+        buffer, row_count = result_archive.export_parquet_bytes(
+            dataset=request.args.get('dataset'),
+            date_from=request.args.get('from'),
+            date_to=request.args.get('to'),
+            job_id=request.args.get('job_id'),
+            attacks_only=request.args.get('attacks_only') in ('1', 'true')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Parquet export failed")
+        return jsonify({'error': str(e)}), 500
+
+    if row_count == 0:
+        return jsonify({'error': 'No archived results match the filter'}), 404
+
+    return send_file(
+        buffer,
+        mimetype='application/vnd.apache.parquet',
+        as_attachment=True,
+        download_name=f'results_export_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.parquet'
+    )
+
 # ==================== SSH STREAMING (REMOVED) ====================
 # SSH-based streaming has been replaced by Agent-based architecture.
 # Use /api/ingest and /api/monitor/stream instead.
 # Endpoints removed: /api/ssh/connect, /api/ssh/stream
 
 if __name__ == '__main__':
-    print("🚀 Starting In-Memory Backend on port 5050 (Accessible Externally)...")
+    # Development server. Production (multi-worker): gunicorn -c gunicorn.conf.py app:app
+    logger.info("🚀 Starting In-Memory Backend on port 5050 (Accessible Externally)...")
     # Disable reloader to prevent duplicate processes/state issues
     app.run(host='0.0.0.0', port=5050, debug=True, use_reloader=False)
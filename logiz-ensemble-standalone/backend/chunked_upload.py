@@ -0,0 +1,251 @@
+"""
+Resumable Chunked Uploads
+=========================
+Files larger than MAX_CONTENT_LENGTH (multi-GB CSMS exports) are sent in
+numbered parts instead of one request body:
+
+    POST   /api/uploads                       {filename, size, sha256?, part_size?} -> upload_id
+    PUT    /api/uploads/<upload_id>/parts/<n>  raw part bytes (X-Part-SHA256 optional)
+    GET    /api/uploads/<upload_id>           received / missing parts, analysis progress
+    POST   /api/uploads/<upload_id>/complete  integrity check + job
+    DELETE /api/uploads/<upload_id>           abort
+
+Parts are streamed to disk (never held in memory) under ANOMI_UPLOAD_DIR:
+
+    <upload_dir>/<upload_id>/manifest.json
+                            /part-00001 ...
+                            /analysis/    (state.json, carry-*.bin, attacks-*.json, segment-*.parquet)
+
+A part can be sent again at any time (failed or interrupted request); the last
+complete copy wins. The manifest is the only shared state, so any gunicorn
+worker can take any part: updates are serialized with a file lock.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# fcntl is POSIX only - on Windows (development server, one process) a thread lock is enough
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+UPLOAD_DIR = os.getenv('ANOMI_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'anomi_uploads'))
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+MAX_PART_SIZE = 32 * 1024 * 1024  # Stays below MAX_CONTENT_LENGTH (50MB)
+MAX_UPLOAD_SIZE = int(os.getenv('ANOMI_MAX_UPLOAD_BYTES', 20 * 1024 ** 3))
+SESSION_TTL = 24 * 3600  # Sessions untouched for this long are removed
+COPY_BLOCK = 1024 * 1024
+
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    """Client-side problem with an upload; carries the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class ChunkedUploadStore:
+    """Upload sessions on disk (shared by all workers that see the same directory)."""
+
+    def __init__(self, root=UPLOAD_DIR):
+        self.root = root
+        self._thread_locks = {}
+        self._thread_locks_guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    # ---------- Paths & locking ----------
+    def session_dir(self, upload_id):
+        if not _UPLOAD_ID_RE.match(upload_id or ''):
+            raise UploadError('Unknown upload', 404)
+        return os.path.join(self.root, upload_id)
+
+    def analysis_dir(self, upload_id):
+        return os.path.join(self.session_dir(upload_id), 'analysis')
+
+    def part_path(self, upload_id, number):
+        return os.path.join(self.session_dir(upload_id), f"part-{number:05d}")
+
+    @contextmanager
+    def lock(self, upload_id, name, blocking=True):
+        """Exclusive per-session lock (across threads and worker processes). Yields False if busy and not blocking."""
+        path = os.path.join(self.session_dir(upload_id), f".{name}.lock")
+        if fcntl is None:
+            with self._thread_locks_guard:
+                lock = self._thread_locks.setdefault(path, threading.Lock())
+            acquired = lock.acquire(blocking)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    lock.release()
+            return
+
+        try:
+            handle = open(path, 'a')
+        except FileNotFoundError:
+            raise UploadError('Unknown upload', 404)
+        with handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    # ---------- Manifest ----------
+    def _read_manifest(self, upload_id):
+        try:
+            with open(os.path.join(self.session_dir(upload_id), 'manifest.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError('Unknown upload', 404)
+
+    def _write_manifest(self, manifest):
+        path = os.path.join(self.session_dir(manifest['upload_id']), 'manifest.json')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def create(self, filename, size, sha256=None, part_size=None, job_id=None):
+        """Starts an upload session. Returns its manifest."""
+        if not filename:
+            raise UploadError("Missing 'filename'")
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            raise UploadError("'size' must be a positive integer (bytes)")
+        if size > MAX_UPLOAD_SIZE:
+            raise UploadError(f"'size' exceeds the upload limit ({MAX_UPLOAD_SIZE} bytes)", 413)
+        part_size = part_size or DEFAULT_PART_SIZE
+        if not isinstance(part_size, int) or not 1024 * 1024 <= part_size <= MAX_PART_SIZE:
+            raise UploadError(f"'part_size' must be between 1MB and {MAX_PART_SIZE} bytes")
+        if sha256 is not None and not _SHA256_RE.match(str(sha256).lower()):
+            raise UploadError("'sha256' must be a hex SHA-256 digest")
+
+        self.cleanup_expired()
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self.session_dir(upload_id))
+        manifest = {
+            'upload_id': upload_id,
+            'job_id': job_id,
+            'filename': filename,
+            'size': size,
+            'sha256': sha256.lower() if sha256 else None,
+            'part_size': part_size,
+            'total_parts': -(-size // part_size),
+            'parts': {},  # "n" -> {'size', 'sha256'}
+            'created_at': time.time(),
+        }
+        self._write_manifest(manifest)
+        return manifest
+
+    def get(self, upload_id):
+        return self._read_manifest(upload_id)
+
+    def missing_parts(self, manifest):
+        return [n for n in range(1, manifest['total_parts'] + 1) if str(n) not in manifest['parts']]
+
+    def expected_part_size(self, manifest, number):
+        if number == manifest['total_parts']:
+            return manifest['size'] - manifest['part_size'] * (manifest['total_parts'] - 1)
+        return manifest['part_size']
+
+    # ---------- Parts ----------
+    def write_part(self, upload_id, number, stream, expected_sha256=None):
+        """
+        Streams one part to disk and records it. Returns (part_info, replaced)
+        where replaced is True if an earlier copy of the part had other content.
+        """
+        manifest = self._read_manifest(upload_id)
+        if not 1 <= number <= manifest['total_parts']:
+            raise UploadError(f"Part number must be between 1 and {manifest['total_parts']}")
+        expected_size = self.expected_part_size(manifest, number)
+
+        path = self.part_path(upload_id, number)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                while True:
+                    block = stream.read(COPY_BLOCK)
+                    if not block:
+                        break
+                    written += len(block)
+                    if written > expected_size:
+                        raise UploadError(f"Part {number} is larger than {expected_size} bytes", 413)
+                    digest.update(block)
+                    f.write(block)
+            if written != expected_size:
+                raise UploadError(f"Part {number} has {written} bytes, expected {expected_size}",
+                                  expected_size=expected_size)
+            part_sha256 = digest.hexdigest()
+            if expected_sha256 and expected_sha256.lower() != part_sha256:
+                raise UploadError(f"Part {number} checksum mismatch", sha256=part_sha256)
+
+            with self.lock(upload_id, 'manifest'):
+                os.replace(tmp_path, path)
+                manifest = self._read_manifest(upload_id)
+                previous = manifest['parts'].get(str(number))
+                info = {'size': written, 'sha256': part_sha256}
+                manifest['parts'][str(number)] = info
+                self._write_manifest(manifest)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return info, bool(previous and previous['sha256'] != part_sha256)
+
+    def read_part(self, upload_id, number):
+        with open(self.part_path(upload_id, number), 'rb') as f:
+            return f.read()
+
+    def verify(self, upload_id):
+        """Integrity check before completion: every part present, total size and (optional) whole-file SHA-256."""
+        manifest = self._read_manifest(upload_id)
+        missing = self.missing_parts(manifest)
+        if missing:
+            raise UploadError('Upload is incomplete', 409, missing_parts=missing)
+        received = sum(part['size'] for part in manifest['parts'].values())
+        if received != manifest['size']:
+            raise UploadError(f"Received {received} bytes, expected {manifest['size']}", 422)
+        if manifest['sha256']:
+            digest = hashlib.sha256()
+            for number in range(1, manifest['total_parts'] + 1):
+                with open(self.part_path(upload_id, number), 'rb') as f:
+                    for block in iter(lambda: f.read(COPY_BLOCK), b''):
+                        digest.update(block)
+            if digest.hexdigest() != manifest['sha256']:
+                raise UploadError('File checksum mismatch - re-send the parts that changed', 422,
+                                  sha256=digest.hexdigest())
+        return manifest
+
+    # ---------- Cleanup ----------
+    def delete(self, upload_id):
+        shutil.rmtree(self.session_dir(upload_id), ignore_errors=True)
+
+    def cleanup_expired(self, ttl=SESSION_TTL):
+        """Removes sessions whose manifest has not changed for `ttl` seconds (abandoned uploads)."""
+        now = time.time()
+        for upload_id in os.listdir(self.root):
+            manifest_path = os.path.join(self.root, upload_id, 'manifest.json')
+            try:
+                if now - os.path.getmtime(manifest_path) > ttl:
+                    shutil.rmtree(os.path.join(self.root, upload_id), ignore_errors=True)
+            except OSError:
+                continue
@@ -0,0 +1,61 @@
+"""
+Production Server Configuration (Linux)
+=======================================
+    cd logiz-ensemble-standalone/backend
+    gunicorn -c gunicorn.conf.py app:app
+
+- preload_app: app.py is imported once in the master and all 10 ensemble models
+  are loaded there (when_ready). Workers are forked afterwards, so model memory
+  is shared copy-on-write instead of being loaded once per worker.
+- State (jobs, attacks, live logs, agents) lives in SQLite (state_store.py), so
+  every worker serves the same /api/stats, /api/jobs and SSE stream.
+- gthread workers: the SSE stream (/api/monitor/stream) holds one thread, not a
+  whole worker process.
+- Rate limits (rate_limiter.py) are per worker process: the effective limit is
+  roughly workers x the configured value.
+
+Environment overrides: ANOMI_BIND, ANOMI_WORKERS, ANOMI_THREADS, ANOMI_STATE_DB.
+The Windows/development entry point stays `python app.py`.
+"""
+
+import gc
+import multiprocessing
+import os
+
+# Must be set before app.py is imported (preload) so STATE is the shared backend
+os.environ.setdefault('ANOMI_STATE_BACKEND', 'sqlite')
+
+bind = os.getenv('ANOMI_BIND', '0.0.0.0:5050')
+workers = int(os.getenv('ANOMI_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.getenv('ANOMI_THREADS', 8))
+preload_app = True
+
+# Uploads of large CSVs can take a while to score
+timeout = 300
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers occasionally (bounded memory growth from pandas temporaries)
+max_requests = 20000
+max_requests_jitter = 2000
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
+
+
+def when_ready(server):
+    """Runs in the master after the app is imported and before workers are forked."""
+    import app as backend
+
+    loaded = backend.preload_detectors()
+    # Move everything allocated so far out of the GC's tracked generations, so
+    # collections in workers don't write to (and un-share) the model pages.
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Preloaded {len(loaded)} detectors in master: {', '.join(loaded)}")
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked (models shared copy-on-write)")
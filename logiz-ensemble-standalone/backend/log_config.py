@@ -0,0 +1,158 @@
+"""
+Structured, Non-Blocking Logging
+================================
+Request handlers never write to stdout themselves: records go into an
+in-memory queue (QueueHandler) and a single background thread
+(QueueListener) formats and writes them.
+
+Environment:
+    ANOMI_LOG_LEVEL         DEBUG | INFO | WARNING | ERROR     (default INFO)
+    ANOMI_LOG_FORMAT        text | json                        (default text)
+    ANOMI_LOG_DEBUG_SAMPLE  fraction of DEBUG records kept     (default 0.01)
+
+Usage:
+    logger = get_logger('ingest')
+    logger.info("Attack detected", extra={'source': src, 'attack_type': t})
+
+Everything passed in `extra` becomes a top-level field in JSON output.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+ROOT_LOGGER = 'anomi'
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line (for the log shipper)."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable console format; `extra` fields are appended as key=value."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        extras = [f"{k}={v}" for k, v in record.__dict__.items()
+                  if k not in _STANDARD_ATTRS and not k.startswith('_')]
+        return f"{line} | {' '.join(extras)}" if extras else line
+
+
+class DebugSampler(logging.Filter):
+    """Keeps only a fraction of DEBUG records; INFO and above always pass."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller (drops when the queue is full)."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Format the message now (args may change later), but keep `extra` fields as-is
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _EnqueueHandler.dropped += 1
+
+
+def _start_listener(formatter, fresh_queue=False):
+    global _listener
+    if fresh_queue:
+        # After fork the inherited queue's lock may be held by a thread that no longer exists
+        _handler.queue = queue.Queue(maxsize=_handler.queue.maxsize)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    _listener = logging.handlers.QueueListener(_handler.queue, stream_handler, respect_handler_level=False)
+    _listener.start()
+
+
+def setup_logging(level=None, json_output=None, debug_sample=None, max_queue=10000):
+    """Configures the 'anomi' logger hierarchy once. Safe to call repeatedly."""
+    global _handler
+    if _handler is not None:
+        return logging.getLogger(ROOT_LOGGER)
+
+    level = (level or os.getenv('ANOMI_LOG_LEVEL', 'INFO')).upper()
+    if json_output is None:
+        json_output = os.getenv('ANOMI_LOG_FORMAT', 'text').lower() == 'json'
+    if debug_sample is None:
+        debug_sample = float(os.getenv('ANOMI_LOG_DEBUG_SAMPLE', '0.01'))
+
+    formatter = JsonFormatter() if json_output else TextFormatter()
+
+    _handler = _EnqueueHandler(queue.Queue(maxsize=max_queue))
+    _handler.addFilter(DebugSampler(debug_sample))
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+    root.addHandler(_handler)
+    root.propagate = False
+
+    _start_listener(formatter)
+    atexit.register(shutdown_logging)
+    # The listener thread does not survive fork() (gunicorn workers): restart it in the child
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: _start_listener(formatter, fresh_queue=True))
+    return root
+
+
+def set_level(level):
+    """Changes the level of the whole 'anomi' hierarchy at runtime."""
+    logging.getLogger(ROOT_LOGGER).setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def shutdown_logging():
+    """Flushes pending records (called at exit)."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def get_logger(name):
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
@@ -0,0 +1,131 @@
+"""
+Token-Bucket Rate Limiter
+=========================
+Thread-safe, bounded-memory rate limiting for /api/ingest.
+
+- Token bucket: `rate` tokens/sec refill up to `burst`, so a client can never
+  exceed `burst` requests in any instant (no 2x burst at window edges).
+- Lock striping: keys are spread over N shards, each with its own lock, so
+  concurrent requests for different clients rarely contend.
+- Idle eviction: each shard is an LRU (OrderedDict). Entries idle longer than
+  `idle_ttl` are dropped (a fully refilled bucket is identical to a new one),
+  and `max_entries` caps every shard even under a spoofed-IP flood.
+- allow_all(): a request checked against several limiters (IP, API key,
+  source) is charged in all of them or in none, so a bucket that rejects it
+  does not leave the others drained.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Shard:
+    __slots__ = ('lock', 'buckets', 'allowed', 'rejected', 'evicted', 'last_sweep')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()  # key -> [tokens, last_seen]
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+        self.last_sweep = time.monotonic()
+
+
+class TokenBucketLimiter:
+    def __init__(self, name, rate, burst, shards=16, idle_ttl=300.0, max_entries=100000):
+        """
+        rate:        tokens refilled per second
+        burst:       bucket capacity (max requests in a burst)
+        idle_ttl:    seconds after which an untouched key is forgotten
+        max_entries: upper bound on tracked keys (split across shards)
+        """
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.idle_ttl = float(idle_ttl)
+        self.max_per_shard = max(1, max_entries // shards)
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def allow(self, key, cost=1.0):
+        """Consumes `cost` tokens for `key`. Returns True if the request is allowed."""
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+
+        with shard.lock:
+            buckets = shard.buckets
+            entry = buckets.get(key)
+            if entry is None:
+                if len(buckets) >= self.max_per_shard or now - shard.last_sweep > self.idle_ttl:
+                    self._sweep(shard, now)
+                entry = buckets[key] = [self.burst, now]
+            else:
+                buckets.move_to_end(key)
+                entry[0] = min(self.burst, entry[0] + (now - entry[1]) * self.rate)
+                entry[1] = now
+
+            if entry[0] >= cost:
+                entry[0] -= cost
+                shard.allowed += 1
+                return True
+
+            shard.rejected += 1
+            return False
+
+    def refund(self, key, cost=1.0):
+        """Gives back tokens taken by allow() for a request that was rejected elsewhere."""
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            entry = shard.buckets.get(key)
+            if entry is not None:
+                entry[0] = min(self.burst, entry[0] + cost)
+            shard.allowed -= 1
+
+    def retry_after(self, key, cost=1.0):
+        """Seconds until `key` has enough tokens again (for the Retry-After header)."""
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            entry = shard.buckets.get(key)
+            if entry is None or self.rate <= 0:
+                return 0.0
+            tokens = min(self.burst, entry[0] + (time.monotonic() - entry[1]) * self.rate)
+            return max(0.0, (cost - tokens) / self.rate)
+
+    def _sweep(self, shard, now):
+        """Drops idle entries from the LRU front; evicts the oldest if still full. Caller holds the lock."""
+        buckets = shard.buckets
+        while buckets:
+            key, entry = next(iter(buckets.items()))
+            if now - entry[1] <= self.idle_ttl and len(buckets) < self.max_per_shard:
+                break
+            del buckets[key]
+            shard.evicted += 1
+        shard.last_sweep = now
+
+    def stats(self):
+        """Aggregated counters (read without locks - values are monotonically increasing ints)."""
+        return {
+            'name': self.name,
+            'rate_per_sec': self.rate,
+            'burst': self.burst,
+            'allowed': sum(s.allowed for s in self._shards),
+            'rejected': sum(s.rejected for s in self._shards),
+            'evicted': sum(s.evicted for s in self._shards),
+            'tracked_keys': sum(len(s.buckets) for s in self._shards),
+        }
+
+
+def allow_all(checks):
+    """
+    checks: [(limiter, key, cost), ...]. Charges every limiter or none of them.
+    Returns None if allowed, else the (limiter, key, cost) that rejected the request.
+    """
+    charged = []
+    for check in checks:
+        limiter, key, cost = check
+        if not limiter.allow(key, cost):
+            for done_limiter, done_key, done_cost in charged:
+                done_limiter.refund(done_key, done_cost)
+            return check
+        charged.append(check)
+    return None
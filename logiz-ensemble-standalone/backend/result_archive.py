@@ -0,0 +1,291 @@
+"""
+Columnar Result Archive (Parquet)
+=================================
+Every upload job is archived as a Parquet file, partitioned by dataset and date:
+
+    archive/dataset=SAMET/date=2026-01-05/job_20260105_101500.parquet
+
+Columns: job_id, record_index, decision, confidence, attack_detected,
+winning_model, proba_<MODEL> (one per council member) and raw_<field>
+(the original log fields, typed). Chunked uploads write one piece per part
+(write_segment) and merge them into the job file on completion (merge_job_archive).
+
+The same loader is used by the /api/export/parquet endpoint and offline:
+
+    python result_archive.py --dataset SAMET --from 2026-01-01 --out samet.parquet
+"""
+
+import os
+import io
+import re
+import glob
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# pyarrow is optional - archive is disabled (not the analysis) when it is missing
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+ARCHIVE_DIR = os.getenv(
+    'ANOMI_ARCHIVE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+)
+
+RESULT_COLUMNS = ['job_id', 'record_index', 'decision', 'confidence', 'attack_detected', 'winning_model']
+# Row groups carry record_index min/max, so read_job_rows() only decodes the groups of a page
+ROW_GROUP_SIZE = 65536
+# dataset / job_id filters become part of a glob pattern: letters, digits and '_' only.
+# \w (not [A-Za-z0-9_]) because dataset names are Turkish: 'EMİRHAN', 'İREM', 'ALİ'
+NAME_PATTERN = re.compile(r'^\w+$')
+
+
+def is_available():
+    """Returns True if pyarrow is installed and archives can be written/read."""
+    return pq is not None
+
+
+def _raw_frame(df):
+    """Prefixes raw log fields and converts mixed object (and category) columns to strings."""
+    raw = df.reset_index(drop=True).copy()
+    raw.columns = [f"raw_{c}" for c in raw.columns]
+    for col in raw.columns:
+        if isinstance(raw[col].dtype, pd.CategoricalDtype):
+            # Typed uploads (read_log_csv): categories differ per job and would break concat
+            raw[col] = raw[col].astype(object)
+        elif raw[col].dtype == np.float32:
+            # float32 model features: archive the values as read (0.45, not 0.4499999881)
+            raw[col] = raw[col].astype(str).astype('float64')
+        if raw[col].dtype == object:
+            raw[col] = raw[col].where(raw[col].isna(), raw[col].astype(str))
+    return raw
+
+
+def build_result_frame(job_id, df, batch_results, record_offset=0):
+    """
+    Builds the columnar archive table from the source frame and detector results.
+    record_offset numbers the rows of a later piece of the same job (chunked uploads).
+    """
+    model_names = []
+    for result in batch_results:
+        for name in result.get('model_probabilities', {}):
+            if name not in model_names:
+                model_names.append(name)
+
+    out = pd.DataFrame({
+        'job_id': job_id,
+        'record_index': pd.Series(range(record_offset, record_offset + len(batch_results)), dtype='int64'),
+        'decision': [r['final_decision'] for r in batch_results],
+        'confidence': pd.Series([r['confidence_score'] for r in batch_results], dtype='float32'),
+        'attack_detected': pd.Series([bool(r.get('attack_detected', False)) for r in batch_results], dtype='bool'),
+        'winning_model': [r.get('winning_model', 'ENSEMBLE') for r in batch_results],
+    })
+
+    for name in model_names:
+        out[f"proba_{name}"] = pd.Series(
+            [r.get('model_probabilities', {}).get(name, float('nan')) for r in batch_results],
+            dtype='float32'
+        )
+
+    return pd.concat([out, _raw_frame(df)], axis=1)
+
+
+def write_job_archive(job_id, dataset_name, df, batch_results, created_at=None, archive_dir=None):
+    """
+    Writes one job's results as a Parquet file in the dataset/date partition.
+    Returns the written path, or None if pyarrow is not installed.
+    """
+    if not is_available():
+        return None
+
+    created_at = created_at or datetime.utcnow()
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+
+    partition_dir = os.path.join(
+        archive_dir or ARCHIVE_DIR,
+        f"dataset={dataset_name}",
+        f"date={created_at.strftime('%Y-%m-%d')}"
+    )
+    os.makedirs(partition_dir, exist_ok=True)
+
+    table = pa.Table.from_pandas(build_result_frame(job_id, df, batch_results), preserve_index=False)
+    path = os.path.join(partition_dir, f"{job_id}.parquet")
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)  # Readers never see half-written files
+    return path
+
+
+def write_segment(path, job_id, df, batch_results, record_offset=0):
+    """
+    Writes the results of one piece of a job to `path` (outside the archive).
+    merge_job_archive() later turns the pieces into the job's archive file.
+    """
+    if not is_available():
+        return None
+    table = pa.Table.from_pandas(build_result_frame(job_id, df, batch_results, record_offset), preserve_index=False)
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+    return path
+
+
+def merge_job_archive(job_id, dataset_name, segment_paths, created_at=None, archive_dir=None):
+    """
+    Streams the pieces written by write_segment() into one archive file, one
+    row group per piece, so memory stays at one piece. Returns the written path.
+    """
+    if not is_available() or not segment_paths:
+        return None
+
+    created_at = created_at or datetime.utcnow()
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+
+    partition_dir = os.path.join(
+        archive_dir or ARCHIVE_DIR,
+        f"dataset={dataset_name}",
+        f"date={created_at.strftime('%Y-%m-%d')}"
+    )
+    os.makedirs(partition_dir, exist_ok=True)
+
+    # Pieces are parsed separately: a column can be null in one and int/double in another
+    schema = pa.unify_schemas([pq.read_schema(p) for p in segment_paths], promote_options='permissive')
+    path = os.path.join(partition_dir, f"{job_id}.parquet")
+    tmp_path = path + '.tmp'
+    with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+        for segment_path in segment_paths:
+            table = pq.read_table(segment_path)
+            for field in schema:
+                if field.name not in table.column_names:
+                    table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+            writer.write_table(table.select(schema.names).cast(schema), row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _list_files(archive_dir, dataset=None, date_from=None, date_to=None, job_id=None):
+    """Prunes partitions by directory name before any file is opened."""
+    for name, value in (('dataset', dataset), ('job_id', job_id)):
+        if value and not NAME_PATTERN.fullmatch(value):
+            raise ValueError(f"Invalid {name}: {value!r}")
+    pattern = os.path.join(
+        archive_dir,
+        f"dataset={dataset}" if dataset else "dataset=*",
+        "date=*",
+        f"{job_id}.parquet" if job_id else "*.parquet"
+    )
+    files = []
+    for path in sorted(glob.glob(pattern)):
+        date = os.path.basename(os.path.dirname(path)).split('=', 1)[1]
+        if date_from and date < date_from:
+            continue
+        if date_to and date > date_to:
+            continue
+        files.append(path)
+    return files
+
+
+def load_archive(dataset=None, date_from=None, date_to=None, job_id=None,
+                 columns=None, attacks_only=False, archive_dir=None):
+    """
+    Loads archived results as a DataFrame (dataset/date come from the partition path).
+    Dates are 'YYYY-MM-DD' strings (inclusive). Raw columns missing in some jobs are null.
+    """
+    if not is_available():
+        raise RuntimeError("pyarrow is not installed. Install it with 'pip install pyarrow'.")
+
+    archive_dir = archive_dir or ARCHIVE_DIR
+    files = _list_files(archive_dir, dataset, date_from, date_to, job_id)
+    if not files:
+        return pd.DataFrame(columns=['dataset', 'date'] + RESULT_COLUMNS)
+
+    tables = []
+    for path in files:
+        file_columns = None
+        if columns:
+            available = set(pq.read_schema(path).names)
+            file_columns = [c for c in columns if c in available]
+        table = pq.read_table(path, columns=file_columns)
+        if attacks_only and 'attack_detected' in table.column_names:
+            table = table.filter(table['attack_detected'])
+        partition = os.path.dirname(path)
+        table = table.append_column('date', pa.array([partition.rsplit('date=', 1)[1]] * table.num_rows, pa.string()))
+        table = table.append_column('dataset', pa.array([partition.split('dataset=', 1)[1].split(os.sep, 1)[0]] * table.num_rows, pa.string()))
+        tables.append(table)
+
+    # A raw field can be typed differently per job (timestamp from a CSV upload,
+    # string from a TXT one) - permissive promotion cannot merge those, so they are exported as text
+    types = {}
+    for table in tables:
+        for field in table.schema:
+            types.setdefault(field.name, set()).add(field.type)
+    conflicts = {name for name, found in types.items() if len({t for t in found if t != pa.null()}) > 1}
+    if conflicts:
+        tables = [_cast_columns_to_string(table, conflicts) for table in tables]
+
+    table = pa.concat_tables(tables, promote_options='permissive')
+    return table.to_pandas()
+
+
+def _cast_columns_to_string(table, names):
+    """Casts the given columns of an Arrow table to string (nulls stay null)."""
+    for i, name in enumerate(table.column_names):
+        if name in names and table.schema.field(i).type != pa.string():
+            table = table.set_column(i, name, table[name].cast(pa.string()))
+    return table
+
+
+def read_job_rows(job_id, record_indices, archive_dir=None):
+    """
+    Archived rows of one job by record_index (results + raw_<field>), indexed by
+    record_index. Used to render stored attack references page by page.
+    Empty frame if the job has no archive file.
+    """
+    if not is_available():
+        return pd.DataFrame()
+    files = _list_files(archive_dir or ARCHIVE_DIR, job_id=job_id)
+    if not files or not record_indices:
+        return pd.DataFrame()
+    table = pq.read_table(files[0], filters=[('record_index', 'in', sorted(set(record_indices)))])
+    return table.to_pandas().set_index('record_index')
+
+
+def export_parquet_bytes(**filters):
+    """Returns the filtered archive as a single in-memory Parquet file (for HTTP download)."""
+    df = load_archive(**filters)
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), buffer, compression='zstd')
+    buffer.seek(0)
+    return buffer, len(df)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Anomi sonuç arşivi (Parquet) okuyucu")
+    parser.add_argument('--dataset', help="Dataset adı (örn. SAMET)")
+    parser.add_argument('--from', dest='date_from', help="Başlangıç tarihi YYYY-MM-DD")
+    parser.add_argument('--to', dest='date_to', help="Bitiş tarihi YYYY-MM-DD")
+    parser.add_argument('--job', dest='job_id', help="Tek bir job_id")
+    parser.add_argument('--attacks-only', action='store_true', help="Sadece saldırı kayıtları")
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    parser.add_argument('--out', help="Çıktı dosyası (.parquet veya .csv)")
+    args = parser.parse_args()
+
+    result = load_archive(args.dataset, args.date_from, args.date_to, args.job_id,
+                          attacks_only=args.attacks_only, archive_dir=args.archive_dir)
+    print(f"📦 {len(result)} kayıt yüklendi.")
+    if args.out:
+        if args.out.endswith('.csv'):
+            result.to_csv(args.out, index=False)
+        else:
+            result.to_parquet(args.out, index=False)
+        print(f"✅ Kaydedildi: {args.out}")
+    else:
+        print(result.head(20).to_string())
@@ -0,0 +1,188 @@
+"""
+JSON Serialization & Response Compression
+=========================================
+Large API payloads (upload detailed logs, job result pages, CSV exports, SSE
+live-log events) are the bulk of the dashboard traffic, often over a thin
+site VPN.
+
+- dumps(): orjson when installed (C, UTF-8 bytes, NumPy scalars and arrays
+  serialized natively, NaN -> null), stdlib json otherwise. FastJSONProvider
+  plugs it into Flask, so every jsonify() uses it.
+- compress_response(): negotiated Content-Encoding (br if the `brotli`
+  package is installed, else gzip) for text payloads above COMPRESS_MIN_SIZE.
+  Streamed responses (SSE) are compressed chunk by chunk with a sync flush,
+  so every event still reaches the browser immediately.
+
+    ANOMI_COMPRESS_MIN_BYTES   smallest body worth compressing (default 1024)
+    ANOMI_COMPRESS=0           turn compression off (e.g. behind an nginx that compresses)
+"""
+
+import datetime
+import decimal
+import json
+import os
+import uuid
+import zlib
+
+import numpy as np
+from flask.json.provider import JSONProvider
+
+# Optional fast paths (pip install orjson brotli)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_ENABLED = os.getenv('ANOMI_COMPRESS', '1') != '0'
+COMPRESS_MIN_SIZE = int(os.getenv('ANOMI_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 6       # zlib default: ~most of level 9's ratio at a fraction of the CPU
+BROTLI_QUALITY = 5   # Dynamic content: q5 beats gzip -6 on size at similar speed
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/csv', 'text/plain', 'text/event-stream',
+    'text/html', 'text/css', 'application/javascript',
+}
+# Preferred first when the client accepts several with the same quality
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _default(obj):
+    """Types neither encoder handles by itself (pandas Timestamp, object arrays, sets...)."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        # pd.NaT is a datetime subclass too
+        return None if obj != obj else obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """obj -> compact UTF-8 JSON bytes."""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumps(obj):
+        """obj -> compact UTF-8 JSON bytes."""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    loads = json.loads
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by dumps()/loads() (app.json = FastJSONProvider(app))."""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+# ==================== Compression ====================
+class _StreamCompressor:
+    """Incremental br/gzip encoder; flush() ends the current block so the client can decode it now."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 16+: gzip container (header + CRC32), what browsers expect for "gzip"
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self):
+        if self.encoding == 'br':
+            return self._compressor.flush()
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress(data, encoding):
+    """Whole body -> br/gzip bytes."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = _StreamCompressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def _compress_stream(chunks, encoding):
+    compressor = _StreamCompressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            yield compressor.compress(chunk) + compressor.flush()
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def negotiate_encoding(accept_encodings):
+    """Best supported Content-Encoding for a parsed Accept-Encoding header (None: send identity)."""
+    return accept_encodings.best_match(SUPPORTED_ENCODINGS)
+
+
+def compress_response(response, accept_encodings):
+    """
+    after_request hook: compresses text bodies the client accepts compressed.
+    Skips file responses (send_file - Parquet is compressed already), statuses
+    without a body, bodies that are already encoded and small payloads where
+    the headers would outweigh the savings.
+    """
+    if not COMPRESS_ENABLED or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 206, 304)):
+        return response
+    encoding = negotiate_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(compress(data, encoding))
+        # A strong ETag names one exact byte sequence: the compressed body gets its own
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+    response.headers['Content-Encoding'] = encoding
+    return response
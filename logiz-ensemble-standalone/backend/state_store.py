@@ -0,0 +1,432 @@
+"""
+Shared Application State
+========================
+Jobs, detected attacks, the live log buffer and agent heartbeats.
+
+Two interchangeable backends:
+
+- MemoryStateStore  (default, `python app.py`): plain Python containers, one process.
+- SQLiteStateStore  (ANOMI_STATE_BACKEND=sqlite, used by gunicorn.conf.py): a WAL-mode
+  SQLite file shared by all worker processes, so /api/stats, /api/jobs, /api/agents
+  and the SSE stream show the same data no matter which worker answers.
+
+Live logs carry a monotonically increasing `seq`; the SSE stream polls
+`live_logs_since(seq)` instead of comparing list lengths.
+
+Upload jobs store attack references (record index, probability, type), not the
+raw rows; the memory store keeps them column by column (ColumnarRecords).
+
+Every write bumps a version counter of its table (jobs, attacks, live_logs,
+agents). versions(*tables) returns a tag that changes whenever one of those
+tables changed, so polled endpoints can answer 304 without reading the data.
+
+Multi-file uploads store one parent job (`child_jobs`) next to the per-file
+jobs; parents are left out of totals() so their records are not counted twice.
+"""
+
+import heapq
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from array import array
+from collections import deque
+
+
+def counted_totals(job):
+    """(records, attacks) a job adds to the dashboard totals - zero for parent jobs."""
+    if job.get('child_jobs'):
+        return 0, 0
+    return job['total_records'], job['attacks_detected']
+
+
+class ColumnarRecords:
+    """
+    Read-only sequence of same-shaped dicts stored column by column: ints and
+    floats in typed arrays, everything else as small codes into the list of
+    distinct values. An upload attack reference takes ~30 bytes instead of a dict.
+    """
+
+    def __init__(self, records):
+        self._length = len(records)
+        self._columns = {}
+        for key in (records[0] if records else ()):
+            values = [record.get(key) for record in records]
+            if all(type(v) is int for v in values):
+                self._columns[key] = array('q', values)
+            elif all(type(v) in (int, float) for v in values):
+                self._columns[key] = array('d', values)
+            else:
+                distinct = {}
+                codes = [distinct.setdefault(v, len(distinct)) for v in values]
+                typecode = 'B' if len(distinct) <= 0xFF else 'H' if len(distinct) <= 0xFFFF else 'L'
+                self._columns[key] = (array(typecode, codes), list(distinct))
+
+    def __len__(self):
+        return self._length
+
+    def value(self, key, index):
+        column = self._columns[key]
+        if isinstance(column, tuple):
+            codes, distinct = column
+            return distinct[codes[index]]
+        return column[index]
+
+    def _record(self, index):
+        return {key: self.value(key, index) for key in self._columns}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._record(index)
+
+    def __iter__(self):
+        return (self._record(i) for i in range(self._length))
+
+    def newest(self, limit, key='detected_at'):
+        """Indexes of the `limit` records with the largest `key`, in record order."""
+        if key not in self._columns:
+            return list(range(min(limit, self._length)))
+        return sorted(heapq.nlargest(limit, range(self._length), key=lambda i: self.value(key, i) or ''))
+
+
+class MemoryStateStore:
+    """Single-process store (development server)."""
+
+    def __init__(self, max_live_logs=100, max_live_attacks=100):
+        self._lock = threading.Lock()
+        self._jobs = []
+        self._attacks = {}  # job_id -> list of attack dicts
+        self._live_logs = deque(maxlen=max_live_logs)  # (seq, record)
+        self._live_seq = 0
+        self._agents = {}
+        self.max_live_attacks = max_live_attacks
+        # table -> (version, last write time); the generation keeps tags of an earlier process from matching
+        self._versions = {}
+        self._generation = uuid.uuid4().hex[:8]
+        self._created_at = time.time()
+
+    # ---------- Versions ----------
+    def _bump(self, *tables):
+        now = time.time()
+        for table in tables:
+            self._versions[table] = (self._versions.get(table, (0, now))[0] + 1, now)
+
+    def versions(self, *tables):
+        """Returns (tag, last_modified): tag changes whenever one of the tables is written."""
+        with self._lock:
+            entries = [self._versions.get(table, (0, self._created_at)) for table in tables]
+        tag = '-'.join([self._generation] + [str(version) for version, _ in entries])
+        return tag, max(modified for _, modified in entries)
+
+    # ---------- Jobs ----------
+    def add_job(self, job, attacks=None):
+        with self._lock:
+            self._jobs.append(job)
+            if attacks:
+                self._attacks[job['job_id']] = ColumnarRecords(attacks)
+                self._bump('attacks')
+            self._bump('jobs')
+
+    def list_jobs(self):
+        with self._lock:
+            return sorted(self._jobs, key=lambda x: x['created_at'], reverse=True)
+
+    def get_job(self, job_id):
+        with self._lock:
+            return next((item for item in self._jobs if item['job_id'] == job_id), None)
+
+    def totals(self):
+        with self._lock:
+            counted = [counted_totals(job) for job in self._jobs]
+        return sum(records for records, _ in counted), sum(attacks for _, attacks in counted)
+
+    # ---------- Attacks ----------
+    def get_attacks(self, job_id, limit=None, offset=0):
+        with self._lock:
+            attacks = self._attacks.get(job_id, [])
+            end = None if limit is None else offset + limit
+            return attacks[offset:end]
+
+    def count_attacks(self, job_id):
+        with self._lock:
+            return len(self._attacks.get(job_id, []))
+
+    def iter_attacks(self):
+        """Yields (job_id, attack) for every stored attack, including live ones."""
+        with self._lock:
+            # ColumnarRecords are never modified; live attack lists are copied
+            snapshot = [(job_id, attacks if isinstance(attacks, ColumnarRecords) else list(attacks))
+                        for job_id, attacks in self._attacks.items()]
+        for job_id, attacks in snapshot:
+            for attack in attacks:
+                yield job_id, attack
+
+    def recent_attacks(self, limit=5):
+        # Only each job's newest candidates become dicts (same order as sorting all attacks)
+        with self._lock:
+            candidates = []
+            for attacks in self._attacks.values():
+                if isinstance(attacks, ColumnarRecords):
+                    candidates.extend(attacks[i] for i in attacks.newest(limit))
+                else:
+                    candidates.extend(attacks)
+        return sorted(candidates, key=lambda x: x.get('detected_at', ''), reverse=True)[:limit]
+
+    def add_live_attack(self, attack, job_id='live_monitor'):
+        with self._lock:
+            attacks = self._attacks.setdefault(job_id, [])
+            attacks.append(attack)
+            if len(attacks) > self.max_live_attacks:
+                del attacks[:-self.max_live_attacks]
+            self._bump('attacks')
+
+    # ---------- Live logs ----------
+    def append_live_log(self, record):
+        with self._lock:
+            self._live_seq += 1
+            self._live_logs.append((self._live_seq, record))
+            self._bump('live_logs')
+            return self._live_seq
+
+    def live_logs(self):
+        with self._lock:
+            return [record for _, record in self._live_logs]
+
+    def live_logs_since(self, seq):
+        """Returns (new_records, last_seq). seq=None starts at the current end."""
+        with self._lock:
+            if seq is None:
+                return [], self._live_seq
+            return [record for s, record in self._live_logs if s > seq], self._live_seq
+
+    # ---------- Agents ----------
+    def touch_agent(self, hostname, info):
+        with self._lock:
+            self._agents[hostname] = info
+            self._bump('agents')
+
+    def agents(self):
+        with self._lock:
+            return dict(self._agents)
+
+
+class SQLiteStateStore:
+    """Cross-process store backed by one SQLite file (WAL mode, one connection per thread)."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            total_records INTEGER NOT NULL,
+            attacks_detected INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS attacks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            detected_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_attacks_job ON attacks(job_id, id);
+        CREATE INDEX IF NOT EXISTS idx_attacks_detected ON attacks(detected_at);
+        CREATE TABLE IF NOT EXISTS live_logs (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS agents (
+            hostname TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path, max_live_logs=100, max_live_attacks=100):
+        self.path = path
+        self.max_live_logs = max_live_logs
+        self.max_live_attacks = max_live_attacks
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(self.SCHEMA)
+            # Generation row: a new database file never repeats the tags of a deleted one
+            conn.execute('INSERT OR IGNORE INTO versions (name, version, updated_at) VALUES (?, ?, ?)',
+                         ('generation', random.getrandbits(31), time.time()))
+
+    def _conn(self):
+        # Connections must not cross fork() or threads: keyed by pid + thread-local
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ---------- Versions ----------
+    def _bump(self, conn, *tables):
+        """Runs inside the caller's write transaction."""
+        now = time.time()
+        conn.executemany(
+            'INSERT INTO versions (name, version, updated_at) VALUES (?, 1, ?) '
+            'ON CONFLICT(name) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at',
+            ((table, now) for table in tables)
+        )
+
+    def versions(self, *tables):
+        """Returns (tag, last_modified): tag changes whenever one of the tables is written."""
+        names = ('generation',) + tables
+        rows = self._conn().execute(
+            f"SELECT name, version, updated_at FROM versions WHERE name IN ({','.join('?' * len(names))})", names
+        ).fetchall()
+        entries = {name: (version, updated_at) for name, version, updated_at in rows}
+        generation, created_at = entries['generation']
+        versions = [entries.get(table, (0, created_at)) for table in tables]
+        tag = '-'.join([str(generation)] + [str(version) for version, _ in versions])
+        return tag, max(modified for _, modified in versions)
+
+    # ---------- Jobs ----------
+    def add_job(self, job, attacks=None):
+        conn = self._conn()
+        # The columns only feed totals(); the job itself (with its real counts) is in `data`
+        records, attacks_detected = counted_totals(job)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO jobs (job_id, created_at, total_records, attacks_detected, data) VALUES (?, ?, ?, ?, ?)',
+                (job['job_id'], job['created_at'], records, attacks_detected,
+                 json.dumps(job, default=str))
+            )
+            if attacks:
+                conn.executemany(
+                    'INSERT INTO attacks (job_id, detected_at, data) VALUES (?, ?, ?)',
+                    ((job['job_id'], a.get('detected_at'), json.dumps(a, default=str)) for a in attacks)
+                )
+                self._bump(conn, 'attacks')
+            self._bump(conn, 'jobs')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def list_jobs(self):
+        rows = self._conn().execute('SELECT data FROM jobs ORDER BY created_at DESC').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_job(self, job_id):
+        row = self._conn().execute('SELECT data FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def totals(self):
+        row = self._conn().execute('SELECT COALESCE(SUM(total_records), 0), COALESCE(SUM(attacks_detected), 0) FROM jobs').fetchone()
+        return row[0], row[1]
+
+    # ---------- Attacks ----------
+    def get_attacks(self, job_id, limit=None, offset=0):
+        rows = self._conn().execute(
+            'SELECT data FROM attacks WHERE job_id = ? ORDER BY id LIMIT ? OFFSET ?',
+            (job_id, -1 if limit is None else limit, offset)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count_attacks(self, job_id):
+        return self._conn().execute('SELECT COUNT(*) FROM attacks WHERE job_id = ?', (job_id,)).fetchone()[0]
+
+    def iter_attacks(self):
+        for job_id, data in self._conn().execute('SELECT job_id, data FROM attacks ORDER BY id'):
+            yield job_id, json.loads(data)
+
+    def recent_attacks(self, limit=5):
+        rows = self._conn().execute(
+            'SELECT data FROM attacks ORDER BY detected_at DESC LIMIT ?', (limit,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def add_live_attack(self, attack, job_id='live_monitor'):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cur = conn.execute(
+                'INSERT INTO attacks (job_id, detected_at, data) VALUES (?, ?, ?)',
+                (job_id, attack.get('detected_at'), json.dumps(attack, default=str))
+            )
+            conn.execute(
+                'DELETE FROM attacks WHERE job_id = ? AND id <= ('
+                'SELECT id FROM attacks WHERE job_id = ? AND id <= ? ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                (job_id, job_id, cur.lastrowid, self.max_live_attacks)
+            )
+            self._bump(conn, 'attacks')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    # ---------- Live logs ----------
+    def append_live_log(self, record):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            seq = conn.execute('INSERT INTO live_logs (data) VALUES (?)', (json.dumps(record, default=str),)).lastrowid
+            conn.execute('DELETE FROM live_logs WHERE seq <= ?', (seq - self.max_live_logs,))
+            self._bump(conn, 'live_logs')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return seq
+
+    def live_logs(self):
+        rows = self._conn().execute('SELECT data FROM live_logs ORDER BY seq').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def live_logs_since(self, seq):
+        conn = self._conn()
+        if seq is None:
+            return [], conn.execute('SELECT COALESCE(MAX(seq), 0) FROM live_logs').fetchone()[0]
+        rows = conn.execute('SELECT seq, data FROM live_logs WHERE seq > ? ORDER BY seq', (seq,)).fetchall()
+        if not rows:
+            return [], seq
+        return [json.loads(data) for _, data in rows], rows[-1][0]
+
+    # ---------- Agents ----------
+    def touch_agent(self, hostname, info):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO agents (hostname, data) VALUES (?, ?) '
+                'ON CONFLICT(hostname) DO UPDATE SET data = excluded.data',
+                (hostname, json.dumps(info, default=str))
+            )
+            self._bump(conn, 'agents')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def agents(self):
+        rows = self._conn().execute('SELECT hostname, data FROM agents').fetchall()
+        return {hostname: json.loads(data) for hostname, data in rows}
+
+
+def create_state_store(max_live_logs=100):
+    """Builds the store selected by ANOMI_STATE_BACKEND (memory | sqlite)."""
+    backend = os.getenv('ANOMI_STATE_BACKEND', 'memory').lower()
+    if backend == 'sqlite':
+        path = os.getenv(
+            'ANOMI_STATE_DB',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'anomi_state.db')
+        )
+        return SQLiteStateStore(path, max_live_logs=max_live_logs)
+    return MemoryStateStore(max_live_logs=max_live_logs)
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Anomi Replay Load Generator - Kapasite Planlaması İçin
+======================================================
+Satır tabanlı bir log dosyasını (ids_guvenlik_logu.txt, logs_5000.txt, ...)
+/api/ingest (veya /api/ingest/batch) uç noktasına yeniden oynatır.
+
+- Zaman damgasına sadık: satırlar orijinal zaman farklarıyla gönderilir
+  (--speed 10 = 10 kat hızlı). Zaman damgası olmayan dosyalarda --rate kullanın.
+- Sabit hız: --rate 500 = saniyede toplam 500 satır (0 = sınırsız).
+- Çoklu kaynak: --sources 50 ile satırlar 50 simüle ajana dağıtılır
+  (her ajan kendi 'source' adıyla, rate limit de kaynak başına uygulanır).
+- Tek süreç, asyncio + aiohttp: binlerce eşzamanlı istek açılabilir.
+
+Ölçülenler: uçtan uca gecikme (p50/p90/p99/max), hata ve 429 oranları,
+hedeflenen vs gerçekleşen throughput, zamanlama gecikmesi (sender lag).
+
+Kullanım:
+    python replay_load_generator.py "../Raporlar/SAMET_SAHIN/Test ve Loglar/ids_guvenlik_logu.txt" --speed 60 --sources 20
+    python replay_load_generator.py logs_5000.txt --rate 2000 --sources 100 --concurrency 256 --out run.json
+    python replay_load_generator.py logs_5000.txt --rate 0 --batch-size 100        # /api/ingest/batch
+
+Payload ve uç noktalar logiz_live_client.py'den alınır (build_ingest_payload /
+build_batch_payload, INGEST_ENDPOINT / INGEST_BATCH_ENDPOINT); yalnızca taşıma
+katmanı farklıdır (requests yerine aiohttp), böylece ajan ile yük üreticisi
+aynı gövdeyi gönderir:
+    {"log": <satır>, "source": <ajan adı>, "timestamp": <epoch>}
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# logiz_live_client.py: Raporlar/SAMET_SAHIN/Test ve Loglar/ (proje kökünden)
+CLIENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Raporlar', 'SAMET_SAHIN', 'Test ve Loglar')
+sys.path.append(os.path.abspath(CLIENT_DIR))
+from logiz_live_client import (LOGIZ_SERVER, INGEST_ENDPOINT, INGEST_BATCH_ENDPOINT,
+                               build_ingest_payload, build_batch_payload)
+
+# "[2025-12-20 23:10:59] [NORMAL] ..." (IDS / EMİRHAN logları) veya satır başında "2025-12-20 23:10:59,..."
+TIMESTAMP_RE = re.compile(r'^\[?(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?)')
+
+PROGRESS_INTERVAL = 5.0
+
+
+def parse_timestamp(line):
+    match = TIMESTAMP_RE.match(line)
+    if not match:
+        return None
+    try:
+        return datetime.fromisoformat(match.group(1).replace(' ', 'T')).timestamp()
+    except ValueError:
+        return None
+
+
+def load_lines(path, limit=None):
+    """Returns [(offset_seconds or None, line)]; offsets are relative to the first timestamp."""
+    entries = []
+    first = None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for raw in f:
+            line = raw.strip()
+            if not line:
+                continue
+            ts = parse_timestamp(line)
+            if ts is not None and first is None:
+                first = ts
+            entries.append((ts - first if ts is not None else None, line))
+            if limit and len(entries) >= limit:
+                break
+    return entries
+
+
+def build_schedule(entries, speed, rate, loops):
+    """
+    Yields (due_offset_seconds, line). Timestamp mode keeps the original gaps
+    divided by `speed`; a line without a timestamp inherits the previous one.
+    Rate mode spaces lines evenly (rate <= 0: everything is due immediately).
+    """
+    timestamped = speed > 0 and any(offset is not None for offset, _ in entries)
+    if speed > 0 and not timestamped:
+        raise ValueError("no timestamps found in the input, use --rate instead of --speed")
+
+    span = 0.0
+    if timestamped:
+        span = max(offset for offset, _ in entries if offset is not None) / speed
+        # Keep one average gap between loops so the last and first burst don't collide
+        span += span / max(len(entries) - 1, 1)
+
+    index = 0
+    for loop in range(loops):
+        last_offset = 0.0
+        for offset, line in entries:
+            if timestamped:
+                if offset is not None:
+                    last_offset = offset / speed
+                yield loop * span + last_offset, line
+            else:
+                yield (index / rate if rate > 0 else 0.0), line
+            index += 1
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.lags = []
+        self.status = Counter()
+        self.errors = Counter()
+        self.lines_sent = 0
+        self.lines_ok = 0
+        self.requests = 0
+
+    def summary(self, elapsed, scheduled_lines, target_rate):
+        lat = np.asarray(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        lag = np.asarray(self.lags) * 1000 if self.lags else np.zeros(1)
+        requests = max(self.requests, 1)
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'requests': self.requests,
+            'lines_scheduled': scheduled_lines,
+            'lines_sent': self.lines_sent,
+            'lines_accepted': self.lines_ok,
+            'target_lines_per_sec': round(target_rate, 1) if target_rate else None,
+            'achieved_lines_per_sec': round(self.lines_ok / elapsed, 1) if elapsed > 0 else None,
+            'achieved_requests_per_sec': round(self.requests / elapsed, 1) if elapsed > 0 else None,
+            'latency_ms': {
+                'p50': round(float(np.percentile(lat, 50)), 2),
+                'p90': round(float(np.percentile(lat, 90)), 2),
+                'p99': round(float(np.percentile(lat, 99)), 2),
+                'max': round(float(lat.max()), 2),
+            },
+            'sender_lag_ms': {
+                'p50': round(float(np.percentile(lag, 50)), 2),
+                'p99': round(float(np.percentile(lag, 99)), 2),
+                'max': round(float(lag.max()), 2),
+            },
+            'status_codes': {str(k): v for k, v in sorted(self.status.items())},
+            'rate_limited_ratio': round(self.status.get(429, 0) / requests, 4),
+            'error_ratio': round((sum(v for k, v in self.status.items() if k >= 400 and k != 429)
+                                  + sum(self.errors.values())) / requests, 4),
+            'client_errors': dict(self.errors),
+        }
+
+
+class ReplayClient:
+    def __init__(self, args):
+        self.args = args
+        self.stats = Stats()
+        self.semaphore = asyncio.Semaphore(args.concurrency)
+        self.headers = {'X-API-Key': args.api_key} if args.api_key else {}
+        self.single_url = args.server.rstrip('/') + args.endpoint
+        self.batch_url = args.server.rstrip('/') + args.batch_endpoint
+
+    async def _post(self, session, url, payload, line_count, lag):
+        stats = self.stats
+        try:
+            started = time.perf_counter()
+            async with session.post(url, json=payload, headers=self.headers) as resp:
+                await resp.read()
+                elapsed = time.perf_counter() - started
+            stats.status[resp.status] += 1
+            if resp.status in (200, 201):
+                stats.latencies.append(elapsed)
+                stats.lines_ok += line_count
+        except asyncio.TimeoutError:
+            stats.errors['timeout'] += 1
+        except aiohttp.ClientError as e:
+            stats.errors[type(e).__name__] += 1
+        finally:
+            stats.requests += 1
+            stats.lines_sent += line_count
+            stats.lags.append(lag)
+            self.semaphore.release()
+
+    async def _dispatch(self, session, tasks, source, lines, due, t0):
+        # Backpressure: waiting here shows up as sender lag (the backend is not keeping up)
+        await self.semaphore.acquire()
+        lag = max(0.0, time.perf_counter() - t0 - due)
+        if len(lines) == 1 and self.args.batch_size <= 1:
+            payload = build_ingest_payload(lines[0], source)
+            url = self.single_url
+        else:
+            payload = build_batch_payload(lines, source)
+            url = self.batch_url
+        task = asyncio.create_task(self._post(session, url, payload, len(lines), lag))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def run(self, schedule, total_lines):
+        args = self.args
+        sources = [f"{args.source_prefix}-{i:03d}" for i in range(args.sources)]
+        pending = {s: [] for s in sources}
+        tasks = set()
+        timeout = aiohttp.ClientTimeout(total=args.timeout)
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            t0 = time.perf_counter()
+            progress_at = t0 + PROGRESS_INTERVAL
+            for index, (due, line) in enumerate(schedule):
+                if args.duration and due > args.duration:
+                    break
+                delay = t0 + due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                source = sources[index % len(sources)]
+                buffer = pending[source]
+                buffer.append(line)
+                if len(buffer) >= args.batch_size:
+                    pending[source] = []
+                    await self._dispatch(session, tasks, source, buffer, due, t0)
+
+                now = time.perf_counter()
+                if now >= progress_at:
+                    progress_at = now + PROGRESS_INTERVAL
+                    self._progress(now - t0, total_lines)
+
+            # Partial batches left at the end of the input
+            for source, buffer in pending.items():
+                if buffer:
+                    await self._dispatch(session, tasks, source, buffer, time.perf_counter() - t0, t0)
+            if tasks:
+                await asyncio.gather(*tasks)
+            return time.perf_counter() - t0
+
+    def _progress(self, elapsed, total_lines):
+        s = self.stats
+        p99 = np.percentile(s.latencies, 99) * 1000 if s.latencies else 0.0
+        print(f"⏱️  {elapsed:7.1f}s | {s.lines_sent}/{total_lines} satır | "
+              f"{s.lines_ok / elapsed:8.1f} satır/s | p99 {p99:7.1f} ms | "
+              f"429: {s.status.get(429, 0)} | hata: {sum(s.errors.values())}")
+
+
+def print_summary(summary):
+    print("=" * 60)
+    print(f"📊 Süre: {summary['elapsed_seconds']}s | İstek: {summary['requests']} | "
+          f"Kabul edilen satır: {summary['lines_accepted']}/{summary['lines_sent']}")
+    target = summary['target_lines_per_sec']
+    print(f"🚀 Throughput: {summary['achieved_lines_per_sec']} satır/s "
+          f"({summary['achieved_requests_per_sec']} istek/s)" + (f", hedef {target}" if target else ""))
+    lat = summary['latency_ms']
+    print(f"⏳ Gecikme: p50 {lat['p50']} ms | p90 {lat['p90']} ms | p99 {lat['p99']} ms | max {lat['max']} ms")
+    print(f"🐢 Gönderici gecikmesi: p99 {summary['sender_lag_ms']['p99']} ms | max {summary['sender_lag_ms']['max']} ms")
+    print(f"🚦 429 oranı: {summary['rate_limited_ratio']:.2%} | Hata oranı: {summary['error_ratio']:.2%} | "
+          f"Kodlar: {summary['status_codes']} {summary['client_errors'] or ''}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Anomi /api/ingest replay load generator')
+    parser.add_argument('file', help='Satır tabanlı log dosyası')
+    parser.add_argument('--server', default=LOGIZ_SERVER)
+    parser.add_argument('--endpoint', default=INGEST_ENDPOINT)
+    parser.add_argument('--batch-endpoint', default=INGEST_BATCH_ENDPOINT)
+    parser.add_argument('--batch-size', type=int, default=1, help='>1: satırları kaynak başına toplu gönder')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--speed', type=float, help='Zaman damgalarına göre N kat hız (varsayılan 1)')
+    mode.add_argument('--rate', type=float, help='Sabit toplam hız (satır/s), 0 = sınırsız')
+    parser.add_argument('--sources', type=int, default=10, help='Simüle ajan sayısı')
+    parser.add_argument('--source-prefix', default='REPLAY_AGENT')
+    parser.add_argument('--concurrency', type=int, default=100, help='Aynı anda açık istek sayısı')
+    parser.add_argument('--loop', type=int, default=1, help='Dosyayı kaç kez oynat')
+    parser.add_argument('--limit', type=int, help='Dosyadan okunacak maksimum satır')
+    parser.add_argument('--duration', type=float, help='Bu kadar saniyelik planı oynattıktan sonra dur')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--api-key', default=os.getenv('ANOMI_API_KEY'))
+    parser.add_argument('--out', help='Özet sonuçları JSON olarak yaz')
+    args = parser.parse_args()
+
+    if aiohttp is None:
+        print("❌ aiohttp kütüphanesi yüklü değil. 'pip install aiohttp' ile yükleyin.")
+        sys.exit(1)
+    if not os.path.exists(args.file):
+        print(f"❌ Dosya bulunamadı: {args.file}")
+        sys.exit(1)
+    if args.speed is None and args.rate is None:
+        args.speed = 1.0
+    speed = args.speed or 0.0
+    rate = args.rate if args.rate is not None else 0.0
+    args.batch_size = max(1, args.batch_size)
+    args.sources = max(1, args.sources)
+
+    entries = load_lines(args.file, args.limit)
+    if not entries:
+        print("❌ Dosyada gönderilecek satır yok")
+        sys.exit(1)
+    try:
+        schedule = list(build_schedule(entries, speed, rate, args.loop))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    planned = schedule[-1][0]
+    target = len(schedule) / planned if planned > 0 else None
+    print("=" * 60)
+    print(f"📂 {args.file}: {len(entries)} satır x {args.loop} tur")
+    print(f"🌐 {args.server} | kaynak: {args.sources} | eşzamanlılık: {args.concurrency} | batch: {args.batch_size}")
+    print(f"🎯 Plan: {'%.1fx hız' % speed if speed else ('%.0f satır/s' % rate if rate else 'sınırsız')}"
+          f", {planned:.1f}s" + (f" (~{target:.0f} satır/s)" if target else ""))
+    print("=" * 60)
+
+    client = ReplayClient(args)
+    try:
+        elapsed = asyncio.run(client.run(schedule, len(schedule)))
+    except KeyboardInterrupt:
+        print("\n⛔ Durduruldu")
+        return
+
+    summary = client.stats.summary(elapsed, len(schedule), target)
+    summary['config'] = {k: v for k, v in vars(args).items() if k != 'api_key'}
+    print_summary(summary)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"💾 Sonuçlar yazıldı: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""
+Ensemble Throughput Benchmark
+=============================
+Measures EnsembleDetector.detect, detect_batch and the Flask upload endpoint
+(/api/analyze/upload) over the repository's real log corpora:
+
+    data/test_data/test_*.csv                                  (small, all 10 datasets)
+    Raporlar/EMİRHAN_BSG/LOG/logs_5000_parsed.csv              (EMİRHAN)
+    Raporlar/SAMET_SAHIN/Test ve Loglar/ids_guvenlik_parsed_labeled.csv (SAMET)
+    Raporlar/ATAKAN_BSG/expanded_logs.csv                      (ATAKAN)
+    Raporlar/EMİRHNT_BSG/logs_expanded.csv                     (EMİRHNT)
+
+plus synthetic upscaled copies (rows resampled with replacement, --upscale).
+
+Every corpus runs in its own fresh process, so the reported peak RSS belongs to
+that corpus (models + data + scoring) and not to whatever ran before it.
+
+Usage:
+    python scripts/benchmark_ensemble.py                          # everything
+    python scripts/benchmark_ensemble.py --corpus SAMET_ids --modes batch --upscale 1 10
+    python scripts/benchmark_ensemble.py --out bench_new.json --compare bench_old.json
+
+Results are written as JSON (one entry per corpus/mode/batch size) together with
+the git commit, so runs from different commits can be diffed with --compare.
+"""
+
+import argparse
+import glob
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings("ignore")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, 'logiz-ensemble-standalone', 'backend')
+
+# Large corpora under Raporlar/ (name -> (path relative to repo root, dataset))
+LARGE_CORPORA = {
+    'EMİRHAN_logs_5000': (os.path.join('Raporlar', 'EMİRHAN_BSG', 'LOG', 'logs_5000_parsed.csv'), 'EMİRHAN'),
+    'SAMET_ids': (os.path.join('Raporlar', 'SAMET_SAHIN', 'Test ve Loglar', 'ids_guvenlik_parsed_labeled.csv'), 'SAMET'),
+    'ATAKAN_expanded': (os.path.join('Raporlar', 'ATAKAN_BSG', 'expanded_logs.csv'), 'ATAKAN'),
+    'EMİRHNT_expanded': (os.path.join('Raporlar', 'EMİRHNT_BSG', 'logs_expanded.csv'), 'EMİRHNT'),
+}
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000]
+ALL_MODES = ('detect', 'batch', 'upload')
+
+
+def discover_corpora():
+    """Returns {name: (absolute path, dataset)} for every corpus present in this checkout."""
+    corpora = {}
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, 'data', 'test_data', 'test_*.csv'))):
+        dataset = os.path.splitext(os.path.basename(path))[0][len('test_'):]
+        corpora[f"test_{dataset}"] = (path, dataset)
+    for name, (relative, dataset) in LARGE_CORPORA.items():
+        path = os.path.join(REPO_ROOT, relative)
+        if os.path.exists(path):
+            corpora[name] = (path, dataset)
+    return corpora
+
+
+def load_corpus(path, upscale=1, seed=42):
+    df = pd.read_csv(path, on_bad_lines='skip', encoding='utf-8')
+    if upscale > 1:
+        # Resample with replacement: keeps the real value distribution, breaks the file order
+        df = df.sample(n=len(df) * upscale, replace=True, random_state=seed).reset_index(drop=True)
+    return df
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unavailable)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def latency_summary(latencies, rows):
+    latencies = np.asarray(latencies)
+    total = float(latencies.sum())
+    return {
+        'rows': int(rows),
+        'calls': int(len(latencies)),
+        'total_seconds': round(total, 4),
+        'rows_per_sec': round(rows / total, 1) if total > 0 else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 3),
+    }
+
+
+def bench_detect(detector, records, max_rows):
+    """Single-record path (what /api/analyze and the live ingest use per log)."""
+    records = records[:max_rows]
+    detector.detect(records[0])  # warm-up
+    latencies = []
+    for record in records:
+        started = time.perf_counter()
+        detector.detect(record)
+        latencies.append(time.perf_counter() - started)
+    return [dict(mode='detect', batch_size=1, **latency_summary(latencies, len(records)))]
+
+
+def bench_batch(detector, records, batch_sizes, max_calls):
+    results = []
+    detector.detect_batch(records[:min(100, len(records))])  # warm-up
+    for batch_size in batch_sizes:
+        if batch_size > len(records) and batch_size != batch_sizes[0]:
+            continue
+        batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)][:max_calls]
+        latencies = []
+        for batch in batches:
+            started = time.perf_counter()
+            detector.detect_batch(batch)
+            latencies.append(time.perf_counter() - started)
+        results.append(dict(mode='batch', batch_size=batch_size,
+                            **latency_summary(latencies, sum(len(b) for b in batches))))
+    return results
+
+
+def bench_upload(df, filename, repeats):
+    """End-to-end Flask upload (parse, routing, scoring, state store, archive) via the test client."""
+    os.environ.setdefault('ANOMI_LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('ANOMI_STATE_BACKEND', 'memory')
+    os.environ.setdefault('ANOMI_ARCHIVE_DIR', tempfile.mkdtemp(prefix='anomi_bench_archive_'))
+    sys.path.insert(0, BACKEND_DIR)
+    import app as backend
+
+    payload = df.to_csv(index=False).encode('utf-8')
+    client = backend.app.test_client()
+    latencies = []
+    model_used = None
+    for attempt in range(repeats + 1):
+        started = time.perf_counter()
+        response = client.post('/api/analyze/upload',
+                               data={'file': (io.BytesIO(payload), filename)},
+                               content_type='multipart/form-data')
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"upload failed ({response.status_code}): {response.get_data(as_text=True)[:200]}")
+        model_used = response.get_json()['results']['model_used']
+        if attempt > 0:  # the first request loads the models
+            latencies.append(elapsed)
+    return [dict(mode='upload', batch_size=len(df), model_used=model_used,
+                 **latency_summary(latencies, len(df) * repeats))]
+
+
+def run_corpus(task):
+    """Runs in a fresh worker process (see main)."""
+    sys.path.insert(0, REPO_ROOT)
+    from detect_attack_ensemble import EnsembleDetector
+
+    df = load_corpus(task['path'], task['upscale'])
+    records = df.to_dict(orient='records')
+    entry = {'corpus': task['name'], 'dataset': task['dataset'], 'upscale': task['upscale'],
+             'input_rows': len(df), 'results': []}
+
+    load_started = time.perf_counter()
+    detector = EnsembleDetector(task['dataset'])
+    entry['model_load_seconds'] = round(time.perf_counter() - load_started, 3)
+    entry['rss_after_load_mb'] = peak_rss_mb()
+
+    if 'detect' in task['modes']:
+        entry['results'] += bench_detect(detector, records, task['detect_rows'])
+    if 'batch' in task['modes']:
+        entry['results'] += bench_batch(detector, records, task['batch_sizes'], task['max_calls'])
+    if 'upload' in task['modes']:
+        entry['results'] += bench_upload(df, os.path.basename(task['path']), task['upload_repeats'])
+
+    entry['peak_rss_mb'] = peak_rss_mb()
+    return entry
+
+
+def environment_info():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                             cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+
+    import sklearn
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+def _result_key(entry, result):
+    return (entry['corpus'], entry['upscale'], result['mode'], result['batch_size'])
+
+
+def compare(current, baseline_path):
+    """Prints rows/sec and p99 changes against a previous JSON result file."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    old = {_result_key(e, r): r for e in baseline['corpora'] for r in e['results']}
+
+    print(f"\n📊 Karşılaştırma: {baseline['environment'].get('commit')} -> {current['environment'].get('commit')}")
+    print(f"{'corpus':<22}{'x':>4} {'mode':<7}{'batch':>7}{'rows/s old':>13}{'rows/s new':>13}{'Δ%':>8}{'p99 old':>11}{'p99 new':>11}")
+    for entry in current['corpora']:
+        for result in entry['results']:
+            before = old.get(_result_key(entry, result))
+            if not before or not before['rows_per_sec'] or not result['rows_per_sec']:
+                continue
+            change = (result['rows_per_sec'] / before['rows_per_sec'] - 1) * 100
+            print(f"{entry['corpus']:<22}{entry['upscale']:>4} {result['mode']:<7}{result['batch_size']:>7}"
+                  f"{before['rows_per_sec']:>13.1f}{result['rows_per_sec']:>13.1f}{change:>+8.1f}"
+                  f"{before['p99_ms']:>11.2f}{result['p99_ms']:>11.2f}")
+
+
+def print_entry(entry):
+    print(f"\n▶ {entry['corpus']} ({entry['dataset']}) x{entry['upscale']}: {entry['input_rows']} rows, "
+          f"model load {entry['model_load_seconds']}s, peak RSS {entry['peak_rss_mb']} MB")
+    for r in entry['results']:
+        print(f"   {r['mode']:<7} batch={r['batch_size']:<6} {r['rows_per_sec'] or 0:>10.1f} rows/s   "
+              f"p50 {r['p50_ms']:>9.3f} ms   p99 {r['p99_ms']:>9.3f} ms   ({r['calls']} calls)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput benchmark for the ensemble detector')
+    parser.add_argument('--corpus', nargs='*', help='Corpus names to run (default: all, see --list)')
+    parser.add_argument('--list', action='store_true', help='List available corpora and exit')
+    parser.add_argument('--modes', nargs='*', default=list(ALL_MODES), choices=ALL_MODES)
+    parser.add_argument('--batch-sizes', nargs='*', type=int, default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--upscale', nargs='*', type=int, default=[1],
+                        help='Synthetic upscale factors (each corpus is run once per factor)')
+    parser.add_argument('--detect-rows', type=int, default=300, help='Rows timed through detect() one by one')
+    parser.add_argument('--max-calls', type=int, default=200, help='Max detect_batch calls per batch size')
+    parser.add_argument('--upload-repeats', type=int, default=3)
+    parser.add_argument('--out', help='Write JSON results to this file')
+    parser.add_argument('--compare', help='Previous JSON result file to compare against')
+    args = parser.parse_args()
+
+    corpora = discover_corpora()
+    if args.list:
+        for name, (path, dataset) in corpora.items():
+            print(f"{name:<22} {dataset:<9} {os.path.relpath(path, REPO_ROOT)}")
+        return
+
+    selected = args.corpus or list(corpora)
+    unknown = [name for name in selected if name not in corpora]
+    if unknown:
+        parser.error(f"unknown corpus: {', '.join(unknown)} (see --list)")
+
+    tasks = [{
+        'name': name, 'path': corpora[name][0], 'dataset': corpora[name][1], 'upscale': factor,
+        'modes': args.modes, 'batch_sizes': sorted(args.batch_sizes), 'detect_rows': args.detect_rows,
+        'max_calls': args.max_calls, 'upload_repeats': args.upload_repeats,
+    } for name in selected for factor in args.upscale]
+
+    report = {'environment': environment_info(), 'corpora': []}
+    print(f"🚀 Benchmark: {len(tasks)} run(s), commit {report['environment']['commit']}")
+
+    # spawn + one task per child: clean peak RSS per corpus, no state leaking between runs
+    context = multiprocessing.get_context('spawn')
+    for task in tasks:
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            entry = pool.apply(run_corpus, (task,))
+        report['corpora'].append(entry)
+        print_entry(entry)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Results written to {args.out}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+API Payload Benchmark
+=====================
+Encode time and wire size of the large API responses, stdlib json (what
+jsonify used before serialization.py) against the fast serializer, and of
+every body under gzip / brotli levels:
+
+    upload         /api/analyze/upload response (detailed_logs preview)
+    job_results    /api/analyze/results/<job_id>?limit=1000 (rendered attacks)
+    detect_frame   raw EnsembleDetector.detect_frame output (NumPy scalars)
+    sse_logs       one /api/monitor/stream 'logs' event (full live buffer)
+    export_csv     /api/export/attacks body (compression only)
+
+Payloads are produced by the real endpoints (Flask test client) from a corpus.
+
+Usage:
+    python scripts/benchmark_payloads.py
+    python scripts/benchmark_payloads.py --corpus data/test_data/test_SAMET.csv --upscale 20 --out payloads.json
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings("ignore")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, 'logiz-ensemble-standalone', 'backend')
+DEFAULT_CORPUS = os.path.join('Raporlar', 'EMİRHAN_BSG', 'LOG', 'logs_5000_parsed.csv')
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (5, 11)
+
+
+def timed(func, repeats):
+    """(result, median seconds) over `repeats` calls."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return result, float(np.median(timings))
+
+
+def stdlib_dumps(obj, default):
+    # Flask's DefaultJSONProvider: ensure_ascii, sorted keys, compact separators
+    return json.dumps(obj, default=default, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def collect_payloads(corpus_path, upscale):
+    """Runs the corpus through the backend and returns {name: JSON object or bytes}."""
+    os.environ.setdefault('ANOMI_LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('ANOMI_STATE_BACKEND', 'memory')
+    os.environ.setdefault('ANOMI_ARCHIVE_DIR', tempfile.mkdtemp(prefix='anomi_bench_archive_'))
+    os.environ['ANOMI_COMPRESS'] = '0'  # Bodies are measured uncompressed here
+    sys.path.insert(0, BACKEND_DIR)
+    import app as backend
+
+    df = pd.read_csv(corpus_path, on_bad_lines='skip', encoding='utf-8')
+    if upscale > 1:
+        df = df.sample(n=len(df) * upscale, replace=True, random_state=42).reset_index(drop=True)
+    client = backend.app.test_client()
+
+    payloads = {}
+    response = client.post('/api/analyze/upload',
+                           data={'file': (io.BytesIO(df.to_csv(index=False).encode('utf-8')),
+                                          os.path.basename(corpus_path))},
+                           content_type='multipart/form-data')
+    if response.status_code != 200:
+        raise RuntimeError(f"upload failed ({response.status_code}): {response.get_data(as_text=True)[:200]}")
+    payloads['upload'] = response.get_json()
+    job_id = payloads['upload']['job_id']
+    payloads['job_results'] = client.get(f'/api/analyze/results/{job_id}?limit=1000').get_json()
+
+    dataset = payloads['upload']['results']['model_used']
+    payloads['detect_frame'] = backend.get_detector(dataset).detect_frame(df.head(1000))
+
+    lines = [str(value) for value in df.iloc[:backend.MAX_LIVE_LOGS, 0]]
+    client.post('/api/ingest/batch', json={'logs': lines, 'source': 'benchmark'},
+                headers={'X-API-Key': next(iter(backend.API_KEYS))})
+    payloads['sse_logs'] = {'type': 'logs', 'data': backend.STATE.live_logs()}
+
+    payloads['export_csv'] = client.get('/api/export/attacks').get_data()
+    return payloads
+
+
+def bench_payload(name, payload, repeats):
+    import serialization
+
+    entry = {'payload': name, 'encoders': [], 'compression': []}
+    if isinstance(payload, bytes):
+        body = payload
+    else:
+        for encoder, func in (('stdlib', lambda: stdlib_dumps(payload, serialization._default)),
+                              ('fast', lambda: serialization.dumps(payload))):
+            body, seconds = timed(func, repeats)
+            entry['encoders'].append({'encoder': encoder, 'bytes': len(body), 'encode_ms': round(seconds * 1000, 3)})
+        # Wire size of the body the API now sends
+        body = serialization.dumps(payload)
+
+    levels = [('identity', None)] + [('gzip', level) for level in GZIP_LEVELS]
+    if serialization.brotli is not None:
+        levels += [('br', quality) for quality in BROTLI_QUALITIES]
+    for encoding, level in levels:
+        if encoding == 'identity':
+            compressed, seconds = body, 0.0
+        elif encoding == 'gzip':
+            compressed, seconds = timed(lambda: gzip.compress(body, compresslevel=level), repeats)
+        else:
+            compressed, seconds = timed(lambda: serialization.brotli.compress(body, quality=level), repeats)
+        entry['compression'].append({
+            'encoding': encoding, 'level': level, 'bytes': len(compressed),
+            'ratio': round(len(body) / len(compressed), 2), 'compress_ms': round(seconds * 1000, 3),
+        })
+    return entry
+
+
+def print_entry(entry):
+    print(f"\n▶ {entry['payload']}")
+    for e in entry['encoders']:
+        print(f"   {e['encoder']:<8} {e['bytes']:>11,} B   {e['encode_ms']:>9.3f} ms")
+    for c in entry['compression']:
+        label = c['encoding'] + (f"-{c['level']}" if c['level'] is not None else '')
+        print(f"   {label:<8} {c['bytes']:>11,} B   x{c['ratio']:<6} {c['compress_ms']:>9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serialization and compression benchmark for large API payloads')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='CSV corpus (relative to the repo root or absolute)')
+    parser.add_argument('--upscale', type=int, default=1, help='Resample the corpus to N times its rows')
+    parser.add_argument('--repeats', type=int, default=7, help='Timed runs per measurement (median reported)')
+    parser.add_argument('--out', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    from benchmark_ensemble import environment_info
+
+    payloads = collect_payloads(os.path.join(REPO_ROOT, args.corpus), args.upscale)
+    import serialization
+
+    report = {
+        'environment': {**environment_info(),
+                        'serializer': 'orjson' if serialization.orjson is not None else 'json',
+                        'brotli': serialization.brotli is not None},
+        'corpus': args.corpus,
+        'upscale': args.upscale,
+        'payloads': [],
+    }
+    print(f"Serializer: {report['environment']['serializer']}, brotli: {report['environment']['brotli']}")
+    for name, payload in payloads.items():
+        entry = bench_payload(name, payload, args.repeats)
+        report['payloads'].append(entry)
+        print_entry(entry)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 {args.out}")
+
+
+if __name__ == '__main__':
+    main()
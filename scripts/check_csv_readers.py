@@ -0,0 +1,102 @@
+"""
+CSV Reader Equivalence Check
+============================
+log_parsers.read_planned_csv() reads uploads with pyarrow when it is installed
+and with pandas otherwise. Both must produce the same DataFrame, or the same
+upload scores differently depending on the server. This script reads every CSV
+shipped in the repository both ways with the same read plan and compares
+columns, dtypes, null masks and values (full and --columns model reads):
+
+    python scripts/check_csv_readers.py               # all shipped corpora
+    python scripts/check_csv_readers.py some.csv ...  # specific files
+
+Exit code 1 if any file differs.
+"""
+
+import glob
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings("ignore")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import log_parsers  # noqa: E402
+
+
+def shipped_csvs():
+    """Every CSV under data/ and Raporlar/ (the corpora the benchmarks and models use)."""
+    paths = glob.glob(os.path.join(REPO_ROOT, 'data', '**', '*.csv'), recursive=True)
+    paths += glob.glob(os.path.join(REPO_ROOT, 'Raporlar', '**', '*.csv'), recursive=True)
+    return sorted(paths)
+
+
+def read_both(path, columns='all'):
+    """Returns (arrow_df, pandas_df) read with the same sniffed plan."""
+    _, plan, encoding = log_parsers.sniff_csv(path, os.path.basename(path), columns)
+    arrow_df = log_parsers._read_arrow(path, encoding, plan)
+    pandas_df = pd.read_csv(path, on_bad_lines='skip', encoding=encoding, **plan)
+    return arrow_df, pandas_df
+
+
+def compare_frames(arrow_df, pandas_df):
+    """List of human-readable differences (empty if the frames are equivalent)."""
+    if list(arrow_df.columns) != list(pandas_df.columns):
+        return [f"columns differ: {list(arrow_df.columns)} vs {list(pandas_df.columns)}"]
+    if len(arrow_df) != len(pandas_df):
+        return [f"row count differs: {len(arrow_df)} vs {len(pandas_df)}"]
+
+    problems = []
+    for col in pandas_df.columns:
+        a, b = arrow_df[col], pandas_df[col]
+        if str(a.dtype) != str(b.dtype) and not (
+                isinstance(a.dtype, pd.CategoricalDtype) and isinstance(b.dtype, pd.CategoricalDtype)):
+            problems.append(f"{col}: dtype {a.dtype} vs {b.dtype}")
+            continue
+        a_null, b_null = a.isna().to_numpy(), b.isna().to_numpy()
+        if (a_null != b_null).any():
+            rows = np.flatnonzero(a_null != b_null)
+            problems.append(f"{col}: {a_null.sum()} vs {b_null.sum()} nulls "
+                            f"(first row {rows[0]}: {a.iloc[rows[0]]!r} vs {b.iloc[rows[0]]!r})")
+            continue
+        valid = ~b_null
+        if a.dtype.kind == 'f':
+            same = np.array_equal(a.to_numpy()[valid], b.to_numpy()[valid])
+        else:
+            same = (a.astype(object)[valid].astype(str).to_numpy() == b.astype(object)[valid].astype(str).to_numpy()).all()
+        if not same:
+            problems.append(f"{col}: values differ")
+    return problems
+
+
+def main(paths):
+    if log_parsers.pa is None:
+        print("❌ pyarrow is not installed - nothing to compare")
+        return 1
+    failed = 0
+    for path in paths:
+        name = os.path.relpath(path, REPO_ROOT)
+        problems = []
+        for columns in ('all', 'model'):  # full read and the pruned --columns model read
+            try:
+                problems += [f"[{columns}] {p}" for p in compare_frames(*read_both(path, columns))]
+            except Exception as e:  # unreadable corpus: report, keep checking the others
+                problems.append(f"[{columns}] read failed: {type(e).__name__}: {e}")
+        if problems:
+            failed += 1
+            print(f"❌ {name}")
+            for problem in problems:
+                print(f"     {problem}")
+        else:
+            print(f"✅ {name}")
+    print(f"{len(paths) - failed}/{len(paths)} file(s) identical")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:] or shipped_csvs()))